@@ -0,0 +1,34 @@
+"""Call log session fields
+
+Revision ID: 3b1f6c2d9a47
+Revises: 7926a9f171cb
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b1f6c2d9a47'
+down_revision: Union[str, Sequence[str], None] = '7926a9f171cb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('call_logs', sa.Column('session_id', sa.String(length=32), nullable=True))
+    op.add_column('call_logs', sa.Column('practice_id', sa.Integer(), nullable=True))
+    op.add_column('call_logs', sa.Column('turn_timings', sa.JSON(), nullable=True))
+    op.create_unique_constraint('uq_call_logs_session_id', 'call_logs', ['session_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_call_logs_session_id', 'call_logs', type_='unique')
+    op.drop_column('call_logs', 'turn_timings')
+    op.drop_column('call_logs', 'practice_id')
+    op.drop_column('call_logs', 'session_id')
@@ -0,0 +1,35 @@
+"""Patient phone blind index
+
+Revision ID: 5d92c1e8f3a6
+Revises: 8c4e2a7b5d10
+Create Date: 2026-10-18 13:02:17.550934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d92c1e8f3a6'
+down_revision: Union[str, Sequence[str], None] = '8c4e2a7b5d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema. Existing rows are filled by scripts/backfill_phone_index.py."""
+    op.add_column('patients', sa.Column('phone_index', sa.String(length=64), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_patients_practice_phone_index', 'patients', ['practice_id', 'phone_index'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_patients_practice_phone_index', table_name='patients', postgresql_concurrently=True)
+    op.drop_column('patients', 'phone_index')
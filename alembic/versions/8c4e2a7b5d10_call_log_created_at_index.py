@@ -0,0 +1,34 @@
+"""Call log created_at index
+
+Revision ID: 8c4e2a7b5d10
+Revises: 3b1f6c2d9a47
+Create Date: 2026-10-18 12:31:05.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e2a7b5d10'
+down_revision: Union[str, Sequence[str], None] = '3b1f6c2d9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY so a large call_logs table stays writable; it can't run in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_call_logs_created_at_id', 'call_logs', ['created_at', 'id'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_call_logs_created_at_id', table_name='call_logs', postgresql_concurrently=True)
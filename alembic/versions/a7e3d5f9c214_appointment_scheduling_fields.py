@@ -0,0 +1,36 @@
+"""Appointment scheduling fields
+
+Revision ID: a7e3d5f9c214
+Revises: 5d92c1e8f3a6
+Create Date: 2026-10-18 14:20:48.907215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3d5f9c214'
+down_revision: Union[str, Sequence[str], None] = '5d92c1e8f3a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('practices', sa.Column('schedule', sa.JSON(), nullable=True))
+    op.add_column('appointments', sa.Column('duration_minutes', sa.Integer(), server_default='30', nullable=False))
+    op.add_column('appointments', sa.Column('provider', sa.String(length=100), nullable=True))
+    op.add_column('appointments', sa.Column('operatory', sa.String(length=50), nullable=True))
+    op.create_index('ix_appointments_time', 'appointments', ['time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_appointments_time', table_name='appointments')
+    op.drop_column('appointments', 'operatory')
+    op.drop_column('appointments', 'provider')
+    op.drop_column('appointments', 'duration_minutes')
+    op.drop_column('practices', 'schedule')
@@ -1,23 +1,160 @@
-from fastapi import APIRouter, Depends
+import base64
+import json
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import func, select, tuple_
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from app.core.database import get_db
+from app.core.database import async_session, get_db
+from app.core.security import require_admin_token
 from app.models.all_models import CallLog
+from app.services.pms.availability import availability
 from app.services.pms.mock_service import MockPMSService
 
 router = APIRouter()
 
+# Characters of the transcript shown in the call list (the full text is on /calls/{id})
+SUMMARY_PREVIEW_CHARS = 160
+EXPORT_BATCH_SIZE = 500
+
+# List projection: no transcript body or timings
+CALL_LIST_COLUMNS = (
+    CallLog.id,
+    CallLog.created_at,
+    CallLog.duration,
+    CallLog.practice_id,
+    CallLog.recording_url,
+    func.substr(CallLog.transcript_summary, 1, SUMMARY_PREVIEW_CHARS).label("summary_preview"),
+)
+CALL_EXPORT_COLUMNS = (
+    CallLog.id,
+    CallLog.session_id,
+    CallLog.created_at,
+    CallLog.duration,
+    CallLog.practice_id,
+    CallLog.recording_url,
+    CallLog.transcript_summary,
+    CallLog.turn_timings,
+)
+
+
+def encode_cursor(created_at: datetime, call_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), call_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, call_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(call_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class CallFilters:
+    """Query parameters shared by the call list and the export."""
+    def __init__(
+        self,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        min_duration: Optional[int] = Query(None, ge=0),
+        max_duration: Optional[int] = Query(None, ge=0),
+        practice_id: Optional[int] = None,
+    ):
+        self.conditions = []
+        if created_from is not None:
+            self.conditions.append(CallLog.created_at >= created_from)
+        if created_to is not None:
+            self.conditions.append(CallLog.created_at < created_to)
+        if min_duration is not None:
+            self.conditions.append(CallLog.duration >= min_duration)
+        if max_duration is not None:
+            self.conditions.append(CallLog.duration <= max_duration)
+        if practice_id is not None:
+            self.conditions.append(CallLog.practice_id == practice_id)
+
+
 @router.get("/calls")
-async def get_calls(db: AsyncSession = Depends(get_db)):
-    """Fetch call logs from the database."""
-    result = await db.execute(select(CallLog).order_by(CallLog.created_at.desc()))
-    calls = result.scalars().all()
-    return calls
+async def get_calls(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    filters: CallFilters = Depends(),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Fetch call logs, newest first, one page at a time.
+    Pass the returned next_cursor back as ?cursor= for the following page.
+    """
+    query = select(*CALL_LIST_COLUMNS).where(*filters.conditions)
+    if cursor:
+        # Keyset: continue strictly after the last row of the previous page (ix_call_logs_created_at_id)
+        query = query.where(tuple_(CallLog.created_at, CallLog.id) < tuple_(*decode_cursor(cursor)))
+    query = query.order_by(CallLog.created_at.desc(), CallLog.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).mappings().all()
+    items: List[Dict[str, Any]] = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/calls/export", dependencies=[Depends(require_admin_token)])
+async def export_calls(filters: CallFilters = Depends()):
+    """All matching call logs with transcripts, streamed as a JSON array. Needs the admin token."""
+    query = (
+        select(*CALL_EXPORT_COLUMNS)
+        .where(*filters.conditions)
+        .order_by(CallLog.created_at.desc(), CallLog.id.desc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    async def stream() -> AsyncIterator[bytes]:
+        # Own session: request dependencies are torn down before the body is streamed
+        async with async_session() as session:
+            result = await session.stream(query)
+            yield b"["
+            first = True
+            async for partition in result.mappings().partitions():
+                chunk = ",".join(json.dumps(jsonable_encoder(dict(row))) for row in partition)
+                yield (chunk if first else "," + chunk).encode()
+                first = False
+            yield b"]"
+
+    return StreamingResponse(
+        stream(), media_type="application/json",
+        headers={"Content-Disposition": 'attachment; filename="calls.json"'}
+    )
+
+
+@router.get("/calls/{call_id}")
+async def get_call(call_id: int, db: AsyncSession = Depends(get_db)):
+    """One call log with its full transcript and turn timings."""
+    call = await db.get(CallLog, call_id)
+    if call is None:
+        raise HTTPException(status_code=404, detail="Call not found")
+    return call
 
 @router.get("/appointments")
 def get_appointments():
     """Fetch available appointment slots from the Mock PMS."""
     # In a real app, this might query the DB or call an external API
     return MockPMSService.get_available_slots()
+
+@router.get("/availability")
+async def get_availability(
+    practice_id: int,
+    start: datetime,
+    end: datetime,
+    duration_minutes: int = Query(30, ge=5, le=480),
+    provider: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200)
+):
+    """Free appointment slots starting between start and end (ISO datetimes with offsets)."""
+    if start.tzinfo is None or end.tzinfo is None:
+        raise HTTPException(status_code=400, detail="start and end need a UTC offset")
+    return await availability.find_slots(practice_id, start, end, duration_minutes, provider, limit)
@@ -1,26 +1,98 @@
+import asyncio
+import base64
+import json
+import time
+from typing import TYPE_CHECKING, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from loguru import logger
-from app.voice_engine.pipeline import VoicePipeline
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.sessions import AdmissionRejected, sessions
+from app.services.call_logs import CallRecord, call_log_writer
+
+if TYPE_CHECKING:
+    from app.voice_engine.codec import AudioFormat
+    from app.voice_engine.pipeline import VoicePipeline
 
 router = APIRouter()
 
 @router.websocket("/conversation")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    encoding: str = "pcm16",
+    sample_rate: int = 16000,
+    practice_id: str = "",
+    caller: Optional[str] = None
+):
+    """
+    Caller audio arrives either as binary frames or as JSON media messages
+    ({"event": "media", "sequenceNumber": "1", "media": {"payload": "<base64>"}}),
+    in the format given by ?encoding=pcm16|mulaw|alaw&sample_rate=8000|16000|24000.
+    The reply is sent in the same format as binary frames, paced to real time;
+    {"event": "clear"} means drop buffered audio (the caller barged in).
+    ?practice_id counts the call against that practice's session limit and selects the
+    practice the scheduling tools book with; ?caller is the caller ID, used to find their record.
+    """
     print("🔥 WEBSOCKET HIT: Connection attempt received!")
-    await websocket.accept()
-    logger.info("WebSocket connection accepted")
-    
-    pipeline = VoicePipeline() 
-    # In future phases: pipeline.workers = [Transcriber(), Agent(), Synthesizer(), Output(websocket)]
-    
+    # The voice engine (numpy, provider clients) is loaded by app.core.startup after
+    # the app starts serving; a call arriving before that waits for the import here
+    from app.voice_engine.codec import AudioFormat
+    try:
+        audio_format = AudioFormat(encoding, sample_rate)
+    except ValueError as e:
+        logger.warning(f"Rejected connection: {e}")
+        await websocket.close(code=1003)
+        return
+
+    try:
+        # Queued calls wait in the handshake; rejected ones never build a pipeline
+        async with sessions.admit(practice_id):
+            await websocket.accept()
+            logger.info("WebSocket connection accepted")
+            await _run_session(websocket, audio_format, practice_id, caller)
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected connection (practice {practice_id or '-'}): {e.reason}")
+        # Closing before accept() would answer the handshake with HTTP 403; accept so the caller sees 1013
+        await websocket.accept()
+        await websocket.close(code=1013, reason=e.reason) # Try again later
+
+
+async def _run_session(websocket: WebSocket, audio_format: "AudioFormat", practice_id: str, caller: Optional[str]):
+    from app.voice_engine.pipeline import VoicePipeline
+    pipeline = VoicePipeline(audio_format, _practice_number(practice_id), caller, websocket)
+
     try:
         await pipeline.start()
-        
+
         while True:
-            data = await websocket.receive_bytes()
-            # Feed audio to the pipeline
-            await pipeline.process_audio_chunk(data)
-            
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=settings.SESSION_IDLE_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                # Abandoned call: the client stopped sending audio without closing
+                await _reap(websocket, "idle")
+                break
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes") is not None:
+                # Feed audio to the pipeline
+                await pipeline.process_audio_chunk(message["bytes"])
+            elif message.get("text"):
+                data = json.loads(message["text"])
+                if data.get("event") == "media":
+                    sequence = data.get("sequenceNumber")
+                    await pipeline.process_audio_chunk(
+                        base64.b64decode(data["media"]["payload"]),
+                        int(sequence) if sequence is not None else None
+                    )
+                elif data.get("event") == "stop":
+                    break
+
+            if pipeline.silent_for() > settings.SESSION_SILENCE_TIMEOUT_S:
+                # Line still open but nobody has spoken for a long time
+                await _reap(websocket, "silence")
+                break
+
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
     except Exception as e:
@@ -28,3 +100,29 @@ async def websocket_endpoint(websocket: WebSocket):
     finally:
         await pipeline.terminate()
         logger.info("Pipeline terminated")
+        call_log_writer.submit(_call_record(pipeline, practice_id))
+
+
+def _practice_number(practice_id: str) -> Optional[int]:
+    return int(practice_id) if practice_id.isdigit() else None
+
+
+def _call_record(pipeline: "VoicePipeline", practice_id: str) -> CallRecord:
+    latencies = pipeline.tracer.latencies
+    return CallRecord(
+        session_id=pipeline.session_id,
+        practice_id=_practice_number(practice_id),
+        created_at=pipeline.started_at,
+        duration=round(time.monotonic() - pipeline.started_monotonic),
+        transcript_summary=pipeline.llm.history.transcript(settings.CALL_LOG_TRANSCRIPT_MAX_CHARS) or None,
+        turn_timings=[{"turn": turn, **latencies[turn]} for turn in sorted(latencies)],
+    )
+
+
+async def _reap(websocket: WebSocket, reason: str):
+    logger.info(f"Closing {reason} session")
+    metrics.increment("voice_sessions_reaped_total", 1, "Sessions closed by the idle/silence timeouts", reason=reason)
+    try:
+        await websocket.close(code=1000, reason=reason)
+    except RuntimeError:
+        pass # Client went away at the same time
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -8,14 +8,121 @@ class Settings(BaseSettings):
     # Security
     HIPAA_MODE: bool = True
     SECRET_KEY: str = "changelethis"
-    ENCRYPTION_KEY: str
+    ENCRYPTION_KEY: str # Fernet key(s), comma-separated: the first encrypts, all decrypt (rotation)
+    ENCRYPTION_POOL: str = "thread" # Where large decrypt batches run: thread | process
+    ENCRYPTION_POOL_WORKERS: int = 0 # 0 = one per core
+    ENCRYPTION_OFFLOAD_MIN_ROWS: int = 256 # Smaller batches are decrypted inline
+    BLIND_INDEX_KEY: str = "" # HMAC key for searchable fields (patient phone), separate from ENCRYPTION_KEY; checked on first use
+    PHONE_DEFAULT_COUNTRY_CODE: str = "1" # Assumed for national numbers stored or dialed without one
+    PHONE_NATIONAL_DIGITS: int = 10 # Length of a national number in that country (10 for +1)
+    ADMIN_API_TOKEN: str = "" # Bearer token for admin endpoints (call export, PUT /logging/levels); empty disables them
     DATABASE_URL: str
     
-    # API Keys (Critical)
-    DEEPGRAM_API_KEY: str
-    GROQ_API_KEY: str
-    ELEVENLABS_API_KEY: str
+    # API Keys (Critical; missing ones are logged at startup and fail calls, not the process)
+    DEEPGRAM_API_KEY: str = ""
+    GROQ_API_KEY: str = ""
+    ELEVENLABS_API_KEY: str = ""
     
+    # Provider Endpoints (overridable to point at local stand-ins, see scripts/load_benchmark.py)
+    DEEPGRAM_WS_URL: str = "wss://api.deepgram.com/v1/listen"
+    GROQ_BASE_URL: Optional[str] = None # SDK default
+    ELEVENLABS_WS_URL: str = "wss://api.elevenlabs.io"
+    ELEVENLABS_VOICE_ID: str = "21m00Tcm4TlvDq8ikWAM" # Default: Rachel. Replace with Dental Receptionist ID later.
+    ELEVENLABS_MODEL_ID: str = "eleven_turbo_v2_5"
+    
+    # Provider Connection Pool (process-wide, warmed at startup)
+    PROVIDER_POOL_ENABLED: bool = True
+    PROVIDER_POOL_SIZE: int = 2 # Warm websockets kept per provider
+    PROVIDER_POOL_MAX_IDLE_S: float = 60.0 # Recycle warm sockets older than this
+    
+    # Voice Pipeline
+    TTS_ENABLED: bool = False
+    BARGE_IN_TARGET_MS: int = 150 # Caller speech onset -> pipeline silent
+    LLM_SPECULATIVE_ENABLED: bool = False # Start generating on stable interim transcripts
+    LLM_SPECULATION_STABLE_MS: int = 150 # Interim text unchanged this long counts as stable
+    LLM_SPECULATION_MATCH_THRESHOLD: float = 0.9 # Final vs predicted similarity needed to commit
+    LLM_HISTORY_TOKEN_BUDGET: int = 1500 # Estimated prompt tokens for summary + recent turns
+    LLM_SUMMARY_MODEL: str = "llama3-8b-8192" # Folds older turns into the running summary
+    TTS_CHUNK_MAX_CHARS: int = 200 # Phrase chunker: flush at a word boundary past this size
+    TTS_CHUNK_MAX_WAIT_MS: int = 400 # Phrase chunker: flush text buffered longer than this
+    TTS_CHUNK_MIN_CLAUSE_CHARS: int = 30 # Phrase chunker: shortest clause sent on its own (after the first)
+    TTS_CACHE_ENABLED: bool = True # Serve recurring phrases from cached audio
+    TTS_CACHE_MEMORY_MB: int = 64 # Per-process LRU budget
+    TTS_CACHE_SEGMENT_PATH: str = "data/tts_cache.seg" # Shared mmap store, built by scripts/prewarm_tts_cache.py
+    TTS_KEEPALIVE_S: float = 10.0 # Keepalive cadence on a call's idle ElevenLabs socket (closed after ~20s idle)
+    
+    # Local VAD in front of Deepgram
+    VAD_ENABLED: bool = True # Don't stream long silences to Deepgram
+    VAD_THRESHOLD_DB: float = -45.0 # Frame energy (dBFS) above which a frame may be speech
+    VAD_ZCR_MAX: float = 0.35 # Zero-crossing rate above which quiet frames count as noise
+    VAD_ONSET_MS: int = 60 # Speech needed to open the gate
+    VAD_PREROLL_MS: int = 300 # Audio before the onset sent along with it
+    VAD_HANGOVER_MS: int = 1000 # Silence still sent after speech (must exceed Deepgram endpointing)
+    DEEPGRAM_KEEPALIVE_S: float = 5.0 # KeepAlive cadence while the VAD holds audio back
+
+    # STT stream recovery
+    STT_REPLAY_BUFFER_MS: int = 10000 # Audio without a final result kept to replay on a new socket
+    STT_STALL_TIMEOUT_S: float = 1.0 # Audio unanswered this long gets the socket pinged, no pong within it = stalled
+    STT_RECONNECT_ATTEMPTS: int = 5 # New sockets in a row that fail or close before answering; then the worker restarts
+    STT_RECONNECT_BACKOFF_S: float = 0.05 # Doubles per failed attempt
+
+    # Crashed pipeline workers are restarted with exponential backoff
+    WORKER_RESTART_BACKOFF_S: float = 0.1
+    WORKER_RESTART_BACKOFF_MAX_S: float = 5.0
+    WORKER_PROCESS_SAMPLE_RATE: float = 0.05 # Fraction of queue items timed into voice_worker_process_ms
+
+    # Pipeline queue bounds (items); overflow policy is fixed per stage
+    AUDIO_INPUT_QUEUE_SIZE: int = 250 # ~5s of 20ms frames, drop-oldest
+    TRANSCRIPT_QUEUE_SIZE: int = 32 # Interim results coalesce
+    SYNTHESIS_QUEUE_SIZE: int = 512 # LLM tokens, blocks the LLM when full
+    AUDIO_OUTPUT_QUEUE_SIZE: int = 500 # Drop-oldest so a stalled listener skips ahead
+
+    # Audio back to the caller
+    OUTPUT_FRAME_MS: int = 20 # Binary websocket frame size (wire format audio)
+    OUTPUT_JITTER_BUFFER_MS: int = 100 # Audio sent ahead of real time, the client's playout buffer
+    
+    # Admission control and idle reaping (/ws/conversation, limits are per worker process)
+    SESSION_MAX_ACTIVE: int = 200 # Concurrent calls
+    SESSION_MAX_PER_PRACTICE: int = 20 # Concurrent calls per ?practice_id
+    SESSION_QUEUE_SIZE: int = 50 # Calls held in the handshake waiting for a slot; beyond this reject at once
+    SESSION_QUEUE_TIMEOUT_S: float = 5.0 # Longest wait for a slot before rejecting (close 1013)
+    SESSION_IDLE_TIMEOUT_S: float = 30.0 # Close when the client sends nothing for this long
+    SESSION_SILENCE_TIMEOUT_S: float = 120.0 # Close when neither side has spoken for this long
+
+    # Call log persistence (batched, off the call path)
+    CALL_LOG_ENABLED: bool = True
+    CALL_LOG_BATCH_SIZE: int = 100 # Rows per multi-row INSERT
+    CALL_LOG_FLUSH_INTERVAL_S: float = 2.0 # Longest a record waits for its batch to fill
+    CALL_LOG_BUFFER_SIZE: int = 5000 # Records held in memory; beyond this they go to the spill file
+    CALL_LOG_WRITE_TIMEOUT_S: float = 5.0 # Batches slower than this are spilled to disk instead
+    CALL_LOG_SPILL_PATH: str = "data/call_logs.spill.jsonl" # Encrypted lines, replayed once the database takes writes again
+    CALL_LOG_TRANSCRIPT_MAX_CHARS: int = 4000
+
+    # Appointment availability
+    PMS_BACKEND: str = "mock" # mock | database
+    AVAILABILITY_SLOT_MINUTES: int = 15 # Scheduling grid
+    AVAILABILITY_CACHE_TTL_S: float = 300.0 # Reload a practice's index after this (picks up outside bookings)
+    AVAILABILITY_MIN_LEAD_MINUTES: int = 60 # Earliest offered slot, from now
+
+    # LLM tool calling (scheduling)
+    TOOLS_ENABLED: bool = False # The assistant confirms bookings to callers: enable with a real PMS_BACKEND
+    TOOLS_TIMEOUT_S: float = 3.0 # Per tool call; a slow PMS comes back to the model as an error
+    TOOLS_MAX_ROUNDS: int = 3 # Tool round trips per turn before the model has to answer
+    TOOLS_FILLER_PHRASE: str = "Let me check that for you." # Spoken while tools run ("" = none); keep it in tts_phrases.txt
+    TOOLS_DEFAULT_PRACTICE_ID: int = 1 # For calls without ?practice_id
+    TOOLS_PREFETCH_DAYS: int = 14 # Availability loaded once an interim transcript sounds like scheduling
+
+    # Multi-process server (python -m app.server)
+    SERVER_WORKERS: int = 0 # Worker processes; 0 = one per core
+    SERVER_DRAIN_TIMEOUT_S: float = 300.0 # Max wait for live calls when a worker drains (reload/shutdown)
+    
+    # Logging (levels can also be changed at runtime: PUT /logging/levels)
+    LOG_LEVEL: str = "INFO"
+    LOG_MODULE_LEVELS: Dict[str, str] = {} # Per module prefix, e.g. {"app.voice_engine.workers.transcriber": "DEBUG"}
+    LOG_QUEUE_SIZE: int = 10000 # Records waiting for the writer thread; beyond this they're dropped and counted
+    LOG_SAMPLE_RATES: Dict[str, float] = {"interim_transcript": 0.1} # Fraction of a category's events logged
+    LOG_RATE_LIMITS: Dict[str, float] = {"interim_transcript": 20, "vad_speech": 50, "frame_stats": 5, "turn_text": 100} # Per second, per process
+
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000"]
 
@@ -1,4 +1,7 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import threading
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
@@ -10,13 +13,30 @@ database_url = settings.DATABASE_URL
 if database_url and database_url.startswith("postgresql://"):
     database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-# 3. Create the Async Engine
-engine = create_async_engine(database_url, echo=False, future=True)
+# 3. The Async Engine is created on first use: that imports the driver and dialect,
+# which a new process shouldn't wait for before it can answer health checks
+_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock() # warm_up() creates it in a thread
+
+def get_engine() -> AsyncEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_async_engine(database_url, echo=False, future=True)
+    return _engine
 
 # 4. Create the Session
-async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+_session_factory = sessionmaker(class_=AsyncSession, expire_on_commit=False)
+
+def async_session(**kwargs) -> AsyncSession:
+    return _session_factory(bind=get_engine(), **kwargs)
+
+async def warm_up():
+    """Creates the engine off the event loop and opens a pooled connection for the first request."""
+    engine = await asyncio.to_thread(get_engine)
+    async with engine.connect():
+        pass
 
 # 5. Dependency for API endpoints
 async def get_db():
@@ -1,18 +1,271 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import re
 import sys
+import threading
+import time
+import traceback
+from collections import defaultdict
+from typing import Any, Dict, List, Match, Optional, TextIO
 from loguru import logger
 from app.core.config import settings
+from app.core.metrics import metrics
+
+# PII masked in every log message, in one pass. Each match starts with the character before
+# the PII (put back by _mask): a character class first lets the regex engine skip ahead
+# through words instead of trying every alternative at every position.
+# Phones match with or without separators (5551234567 too). Bare digits are left alone
+# where they are known not to be phones: values of id/timestamp keys (session_id=...,
+# "ts": ..., but not caller_id or patient_id) and float timestamps (1760790000.25).
+PII_PATTERN = re.compile(
+    r"(?P<lead>[^\w.])(?:"
+    r"(?P<ssn>\d{3}-\d{2}-\d{4}\b)"
+    r"|(?P<email>[A-Za-z0-9._%+-]++@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)"
+    r"|(?P<phone>(?:\+?1[-. ]?)?(?:\(\d{3}\) ?|\d{3}[-. ]?)\d{3}[-. ]?(?P<last4>\d{4})\b(?!\.\d))"
+    r"|(?P<digits>(?:\+|%2B)\d{6,11}(?P<digits_last4>\d{4})\b))"
+)
+# Checked against the text just before bare phone-shaped digits
+_NOT_PHONE_KEY = re.compile(r"""(?:(?:\b|(?<!caller)(?<!patient)_)id|(?:\b|_)ts|time|stamp|_at)["']? ?[:=] ?["']?$""")
+
+
+def _mask(match: Match) -> str:
+    if match.group("ssn"):
+        masked = "XXX-XX-XXXX"
+    elif match.group("email"):
+        masked = "[REDACTED_EMAIL]"
+    else: # Phones keep the last 4 digits
+        phone = match.group("phone")
+        if phone and phone.isdigit() and _NOT_PHONE_KEY.search(match.string, max(0, match.start() - 16), match.end("lead")):
+            return match.group(0)
+        masked = f"XXX-XXX-{match.group('last4') or match.group('digits_last4')}"
+    return match.group("lead") + masked
+
+
+def redact(text: str) -> str:
+    """Masks SSNs, email addresses and phone numbers."""
+    return PII_PATTERN.sub(_mask, " " + text)[1:] # The space lets PII at the very start match
+
+
+def _redact_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return redact(value)
+    if isinstance(value, dict):
+        return {key: _redact_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact_value(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return redact(str(value))
+
+
+class LogWriter:
+    """
+    Loguru sink that only enqueues the record; a writer thread masks PII in its
+    message, exception and extra values, formats it (JSON in HIPAA mode) and writes it. Nothing but a put_nowait happens on the
+    event loop. The queue holds LOG_QUEUE_SIZE records: if the writer can't keep up,
+    new records are dropped and counted instead of stalling the loop.
+    """
+    def __init__(self, stream: TextIO, serialize: bool, maxsize: int):
+        self.stream = stream
+        self.serialize = serialize
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, message: Any):
+        try:
+            self.queue.put_nowait(message.record)
+        except queue.Full:
+            self.dropped += 1
+
+    def drain(self):
+        """Blocks until everything queued so far is written. (Not flush(): loguru calls that after every write.)"""
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 256:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.stream.write("".join(self._format(record) for record in batch))
+                self.stream.flush()
+            except Exception as e:
+                sys.__stderr__.write(f"Log writer failed: {e!r}\n")
+            for _ in batch:
+                self.queue.task_done()
+
+    def _format(self, record: Dict[str, Any]) -> str:
+        # Masked before encoding: once JSON-escaped, PII after a newline ("\\n555...") no longer looks like PII
+        message = redact(record["message"])
+        error = None
+        if record["exception"] is not None:
+            error = redact("".join(traceback.format_exception(*record["exception"])))
+        if self.serialize:
+            return json.dumps({
+                "time": record["time"].isoformat(),
+                "level": record["level"].name,
+                "name": record["name"],
+                "function": record["function"],
+                "line": record["line"],
+                "message": message,
+                "extra": _redact_value(record["extra"]),
+                "exception": error,
+            }, default=str) + "\n"
+        line = f"{record['time'].isoformat()} | {record['level'].name} | {message}\n"
+        return line + error if error else line
+
+    def render_metrics(self) -> List[str]:
+        return [
+            "# TYPE log_records_dropped_total counter",
+            f"log_records_dropped_total {self.dropped}",
+            "# TYPE log_queue_depth gauge",
+            f"log_queue_depth {self.queue.qsize()}",
+        ]
+
+
+class LogLevels:
+    """
+    Minimum level per module prefix (longest prefix wins, else LOG_LEVEL), checked
+    by the handler's filter and changeable at runtime with set().
+    """
+    def __init__(self, default: str, modules: Dict[str, str]):
+        self.default = default
+        self.modules: Dict[str, str] = {}
+        self.resolved: Dict[Optional[str], int] = {} # Module name -> level number, filled on first use
+        self.set(default, modules)
+
+    def set(self, default: Optional[str] = None, modules: Optional[Dict[str, str]] = None):
+        """Updates levels; a module set to "" goes back to the default. Raises ValueError for unknown levels."""
+        default = (default or self.default).upper()
+        updated = dict(self.modules)
+        for module, level in (modules or {}).items():
+            if level:
+                updated[module] = level.upper()
+            else:
+                updated.pop(module, None)
+        for level in (default, *updated.values()):
+            logger.level(level) # Raises ValueError if unknown
+        self.default, self.modules = default, updated
+        self.resolved = {}
+
+    def minimum(self) -> int:
+        return min(logger.level(level).no for level in (self.default, *self.modules.values()))
+
+    def allows(self, record: Dict[str, Any]) -> bool:
+        name = record["name"]
+        level = self.resolved.get(name)
+        if level is None:
+            match = max((m for m in self.modules if name and (name == m or name.startswith(m + "."))), key=len, default=None)
+            level = self.resolved[name] = logger.level(self.modules[match] if match else self.default).no
+        return record["level"].no >= level
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"default": self.default, "modules": dict(self.modules)}
+
+
+class LogSampler:
+    """
+    Sampling (LOG_SAMPLE_RATES) and a per-second rate limit (LOG_RATE_LIMITS) for
+    categories of high-frequency log events. Check it before building the message:
+        if log_sampler.allow("interim_transcript"):
+            logger.debug(f"...")
+    """
+    def __init__(self):
+        self.tokens: Dict[str, float] = {}
+        self.refilled_at: Dict[str, float] = {}
+        self.suppressed: Dict[str, int] = defaultdict(int)
+
+    def allow(self, category: str) -> bool:
+        rate = settings.LOG_SAMPLE_RATES.get(category, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            self.suppressed[category] += 1
+            return False
+        limit = settings.LOG_RATE_LIMITS.get(category)
+        if limit is None:
+            return True
+
+        # Token bucket holding up to one second of events
+        now = time.monotonic()
+        tokens = min(limit, self.tokens.get(category, limit) + (now - self.refilled_at.get(category, now)) * limit)
+        self.refilled_at[category] = now
+        if tokens < 1:
+            self.tokens[category] = tokens
+            self.suppressed[category] += 1
+            return False
+        self.tokens[category] = tokens - 1
+        return True
+
+    def render_metrics(self) -> List[str]:
+        lines = ["# TYPE log_records_suppressed_total counter"]
+        for category, count in sorted(self.suppressed.items()):
+            lines.append(f'log_records_suppressed_total{{category="{category}"}} {count}')
+        return lines
+
+
+class InterceptHandler(logging.Handler):
+    """Hands stdlib logging records (uvicorn, SQLAlchemy, ...) to loguru, and so to the log writer."""
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        logger.opt(depth=6, exception=record.exc_info).log(level, record.getMessage())
+
+
+log_levels = LogLevels(settings.LOG_LEVEL, settings.LOG_MODULE_LEVELS)
+log_sampler = LogSampler()
+metrics.register_collector(log_sampler.render_metrics)
+_writer: Optional[LogWriter] = None
+_handler_id: Optional[int] = None
+
 
 def setup_logging():
+    global _writer
     logger.remove()
     
     # JSON formatting for production/HIPAA audit trails
-    logger.add(
-        sys.stderr,
-        format="{time} | {level} | {message}",
-        level="INFO",
-        serialize=settings.HIPAA_MODE # JSON logs in HIPAA mode
-    )
+    _writer = LogWriter(sys.stderr, serialize=settings.HIPAA_MODE, maxsize=settings.LOG_QUEUE_SIZE)
+    metrics.register_collector(_writer.render_metrics)
+    atexit.register(_writer.drain)
+    _add_handler()
+
+    # Stdlib loggers, including uvicorn's access log (request paths carry query strings)
+    logging.basicConfig(handlers=[InterceptHandler()], level=log_levels.minimum(), force=True)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        std_logger = logging.getLogger(name)
+        std_logger.handlers = [InterceptHandler()]
+        std_logger.propagate = False
     
     logger.info("Logging initialized", hipaa_mode=settings.HIPAA_MODE)
 
-# TODO: Add PII sanitization sink
+
+def _add_handler():
+    # The handler's level is the lowest one configured, so loguru skips building
+    # records nobody wants; the filter applies the per-module levels
+    global _handler_id
+    old_id = _handler_id
+    _handler_id = logger.add(_writer, level=log_levels.minimum(), filter=log_levels.allows, format="{message}")
+    if old_id is not None:
+        logger.remove(old_id)
+
+
+def set_log_levels(default: Optional[str] = None, modules: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Changes levels at runtime. Raises ValueError for unknown level names."""
+    log_levels.set(default, modules)
+    if _writer is not None:
+        _add_handler()
+    logging.getLogger().setLevel(log_levels.minimum())
+    return log_levels.snapshot()
+
+
+def flush_logging():
+    if _writer is not None:
+        _writer.drain()
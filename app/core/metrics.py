@@ -0,0 +1,143 @@
+import asyncio
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+class LatencyHistogram:
+    """
+    HdrHistogram-style log-linear histogram.
+    Values are recorded in microseconds into buckets with a fixed relative
+    error (~1% with 7 sub-bucket bits), so record() is O(1) and memory stays
+    small no matter how many samples arrive.
+    """
+    def __init__(self, name: str, description: str, labels: Optional[Dict[str, str]] = None, sub_bucket_bits: int = 7):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def _index(self, value_us: int) -> int:
+        shift = max(value_us.bit_length() - self.sub_bucket_bits, 0)
+        return (shift << self.sub_bucket_bits) + (value_us >> shift)
+
+    def _value(self, index: int) -> int:
+        """Midpoint of the bucket at `index`, in microseconds."""
+        shift = index >> self.sub_bucket_bits
+        base = (index & ((1 << self.sub_bucket_bits) - 1)) << shift
+        return base + ((1 << shift) >> 1)
+
+    def record(self, value_ms: float):
+        value_us = max(int(value_ms * 1000), 0)
+        self.counts[self._index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def percentile(self, quantile: float) -> float:
+        """Value in ms at `quantile` (0-1)."""
+        if not self.count:
+            return 0.0
+        target = max(int(quantile * self.count + 0.5), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._value(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": (self.total_us / self.count / 1000) if self.count else 0.0,
+            "max": self.max_us / 1000,
+            **{f"p{q * 100:g}": self.percentile(q) for q in QUANTILES},
+        }
+
+
+class MetricsRegistry:
+    """Process-wide latency histograms, counters and gauges, rendered in Prometheus text format."""
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], LatencyHistogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self.descriptions: Dict[str, str] = {}
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def histogram(self, name: str, description: str = "", **labels: str) -> LatencyHistogram:
+        key = (name, tuple(sorted(labels.items())))
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = LatencyHistogram(name, description, labels)
+            self.histograms[key] = hist
+            if description:
+                self.descriptions[name] = description
+        return hist
+
+    def observe(self, name: str, value_ms: float, description: str = "", **labels: str):
+        self.histogram(name, description, **labels).record(value_ms)
+
+    def increment(self, name: str, value: float = 1, description: str = "", **labels: str):
+        self.counters[(name, tuple(sorted(labels.items())))] += value
+        if description:
+            self.descriptions[name] = description
+
+    def register_collector(self, collector: Callable[[], List[str]]):
+        """Adds a callable returning extra exposition lines (gauges, counters)."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        by_name: Dict[str, List[LatencyHistogram]] = defaultdict(list)
+        for hist in self.histograms.values():
+            by_name[hist.name].append(hist)
+
+        for name, hists in sorted(by_name.items()):
+            lines.append(f"# HELP {name} {self.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} summary")
+            for hist in hists:
+                for q in QUANTILES:
+                    lines.append(f"{name}{_labels(hist.labels, quantile=str(q))} {hist.percentile(q):.3f}")
+                lines.append(f"{name}_sum{_labels(hist.labels)} {hist.total_us / 1000:.3f}")
+                lines.append(f"{name}_count{_labels(hist.labels)} {hist.count}")
+
+        counters: Dict[str, List[Tuple[Dict[str, str], float]]] = defaultdict(list)
+        for (name, labels), value in self.counters.items():
+            counters[name].append((dict(labels), value))
+        for name, samples in sorted(counters.items()):
+            lines.append(f"# HELP {name} {self.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {value:g}")
+
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Dict[str, str], **extra: str) -> str:
+    merged = {**labels, **extra}
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in merged.items()) + "}"
+
+metrics = MetricsRegistry()
+
+
+async def monitor_event_loop_lag(interval: float = 0.05):
+    """
+    Samples how late the event loop wakes a sleeping task.
+    Lag on the loop that runs the voice pipelines is heard by callers as audio gaps.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        metrics.observe(
+            "event_loop_lag_ms", max(loop.time() - expected, 0.0) * 1000,
+            "Event loop wake-up delay"
+        )
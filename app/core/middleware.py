@@ -1,49 +1,37 @@
-import re
 import time
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
 from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class LogRedactorMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
-        # Regex patterns for PII
-        self.ssn_pattern = re.compile(r'\b\d{3}-\d{2}-\d{4}\b')
-        self.email_pattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
-        self.phone_pattern = re.compile(r'\b(?:\+?1[-.]?)?\(?([0-9]{3})\)?[-. ]?([0-9]{3})[-. ]?([0-9]{4})\b')
+class LogRedactorMiddleware:
+    """
+    Logs each HTTP request's method, path, status and duration.
+    Plain ASGI: no per-request task or response stream wrapping. Query strings
+    can carry PII (?phone=, ?caller=); it's masked by the logging sink, like
+    every other log line (see app.core.logging).
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-    def redact(self, text: str) -> str:
-        """Redacts PII from text."""
-        if not text:
-            return text
-            
-        # Mask SSN
-        text = self.ssn_pattern.sub('XXX-XX-XXXX', text)
-        
-        # Mask Email
-        text = self.email_pattern.sub('[REDACTED_EMAIL]', text)
-        
-        # Mask Phone (keep last 4)
-        def mask_phone(match):
-            return f"XXX-XXX-{match.group(3)}"
-        text = self.phone_pattern.sub(mask_phone, text)
-        
-        return text
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-        
-        # We can't easily read the request body without consuming it, 
-        # so we primarily log the URL and method here.
-        # Use a binding to ensure redaction in context if needed.
-        
-        url_path = self.redact(str(request.url))
-        logger.info(f"Incoming Request: {request.method} {url_path}")
-        
-        response = await call_next(request)
-        
-        process_time = time.time() - start_time
-        logger.info(f"Request completed: {request.method} {url_path} - Status: {response.status_code} - Duration: {process_time:.4f}s")
-        
-        return response
+        start_time = time.perf_counter()
+        query = scope.get("query_string", b"")
+        url_path = scope["path"] + ("?" + query.decode("latin-1") if query else "")
+        method = scope["method"]
+        logger.info(f"Incoming Request: {method} {url_path}")
+
+        status_code = 500 # If the app fails before starting a response
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            process_time = time.perf_counter() - start_time
+            logger.info(f"Request completed: {method} {url_path} - Status: {status_code} - Duration: {process_time:.4f}s")
@@ -1,8 +1,37 @@
-from cryptography.fernet import Fernet
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence
+from cryptography.fernet import Fernet, MultiFernet
+from fastapi import Header, HTTPException
 from app.core.config import settings
 
-def get_fernet() -> Fernet:
-    return Fernet(settings.ENCRYPTION_KEY)
+_NON_DIGITS = re.compile(r"\D")
+
+@lru_cache(maxsize=1)
+def get_fernet() -> MultiFernet:
+    """
+    Cipher for ENCRYPTION_KEY, built once per process. ENCRYPTION_KEY may list
+    several comma-separated keys: the first encrypts, all of them decrypt, so a
+    new key can be put first and old data re-encrypted with scripts/reencrypt_pii.py.
+    """
+    keys = [key.strip() for key in settings.ENCRYPTION_KEY.split(",") if key.strip()]
+    return MultiFernet([Fernet(key) for key in keys])
+
+def require_admin_token(authorization: str = Header("")):
+    """
+    Dependency for admin endpoints: needs "Authorization: Bearer <ADMIN_API_TOKEN>".
+    Without a token configured they are off.
+    """
+    if not settings.ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="ADMIN_API_TOKEN is not set")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {settings.ADMIN_API_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid token")
 
 def encrypt_value(value: str) -> str:
     """Encrypts a string value using Fernet."""
@@ -17,3 +46,81 @@ def decrypt_value(value: str) -> str:
         return value
     f = get_fernet()
     return f.decrypt(value.encode()).decode()
+
+def decrypt_batch(values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    f = get_fernet()
+    return [f.decrypt(value.encode()).decode() if value else value for value in values]
+
+def rotate_batch(values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """Re-encrypts tokens under the primary (first) key."""
+    f = get_fernet()
+    return [f.rotate(value.encode()).decode() if value else value for value in values]
+
+def _pool_workers() -> int:
+    return settings.ENCRYPTION_POOL_WORKERS or os.cpu_count() or 1
+
+@lru_cache(maxsize=1)
+def _crypto_pool() -> Executor:
+    workers = _pool_workers()
+    if settings.ENCRYPTION_POOL == "process":
+        # Spawned workers import this module fresh and build their own cipher
+        return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    return ThreadPoolExecutor(workers, thread_name_prefix="crypto")
+
+async def _offload(fn: Callable[[Sequence[Optional[str]]], List[Optional[str]]], values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """Runs fn over values; large batches are split across the crypto pool to keep the event loop free."""
+    if len(values) < settings.ENCRYPTION_OFFLOAD_MIN_ROWS:
+        return fn(values)
+    loop = asyncio.get_running_loop()
+    pool = _crypto_pool()
+    # A couple of parts per worker, none smaller than the inline threshold
+    size = max(settings.ENCRYPTION_OFFLOAD_MIN_ROWS, -(-len(values) // (_pool_workers() * 2)))
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, fn, values[i:i + size]) for i in range(0, len(values), size)
+    ))
+    return [value for part in parts for value in part]
+
+async def decrypt_many(values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """Decrypts a result set's worth of tokens, off the event loop when there are many."""
+    return await _offload(decrypt_batch, values)
+
+async def rotate_many(values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    return await _offload(rotate_batch, values)
+
+def normalize_phone(value: str) -> Optional[str]:
+    """
+    E.164 form of a phone number ("+15551234567"), or None if it can't be one.
+    National numbers (PHONE_NATIONAL_DIGITS long, after a trunk 0) get
+    PHONE_DEFAULT_COUNTRY_CODE; other numbers of 11-15 digits are taken as
+    international already, with or without the "+" (447911123456).
+    """
+    if not value:
+        return None
+    value = value.strip()
+    digits = _NON_DIGITS.sub("", value)
+    if value.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:] # International dialing prefix
+    elif len(digits) == settings.PHONE_NATIONAL_DIGITS:
+        digits = settings.PHONE_DEFAULT_COUNTRY_CODE + digits
+    elif len(digits) == settings.PHONE_NATIONAL_DIGITS + 1 and digits.startswith("0"):
+        digits = settings.PHONE_DEFAULT_COUNTRY_CODE + digits[1:]
+    elif len(digits) < 11:
+        return None # Too short to be international, wrong length to be national
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+def blind_index(value: str) -> Optional[str]:
+    """
+    Deterministic keyed HMAC of a normalized phone number, for equality lookups on
+    an encrypted column. Uses BLIND_INDEX_KEY, which is independent of ENCRYPTION_KEY
+    (changing it means re-running scripts/backfill_phone_index.py --all).
+    """
+    phone = normalize_phone(value)
+    if phone is None:
+        return None
+    if not settings.BLIND_INDEX_KEY:
+        raise RuntimeError("BLIND_INDEX_KEY is not set; phone numbers can't be indexed or looked up")
+    return hmac.new(settings.BLIND_INDEX_KEY.encode(), phone.encode(), hashlib.sha256).hexdigest()
@@ -0,0 +1,140 @@
+import asyncio
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class AdmissionRejected(Exception):
+    """Raised when a call can't get a session slot (limit reached, queue full or wait timed out)."""
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class SessionLimiter:
+    """
+    Admission control for /ws/conversation sessions in this process.
+    A call gets a slot if both the global (SESSION_MAX_ACTIVE) and its practice's
+    (SESSION_MAX_PER_PRACTICE) limits allow it; calls without a practice_id only count
+    toward the global limit. Otherwise it waits in a bounded FIFO
+    queue for up to SESSION_QUEUE_TIMEOUT_S, or is rejected at once if the queue is full.
+
+    Limits are per process. Under app.server the active count is mirrored into
+    shared memory so the supervisor can place calls on the least-loaded worker and
+    knows when a draining worker is done.
+    """
+    def __init__(self):
+        self.max_active = settings.SESSION_MAX_ACTIVE
+        self.max_per_practice = settings.SESSION_MAX_PER_PRACTICE
+        self.queue_size = settings.SESSION_QUEUE_SIZE
+
+        self.active = 0
+        self.by_practice: Dict[str, int] = defaultdict(int)
+        self.waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+        self.worker_id = "0"
+        self._shared: Optional[Any] = None # multiprocessing RawValue('i')
+
+    def bind_shared(self, worker_id: int, shared: Any):
+        self.worker_id = str(worker_id)
+        self._shared = shared
+
+    @asynccontextmanager
+    async def admit(self, practice_id: str = "") -> AsyncIterator[None]:
+        """Holds a session slot for the duration of the block. Raises AdmissionRejected."""
+        await self._acquire(practice_id)
+        try:
+            yield
+        finally:
+            self._release(practice_id)
+
+    def _can_admit(self, practice_id: str) -> bool:
+        if self.active >= self.max_active:
+            return False
+        return not practice_id or self.by_practice.get(practice_id, 0) < self.max_per_practice
+
+    async def _acquire(self, practice_id: str):
+        # Waiters only remain queued while the global limit or their own practice's
+        # limit is hit, so a call that fits now doesn't jump ahead of anyone it could block
+        if self._can_admit(practice_id):
+            self._take(practice_id)
+            return
+        if len(self.waiters) >= self.queue_size:
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append((practice_id, waiter))
+        try:
+            # The slot is taken on our behalf by _release() before the future resolves
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=settings.SESSION_QUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self.waiters.remove((practice_id, waiter))
+                self._reject("queue_timeout")
+        except asyncio.CancelledError:
+            if waiter.done():
+                self._release(practice_id)
+            else:
+                self.waiters.remove((practice_id, waiter))
+            raise
+
+    def _take(self, practice_id: str):
+        self.active += 1
+        if practice_id:
+            self.by_practice[practice_id] += 1
+        self._publish()
+
+    def _release(self, practice_id: str):
+        self.active -= 1
+        if practice_id:
+            self.by_practice[practice_id] -= 1
+            if not self.by_practice[practice_id]:
+                del self.by_practice[practice_id]
+
+        # Hand freed capacity to the oldest waiters whose practice is under its limit
+        for entry in list(self.waiters):
+            waiting_practice, waiter = entry
+            if not self._can_admit(waiting_practice):
+                if self.active >= self.max_active:
+                    break
+                continue
+            self.waiters.remove(entry)
+            self._take(waiting_practice)
+            waiter.set_result(None)
+        self._publish()
+
+    def _reject(self, reason: str):
+        metrics.increment("voice_sessions_rejected_total", 1, "Calls refused by admission control", reason=reason)
+        raise AdmissionRejected(reason)
+
+    def _publish(self):
+        if self._shared is not None:
+            self._shared.value = self.active
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Live counts for autoscaling."""
+        return {
+            "worker": self.worker_id,
+            "active": self.active,
+            "waiting": len(self.waiters),
+            "capacity": self.max_active,
+            "utilization": round(self.active / self.max_active, 3) if self.max_active else 1.0,
+            "practices": dict(self.by_practice),
+        }
+
+    def render_metrics(self) -> List[str]:
+        worker = f'worker="{self.worker_id}"'
+        return [
+            "# TYPE voice_active_sessions gauge",
+            f"voice_active_sessions{{{worker}}} {self.active}",
+            "# TYPE voice_waiting_sessions gauge",
+            f"voice_waiting_sessions{{{worker}}} {len(self.waiters)}",
+            "# TYPE voice_session_capacity gauge",
+            f"voice_session_capacity{{{worker}}} {self.max_active}",
+        ]
+
+
+sessions = SessionLimiter()
+metrics.register_collector(sessions.render_metrics)
@@ -0,0 +1,52 @@
+"""
+Work kept out of import and lifespan startup so a new process answers health
+checks as soon as it listens (autoscaling), then loads the voice engine and
+warms provider and database connections in the background.
+"""
+import asyncio
+import importlib
+import sys
+import time
+from loguru import logger
+from app.core.config import settings
+from app.core.database import warm_up as warm_up_database
+from app.core.metrics import metrics
+
+# Checked where they're used rather than by Settings(), so a missing one doesn't stop the process
+_LAZY_KEYS = ("DEEPGRAM_API_KEY", "GROQ_API_KEY", "ELEVENLABS_API_KEY", "BLIND_INDEX_KEY")
+
+
+async def warm_up():
+    started = time.monotonic()
+    missing = [key for key in _LAZY_KEYS if not getattr(settings, key)]
+    if missing:
+        logger.warning(f"Not set: {', '.join(missing)}; what needs them will fail until they are")
+    if settings.TOOLS_ENABLED and settings.PMS_BACKEND == "mock":
+        logger.warning("TOOLS_ENABLED with PMS_BACKEND=mock: bookings confirmed to callers are not real")
+
+    try:
+        # Imports run in a thread: numpy (plus codec tables), websockets and the Groq SDK
+        # take a few hundred ms the event loop keeps serving through
+        await asyncio.to_thread(importlib.import_module, "app.voice_engine.pipeline")
+        await asyncio.to_thread(importlib.import_module, "groq")
+        from app.voice_engine.connection_pool import provider_pool
+        await provider_pool.start() # Warms provider sockets in the background
+        provider_pool.groq # Client (and its connection pool) ready before the first turn
+    except Exception as e:
+        logger.exception(f"Voice engine warm-up failed: {e}")
+
+    try:
+        await warm_up_database()
+    except Exception as e:
+        logger.warning(f"Database warm-up failed: {e!r}")
+
+    elapsed_ms = (time.monotonic() - started) * 1000
+    metrics.observe("startup_warm_up_ms", elapsed_ms, "Voice engine import and connection warm-up after startup")
+    logger.info(f"Warm-up done in {elapsed_ms:.0f}ms")
+
+
+async def close_providers():
+    """Closes the provider pool, if warm-up (or a call) got as far as loading it."""
+    connection_pool = sys.modules.get("app.voice_engine.connection_pool")
+    if connection_pool is not None:
+        await connection_pool.provider_pool.close()
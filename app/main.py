@@ -1,16 +1,41 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
 from app.core.config import settings
-from app.core.logging import setup_logging
+from app.core.metrics import metrics, monitor_event_loop_lag
+from app.core.sessions import sessions
+from app.core.logging import flush_logging, log_levels, set_log_levels, setup_logging
 from app.core.middleware import LogRedactorMiddleware
+from app.core.security import require_admin_token
+from app.core.startup import close_providers, warm_up
 from app.api.websocket import conversation
 from app.api.endpoints import dashboard
+from app.services.call_logs import call_log_writer
 
 # Initialize Logging
 setup_logging()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background Tasks
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    call_log_writer.start()
+    # Not awaited: the app serves health checks while the voice engine loads
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    lag_monitor.cancel()
+    await close_providers()
+    await call_log_writer.close()
+    await asyncio.to_thread(flush_logging) # Lines still queued for the log writer thread
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json"
 )
 
@@ -34,6 +59,32 @@ app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"]
 def health_check():
     return {"status": "healthy", "version": "0.1.0"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Per-stage latency histograms (Prometheus text format)."""
+    return metrics.render()
+
+@app.get("/sessions")
+def get_sessions():
+    """Live session counts of this worker, for autoscaling."""
+    return sessions.snapshot()
+
+class LogLevelsUpdate(BaseModel):
+    default: Optional[str] = None
+    modules: Dict[str, str] = {} # Module prefix -> level; "" resets it to the default
+
+@app.get("/logging/levels")
+def get_log_levels():
+    return log_levels.snapshot()
+
+@app.put("/logging/levels", dependencies=[Depends(require_admin_token)])
+def update_log_levels(update: LogLevelsUpdate):
+    """Changes log levels at runtime, e.g. {"modules": {"app.voice_engine.workers.vad": "DEBUG"}} (this worker only)."""
+    try:
+        return set_log_levels(update.default, update.modules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/")
 def root():
     return {"status": "ok"}
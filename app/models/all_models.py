@@ -1,10 +1,11 @@
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import ForeignKey, DateTime, Integer, String, Text
+from sqlalchemy import ForeignKey, DateTime, Index, Integer, JSON, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.database import Base
-from app.models.types import EncryptedString
+from app.core.security import blind_index
+from app.models.types import EncryptedField
 
 class Practice(Base):
     __tablename__ = "practices"
@@ -12,20 +13,33 @@ class Practice(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100))
     pms_api_key: Mapped[Optional[str]] = mapped_column(String(255))
+    schedule: Mapped[Optional[dict]] = mapped_column(JSON) # Provider hours and operatories, see PracticeSchedule
     
     # Relationships
     patients: Mapped[List["Patient"]] = relationship(back_populates="practice")
 
 class Patient(Base):
     __tablename__ = "patients"
+    __table_args__ = (
+        Index("ix_patients_practice_phone_index", "practice_id", "phone_index"), # Caller-ID lookup
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     practice_id: Mapped[int] = mapped_column(ForeignKey("practices.id"))
     
-    # Encrypted PII
-    first_name: Mapped[str] = mapped_column(EncryptedString(255))
-    last_name: Mapped[str] = mapped_column(EncryptedString(255))
-    phone: Mapped[str] = mapped_column(EncryptedString(50))
+    # Encrypted PII: Fernet ciphertext columns, plaintext via the fields below (decrypted on access)
+    first_name_ciphertext: Mapped[str] = mapped_column("first_name", String(255))
+    last_name_ciphertext: Mapped[str] = mapped_column("last_name", String(255))
+    phone_ciphertext: Mapped[str] = mapped_column("phone", String(50))
+    # Blind index of the normalized phone (HMAC, see app/core/security.py), kept in sync on assignment
+    phone_index: Mapped[Optional[str]] = mapped_column(String(64))
+
+    def _index_phone(self, phone: Optional[str]):
+        self.phone_index = blind_index(phone)
+
+    first_name = EncryptedField("first_name_ciphertext")
+    last_name = EncryptedField("last_name_ciphertext")
+    phone = EncryptedField("phone_ciphertext", on_set=_index_phone)
     
     # Relationships
     practice: Mapped["Practice"] = relationship(back_populates="patients")
@@ -33,11 +47,17 @@ class Patient(Base):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        Index("ix_appointments_time", "time"), # Availability loads bookings by date range
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     patient_id: Mapped[int] = mapped_column(ForeignKey("patients.id"))
     
     time: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    duration_minutes: Mapped[int] = mapped_column(Integer, default=30, server_default="30")
+    provider: Mapped[Optional[str]] = mapped_column(String(100))
+    operatory: Mapped[Optional[str]] = mapped_column(String(50))
     status: Mapped[str] = mapped_column(String(20), default="SCHEDULED") # SCHEDULED, CANCELLED, COMPLETED
     
     # Relationships
@@ -45,9 +65,15 @@ class Appointment(Base):
 
 class CallLog(Base):
     __tablename__ = "call_logs"
+    __table_args__ = (
+        Index("ix_call_logs_created_at_id", "created_at", "id"), # Keyset pagination, newest first
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True)
     recording_url: Mapped[Optional[str]] = mapped_column(String(512))
     transcript_summary: Mapped[Optional[str]] = mapped_column(Text)
     duration: Mapped[Optional[int]] = mapped_column(Integer) # Seconds
+    session_id: Mapped[Optional[str]] = mapped_column(String(32), unique=True) # Pipeline session, makes re-sent batches idempotent
+    practice_id: Mapped[Optional[int]] = mapped_column(Integer) # No foreign key: one unknown practice must not fail a whole batch
+    turn_timings: Mapped[Optional[list]] = mapped_column(JSON) # Per-turn stage latencies (ms)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
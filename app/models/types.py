@@ -1,10 +1,12 @@
+from typing import Any, Callable, Optional, Sequence
 from sqlalchemy import String, TypeDecorator
-from app.core.security import encrypt_value, decrypt_value
+from app.core.security import encrypt_value, decrypt_value, decrypt_many
 
 class EncryptedString(TypeDecorator):
     """
     SQLAlchemy TypeDecorator that encrypts data before saving to DB
-    and decrypts it when retrieving.
+    and decrypts it when retrieving (row by row, as results are fetched).
+    Models use EncryptedField instead, which defers decryption to first access.
     """
     impl = String
     cache_ok = True
@@ -18,3 +20,55 @@ class EncryptedString(TypeDecorator):
         if value is None:
             return value
         return decrypt_value(value)
+
+class EncryptedField:
+    """
+    Decrypt-on-access attribute over a String column that holds Fernet ciphertext.
+    The plaintext is decrypted on first read and cached on the instance, so PII
+    that is loaded but never read costs no decryption. Assigning encrypts.
+    On the class it is the ciphertext column itself (for queries and bulk reads,
+    see decrypt_fields).
+    """
+    def __init__(self, column: str, on_set: Optional[Callable[[Any, Optional[str]], None]] = None):
+        self.column = column
+        self.on_set = on_set
+        self.cache_key = ""
+
+    def __set_name__(self, owner: type, name: str):
+        self.cache_key = f"_{name}_plaintext"
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return getattr(owner, self.column)
+        token = getattr(instance, self.column)
+        cached = instance.__dict__.get(self.cache_key)
+        if cached is not None and cached[0] is token: # Still the token it was decrypted from (not refreshed)
+            return cached[1]
+        value = decrypt_value(token) if token else token
+        instance.__dict__[self.cache_key] = (token, value)
+        return value
+
+    def __set__(self, instance: Any, value: Optional[str]):
+        token = encrypt_value(value) if value else value
+        setattr(instance, self.column, token)
+        instance.__dict__[self.cache_key] = (token, value)
+        if self.on_set:
+            self.on_set(instance, value)
+
+    def prime(self, instance: Any, value: Optional[str]):
+        instance.__dict__[self.cache_key] = (getattr(instance, self.column), value)
+
+async def decrypt_fields(instances: Sequence[Any], *fields: str):
+    """
+    Decrypts the named EncryptedFields of many loaded rows in one batch (offloaded
+    from the event loop for large result sets), so later reads are cache hits.
+    """
+    if not instances:
+        return
+    owner = type(instances[0])
+    descriptors = [owner.__dict__[name] for name in fields]
+    tokens = [getattr(instance, d.column) for d in descriptors for instance in instances]
+    values = iter(await decrypt_many(tokens))
+    for descriptor in descriptors:
+        for instance in instances:
+            descriptor.prime(instance, next(values))
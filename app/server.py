@@ -0,0 +1,273 @@
+"""
+Multi-process deployment of app.main:app: one worker process (own event loop)
+per core behind a lightweight dispatcher.
+
+    python -m app.server --host 0.0.0.0 --port 8000 --workers 4
+
+The supervisor owns the listening socket. It accepts each connection and passes
+the socket (SCM_RIGHTS) to the ready worker with the fewest live calls, so
+sessions spread by load rather than by connection hash. Workers that die are
+restarted.
+
+Signals (to the supervisor):
+    SIGHUP          start a fresh generation of workers (reloads code), then
+                    drain the old one: no new calls, exit once its calls end
+    SIGTERM/SIGINT  drain every worker and exit
+Draining is bounded by SERVER_DRAIN_TIMEOUT_S.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from collections import deque
+from typing import Any, Deque, List, Optional
+
+import uvicorn
+from loguru import logger
+
+from app.core.config import settings
+
+# Calls handed to a worker count towards its load until its own counter catches up
+_HANDOFF_WINDOW_S = 2.0
+_READY = b"R"
+
+
+# --- Worker process ------------------------------------------------------------------
+
+class WorkerServer(uvicorn.Server):
+    """
+    uvicorn server that listens on no port: connections arrive as file descriptors
+    from the supervisor. SIGTERM drains instead of closing live websockets.
+    """
+    def __init__(self, config: uvicorn.Config, handoff: socket.socket):
+        super().__init__(config)
+        self.handoff = handoff
+        self.drain_deadline: Optional[float] = None
+
+    def handle_exit(self, sig: int, frame: Any):
+        if sig == signal.SIGINT:
+            return # Ctrl+C reaches the whole process group; the supervisor decides
+        if self.drain_deadline is None:
+            logger.info(f"Worker {os.getpid()} draining")
+            self.drain_deadline = time.monotonic() + settings.SERVER_DRAIN_TIMEOUT_S
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.drain_deadline is not None:
+            from app.core.sessions import sessions
+            if sessions.active == 0 or time.monotonic() >= self.drain_deadline:
+                return True
+        return await super().on_tick(counter)
+
+    def _create_protocol(self) -> asyncio.Protocol:
+        # Same construction uvicorn's own listeners use (Server.startup)
+        return self.config.http_protocol_class(
+            config=self.config, server_state=self.server_state, app_state=self.lifespan.state
+        )
+
+    async def receive_connections(self):
+        loop = asyncio.get_running_loop()
+        while not self.started:
+            if self.should_exit:
+                return
+            await asyncio.sleep(0.05)
+
+        readable = asyncio.Event()
+        loop.add_reader(self.handoff.fileno(), readable.set)
+        await loop.sock_sendall(self.handoff, _READY)
+        try:
+            while True:
+                await readable.wait()
+                readable.clear()
+                while True:
+                    try:
+                        message, fds, _, _ = socket.recv_fds(self.handoff, 1, 1)
+                    except BlockingIOError:
+                        break
+                    if not message:
+                        # Supervisor is gone: finish the calls we have, then exit
+                        self.handle_exit(signal.SIGTERM, None)
+                        return
+                    for fd in fds:
+                        conn = socket.socket(fileno=fd)
+                        conn.setblocking(False)
+                        await loop.connect_accepted_socket(self._create_protocol, conn)
+        finally:
+            loop.remove_reader(self.handoff.fileno())
+
+
+def run_worker(worker_id: int, handoff: socket.socket, shared_sessions: Any, port: int, log_level: str):
+    from app.core.sessions import sessions
+    sessions.bind_shared(worker_id, shared_sessions)
+
+    handoff.setblocking(False)
+    config = uvicorn.Config("app.main:app", port=port, log_level=log_level, timeout_graceful_shutdown=5)
+    server = WorkerServer(config, handoff)
+
+    async def serve():
+        receiver = asyncio.create_task(server.receive_connections())
+        try:
+            await server.serve(sockets=[])
+        finally:
+            receiver.cancel()
+
+    asyncio.run(serve())
+
+
+# --- Supervisor --------------------------------------------------------------------
+
+class Worker:
+    def __init__(self, worker_id: int, ctx: multiprocessing.context.BaseContext, port: int, log_level: str):
+        self.id = worker_id
+        self.sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sessions = ctx.RawValue("i", 0)
+        self.process = ctx.Process(
+            target=run_worker, args=(worker_id, child_sock, self.sessions, port, log_level),
+            name=f"voice-worker-{worker_id}", daemon=False
+        )
+        self.process.start()
+        child_sock.close()
+        self.sock.setblocking(False)
+
+        self.ready = False
+        self.draining = False
+        self.handoffs: Deque[float] = deque()
+        self.total_handoffs = 0
+
+    def load(self, now: float) -> int:
+        while self.handoffs and now - self.handoffs[0] > _HANDOFF_WINDOW_S:
+            self.handoffs.popleft()
+        return max(self.sessions.value, len(self.handoffs))
+
+    def hand_off(self, conn: socket.socket):
+        socket.send_fds(self.sock, [b"c"], [conn.fileno()])
+        self.handoffs.append(time.monotonic())
+        self.total_handoffs += 1
+
+    def drain(self):
+        self.draining = True
+        if self.process.is_alive():
+            os.kill(self.process.pid, signal.SIGTERM)
+
+
+class Supervisor:
+    def __init__(self, host: str, port: int, workers: int, log_level: str):
+        self.host = host
+        self.port = port
+        self.size = workers
+        self.log_level = log_level
+        self.ctx = multiprocessing.get_context("spawn") # Fresh interpreter per worker, so reloads pick up new code
+        self.workers: List[Worker] = []
+        self.next_id = 0
+        self.any_ready = asyncio.Event()
+        self.stopping = False
+
+    def spawn(self) -> Worker:
+        worker = Worker(self.next_id, self.ctx, self.port, self.log_level)
+        self.next_id += 1
+        self.workers.append(worker)
+        asyncio.get_running_loop().create_task(self._await_ready(worker))
+        return worker
+
+    async def _await_ready(self, worker: Worker):
+        loop = asyncio.get_running_loop()
+        try:
+            if await loop.sock_recv(worker.sock, 1) == _READY:
+                worker.ready = True
+                self.any_ready.set()
+                logger.info(f"Worker {worker.id} (pid {worker.process.pid}) ready")
+        except OSError:
+            pass
+
+    def pick(self) -> Optional[Worker]:
+        now = time.monotonic()
+        candidates = [w for w in self.workers if w.ready and not w.draining and w.process.is_alive()]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: (w.load(now), w.total_handoffs))
+
+    async def reload(self):
+        logger.info("Reloading: starting a new worker generation")
+        old = [w for w in self.workers if not w.draining]
+        new = [self.spawn() for _ in range(self.size)]
+        while not all(w.ready or not w.process.is_alive() for w in new):
+            await asyncio.sleep(0.1)
+        for worker in old:
+            worker.drain()
+
+    async def supervise(self):
+        """Reaps exited workers and replaces ones that died without being asked to drain."""
+        while True:
+            for worker in list(self.workers):
+                if worker.process.is_alive():
+                    continue
+                worker.process.join()
+                worker.sock.close()
+                self.workers.remove(worker)
+                if not worker.draining and not self.stopping:
+                    logger.warning(f"Worker {worker.id} exited with {worker.process.exitcode}, restarting")
+                    self.spawn()
+            if self.stopping and not self.workers:
+                return
+            await asyncio.sleep(0.5)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        listener = socket.create_server((self.host, self.port), backlog=2048)
+        listener.setblocking(False)
+        for _ in range(self.size):
+            self.spawn()
+
+        supervisor = loop.create_task(self.supervise())
+        loop.add_signal_handler(signal.SIGHUP, lambda: loop.create_task(self.reload()))
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+        await self.any_ready.wait()
+        logger.info(f"Dispatching http://{self.host}:{self.port} to {self.size} workers")
+        accept = loop.create_task(self._accept(listener))
+
+        await stop.wait()
+        logger.info("Shutting down: draining workers")
+        self.stopping = True
+        accept.cancel()
+        listener.close()
+        for worker in self.workers:
+            worker.drain()
+        await supervisor
+
+    async def _accept(self, listener: socket.socket):
+        loop = asyncio.get_running_loop()
+        while True:
+            conn, _ = await loop.sock_accept(listener)
+            try:
+                worker = self.pick()
+                while worker is None:
+                    await asyncio.sleep(0.05)
+                    worker = self.pick()
+                worker.hand_off(conn)
+            except OSError as e:
+                logger.warning(f"Connection handoff failed: {e}")
+            finally:
+                conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 = one per core")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    workers = args.workers or len(os.sched_getaffinity(0))
+    asyncio.run(Supervisor(args.host, args.port, workers, args.log_level).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import asyncio
+import fcntl
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Union
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.metrics import metrics
+from app.core.security import decrypt_value, encrypt_value
+from app.models.all_models import CallLog
+
+# How often spilled records are retried while the database is reachable
+_REPLAY_INTERVAL_S = 30.0
+
+
+class CallRecord(BaseModel):
+    """One finished call, as handed to the writer at teardown."""
+    session_id: str
+    practice_id: Optional[int] = None
+    created_at: datetime
+    duration: int # Seconds
+    transcript_summary: Optional[str] = None
+    turn_timings: List[Dict[str, Union[int, float]]] = Field(default_factory=list) # {"turn": n, metric: ms}
+    recording_url: Optional[str] = None
+
+
+class CallLogWriter:
+    """
+    Persists call records off the websocket path.
+    submit() only enqueues (bounded by CALL_LOG_BUFFER_SIZE). A background task
+    writes the queue to call_logs in multi-row inserts of up to CALL_LOG_BATCH_SIZE,
+    at most CALL_LOG_FLUSH_INTERVAL_S apart. Batches the database doesn't take in
+    CALL_LOG_WRITE_TIMEOUT_S, and records arriving while the buffer is full, are
+    appended to a local JSON-lines spill file and re-inserted once writes succeed
+    again. Inserts skip session_ids already stored, so a batch that timed out
+    after committing can be replayed safely. Spilled records hold transcripts, so
+    each line is encrypted with ENCRYPTION_KEY like the patient columns.
+    """
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CALL_LOG_BUFFER_SIZE)
+        self.spill_path = settings.CALL_LOG_SPILL_PATH
+        self.task: Optional[asyncio.Task] = None
+        self.spill_tasks: Set[asyncio.Task] = set()
+        self.last_replay = 0.0
+
+    def start(self):
+        if settings.CALL_LOG_ENABLED and self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Writes out what's buffered (spilling if the database is down) and stops."""
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        await self._flush(self._take(self.queue.qsize()))
+        if self.spill_tasks:
+            await asyncio.gather(*self.spill_tasks)
+
+    def submit(self, record: CallRecord):
+        """Never blocks: the call's teardown doesn't wait on the database or the disk."""
+        if self.task is None:
+            return
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            metrics.increment("voice_call_logs_total", 1, "Call records by outcome", result="overflow")
+            task = asyncio.create_task(self._spill([record]))
+            self.spill_tasks.add(task)
+            task.add_done_callback(self.spill_tasks.discard)
+
+    def _take(self, limit: int) -> List[CallRecord]:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            # Wait for the first record, then give the batch until the interval ends to fill up
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + settings.CALL_LOG_FLUSH_INTERVAL_S
+            while len(batch) < settings.CALL_LOG_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            batch += self._take(settings.CALL_LOG_BATCH_SIZE - len(batch))
+
+            if await self._flush(batch) and time.monotonic() - self.last_replay > _REPLAY_INTERVAL_S:
+                self.last_replay = time.monotonic()
+                await self._replay()
+
+    async def _flush(self, batch: List[CallRecord]) -> bool:
+        if not batch:
+            return True
+        try:
+            await asyncio.wait_for(self._insert(batch), timeout=settings.CALL_LOG_WRITE_TIMEOUT_S)
+        except Exception as e:
+            logger.warning(f"Call log write failed, spilling {len(batch)} records to disk: {e!r}")
+            await self._spill(batch)
+            return False
+        metrics.increment("voice_call_logs_total", len(batch), "Call records by outcome", result="written")
+        return True
+
+    async def _insert(self, batch: List[CallRecord]):
+        from sqlalchemy.dialects.postgresql import insert # Deferred like the engine (see app.core.database)
+        started = time.monotonic()
+        for i in range(0, len(batch), settings.CALL_LOG_BATCH_SIZE):
+            rows = [record.model_dump() for record in batch[i:i + settings.CALL_LOG_BATCH_SIZE]]
+            # One statement per batch: SQLAlchemy renders the rows as a multi-row INSERT
+            statement = insert(CallLog).values(rows).on_conflict_do_nothing(index_elements=["session_id"])
+            async with async_session() as session:
+                await session.execute(statement)
+                await session.commit()
+        metrics.observe("voice_call_log_insert_ms", (time.monotonic() - started) * 1000, "Call log batch insert")
+
+    # --- Spill file ------------------------------------------------------------------
+
+    async def _spill(self, records: List[CallRecord]):
+        if records:
+            await asyncio.to_thread(self._append_spill, records)
+            metrics.increment("voice_call_logs_total", len(records), "Call records by outcome", result="spilled")
+
+    def _append_spill(self, records: List[CallRecord]):
+        data = "".join(encrypt_value(record.model_dump_json()) + "\n" for record in records)
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        while True:
+            with open(self.spill_path, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX) # Shared with other worker processes and _claim_spill
+                try:
+                    current = os.stat(self.spill_path).st_ino
+                except FileNotFoundError:
+                    continue
+                if os.fstat(f.fileno()).st_ino != current:
+                    continue # Claimed for replay while we waited for the lock
+                f.write(data)
+                return
+
+    def _claim_spill(self) -> Optional[str]:
+        """Moves the spill file aside (under its lock) so new spills start a fresh one."""
+        claimed = f"{self.spill_path}.{os.getpid()}.replay"
+        try:
+            with open(self.spill_path, "r") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                if os.fstat(f.fileno()).st_ino != os.stat(self.spill_path).st_ino:
+                    return None # Another process claimed it first
+                os.replace(self.spill_path, claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    async def _replay(self):
+        claimed = await asyncio.to_thread(self._claim_spill)
+        if claimed is None:
+            return
+        records = await asyncio.to_thread(self._read_spill, claimed)
+        logger.info(f"Replaying {len(records)} spilled call records")
+        for i in range(0, len(records), settings.CALL_LOG_BATCH_SIZE):
+            if not await self._flush(records[i:i + settings.CALL_LOG_BATCH_SIZE]):
+                # _flush re-spilled this batch; put the rest back too
+                await self._spill(records[i + settings.CALL_LOG_BATCH_SIZE:])
+                break
+        os.remove(claimed)
+
+    @staticmethod
+    def _read_spill(path: str) -> List[CallRecord]:
+        records = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    # Files spilled before lines were encrypted hold plain JSON
+                    records.append(CallRecord.model_validate_json(line if line.startswith("{") else decrypt_value(line)))
+        return records
+
+    def render_metrics(self) -> List[str]:
+        return [
+            "# TYPE voice_call_log_buffered gauge",
+            f"voice_call_log_buffered {self.queue.qsize()}",
+        ]
+
+
+call_log_writer = CallLogWriter()
+metrics.register_collector(call_log_writer.render_metrics)
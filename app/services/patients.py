@@ -0,0 +1,22 @@
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import blind_index
+from app.models.all_models import Patient
+
+
+async def find_patients_by_phone(db: AsyncSession, phone: str, practice_id: Optional[int] = None) -> List[Patient]:
+    """
+    Caller-ID lookup: patients whose phone matches, in any format, via the blind index.
+    One indexed equality query; only the matching rows are decrypted.
+    Several patients can share a number (family members).
+    """
+    index = blind_index(phone)
+    if index is None:
+        return []
+    query = select(Patient).where(Patient.phone_index == index)
+    if practice_id is not None:
+        query = query.where(Patient.practice_id == practice_id)
+    return list((await db.execute(query.order_by(Patient.id))).scalars())
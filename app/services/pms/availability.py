@@ -0,0 +1,338 @@
+import asyncio
+import time as clock
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Protocol, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Used for practices that haven't set a schedule, and by the mock PMS
+DEFAULT_SCHEDULE = {
+    "timezone": "America/New_York",
+    "operatories": ["op1", "op2"],
+    "providers": {
+        provider: {day: ["09:00-12:00", "13:00-17:00"] for day in WEEKDAYS[:5]}
+        for provider in ("Dr. Patel", "Hygienist Kim")
+    },
+}
+
+
+@dataclass
+class PracticeSchedule:
+    """
+    Weekly working hours per provider, and the operatories (chairs) a visit can use.
+    Stored as JSON on Practice.schedule:
+        {"timezone": "America/New_York", "operatories": ["op1", "op2"],
+         "providers": {"Dr. Lee": {"mon": ["08:00-12:00", "13:00-17:00"], ...}}}
+    """
+    timezone: str
+    operatories: List[str]
+    hours: Dict[str, Dict[int, List[Tuple[time, time]]]] # provider -> weekday -> [(start, end)]
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "PracticeSchedule":
+        hours = {}
+        for provider, week in data.get("providers", {}).items():
+            hours[provider] = {}
+            for day, ranges in week.items():
+                intervals = []
+                for text in ranges:
+                    start, end = text.split("-")
+                    intervals.append((time.fromisoformat(start), time.fromisoformat(end)))
+                hours[provider][WEEKDAYS.index(day[:3].lower())] = intervals
+        return cls(data.get("timezone", "UTC"), list(data.get("operatories", [])), hours)
+
+
+@dataclass
+class Booking:
+    """An appointment as the availability index sees it."""
+    start: datetime
+    duration_minutes: int
+    provider: Optional[str] = None
+    operatory: Optional[str] = None
+    appointment_id: Optional[int] = None
+
+
+@dataclass
+class Slot:
+    start: datetime
+    end: datetime
+    provider: str
+    operatory: Optional[str]
+
+
+class SlotTaken(Exception):
+    """The requested time isn't free (booked meanwhile, or outside working hours)."""
+
+
+class PMSBackend(Protocol):
+    """Source of schedules and bookings (the mock, our database, or a real PMS)."""
+    async def load_schedule(self, practice_id: int) -> PracticeSchedule: ...
+
+    async def load_bookings(self, practice_id: int, start: datetime, end: datetime) -> List[Booking]: ...
+
+    async def book(self, practice_id: int, booking: Booking, patient_id: Optional[int]) -> int:
+        """Stores the appointment, returns its id."""
+        ...
+
+
+def _runs(mask: int, length: int) -> int:
+    """Bits that start `length` consecutive set bits."""
+    runs = mask
+    for shift in range(1, length):
+        runs &= mask >> shift
+    return runs
+
+
+def _span(first: int, last: int) -> int:
+    """Mask with bits first..last-1 set."""
+    return ((1 << max(last, 0)) - 1) & ~((1 << max(first, 0)) - 1)
+
+
+def _bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@dataclass
+class DayIndex:
+    """Free time of one local day as bitmaps, one bit per AVAILABILITY_SLOT_MINUTES."""
+    providers: Dict[str, int] = field(default_factory=dict)
+    operatories: Dict[str, int] = field(default_factory=dict)
+    provider_hours: Dict[str, int] = field(default_factory=dict) # Working time, before bookings
+    operatory_hours: Dict[str, int] = field(default_factory=dict)
+
+
+class PracticeAvailability:
+    """
+    Availability of one practice: per-day bitmaps of free provider and operatory
+    time, built from the weekly schedule minus bookings. A slot of k units is free
+    where the provider and one operatory both have k free units in a row, which is
+    a handful of shifts and ANDs per day.
+    """
+    def __init__(self, practice_id: int, schedule: PracticeSchedule, slot_minutes: int):
+        self.practice_id = practice_id
+        self.schedule = schedule
+        self.tz = ZoneInfo(schedule.timezone)
+        self.slot_minutes = slot_minutes
+        self.day_slots = 24 * 60 // slot_minutes
+        self.days: Dict[date, DayIndex] = {}
+        self.placements: Dict[int, Tuple[str, Optional[str]]] = {} # appointment id -> (provider, operatory)
+        self.loaded_at = clock.monotonic()
+
+    def _slot_of(self, at: time) -> int:
+        return (at.hour * 60 + at.minute) // self.slot_minutes
+
+    def build_day(self, day: date, bookings: Sequence[Booking]):
+        index = DayIndex()
+        for provider, week in self.schedule.hours.items():
+            mask = 0
+            for start, end in week.get(day.weekday(), []):
+                mask |= _span(self._slot_of(start), self._slot_of(end) if end != time(0) else self.day_slots)
+            index.providers[provider] = index.provider_hours[provider] = mask
+        opening = 0
+        for mask in index.providers.values():
+            opening |= mask
+        for operatory in self.schedule.operatories:
+            index.operatories[operatory] = index.operatory_hours[operatory] = opening
+        self.days[day] = index
+        for booking in bookings:
+            self._apply(booking, free=False)
+
+    def _locate(self, booking: Booking) -> Optional[Tuple[DayIndex, int]]:
+        local = booking.start.astimezone(self.tz)
+        index = self.days.get(local.date())
+        if index is None:
+            return None
+        first = self._slot_of(local.time())
+        units = -(-booking.duration_minutes // self.slot_minutes)
+        return index, _span(first, min(first + units, self.day_slots))
+
+    def _apply(self, booking: Booking, free: bool):
+        located = self._locate(booking)
+        if located is None:
+            return
+        index, span = located
+        provider, operatory = booking.provider, booking.operatory
+        if free and booking.appointment_id in self.placements:
+            provider, operatory = self.placements.pop(booking.appointment_id)
+        # Bookings without a provider/operatory take the first one that's free then
+        if provider is None:
+            provider = next((p for p, m in index.providers.items() if m & span == span), None)
+        if operatory is None and index.operatories:
+            operatory = next((o for o, m in index.operatories.items() if m & span == span), None)
+        if not free and booking.appointment_id is not None:
+            self.placements[booking.appointment_id] = (provider, operatory)
+
+        for masks, hours, key in (
+            (index.providers, index.provider_hours, provider),
+            (index.operatories, index.operatory_hours, operatory),
+        ):
+            if key in masks:
+                masks[key] = masks[key] | (span & hours[key]) if free else masks[key] & ~span
+
+    def book(self, booking: Booking):
+        self._apply(booking, free=False)
+
+    def cancel(self, booking: Booking):
+        self._apply(booking, free=True)
+
+    def local_days(self, start: datetime, end: datetime) -> List[date]:
+        first, last = start.astimezone(self.tz).date(), (end - timedelta(microseconds=1)).astimezone(self.tz).date()
+        return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+    def find(
+        self, start: datetime, end: datetime, duration_minutes: int, provider: Optional[str], limit: int
+    ) -> List[Slot]:
+        units = -(-duration_minutes // self.slot_minutes)
+        slots: List[Slot] = []
+        for day in self.local_days(start, end):
+            index = self.days.get(day)
+            if index is None:
+                continue
+            midnight = datetime.combine(day, time(0), tzinfo=self.tz)
+            window = _span(self._first_unit_at(midnight, start), self._first_unit_at(midnight, end))
+
+            rooms = 0 # Starts where some operatory is free for the whole visit
+            room_runs = {o: _runs(mask, units) for o, mask in index.operatories.items()}
+            for runs in room_runs.values():
+                rooms |= runs
+            if not index.operatories:
+                rooms = ~0
+
+            candidates = {
+                p: _runs(mask, units) & window & rooms
+                for p, mask in index.providers.items() if provider is None or p == provider
+            }
+            combined = 0
+            for mask in candidates.values():
+                combined |= mask
+            for unit in _bits(combined):
+                chosen = next(p for p, mask in candidates.items() if mask >> unit & 1)
+                room = next((o for o, runs in room_runs.items() if runs >> unit & 1), None)
+                slot_start = midnight + timedelta(minutes=unit * self.slot_minutes)
+                slots.append(Slot(slot_start, slot_start + timedelta(minutes=duration_minutes), chosen, room))
+                if len(slots) >= limit:
+                    return slots
+        return slots
+
+    def _first_unit_at(self, midnight: datetime, at: datetime) -> int:
+        """First slot of the day starting at or after `at` (clamped to the day)."""
+        minutes = (at - midnight).total_seconds() / 60
+        return int(min(max(-(-minutes // self.slot_minutes), 0), self.day_slots))
+
+
+class AvailabilityEngine:
+    """
+    In-memory availability across practices, loaded from a PMSBackend.
+    A practice's index is built on first query for the days asked about and kept
+    for AVAILABILITY_CACHE_TTL_S (bookings made elsewhere show up after that, or at
+    once via invalidate()). Bookings and cancellations through us update it in place.
+    """
+    def __init__(self, backend: Optional[PMSBackend] = None):
+        self.backend = backend
+        self.practices: Dict[int, PracticeAvailability] = {}
+        self.locks: Dict[int, asyncio.Lock] = {}
+
+    def _backend(self) -> PMSBackend:
+        if self.backend is None:
+            if settings.PMS_BACKEND == "database":
+                from app.services.pms.database_service import DatabasePMSService
+                self.backend = DatabasePMSService()
+            else:
+                from app.services.pms.mock_service import MockPMSService
+                self.backend = MockPMSService()
+        return self.backend
+
+    def invalidate(self, practice_id: int):
+        """Drop a practice's index (schedule edited, PMS sync)."""
+        self.practices.pop(practice_id, None)
+
+    async def _practice(self, practice_id: int, start: datetime, end: datetime) -> PracticeAvailability:
+        lock = self.locks.setdefault(practice_id, asyncio.Lock())
+        async with lock:
+            practice = self.practices.get(practice_id)
+            if practice is not None and clock.monotonic() - practice.loaded_at > settings.AVAILABILITY_CACHE_TTL_S:
+                practice = None
+            if practice is None:
+                schedule = await self._backend().load_schedule(practice_id)
+                practice = PracticeAvailability(practice_id, schedule, settings.AVAILABILITY_SLOT_MINUTES)
+                self.practices[practice_id] = practice
+
+            missing = [day for day in practice.local_days(start, end) if day not in practice.days]
+            if missing:
+                range_start = datetime.combine(missing[0], time(0), tzinfo=practice.tz)
+                range_end = datetime.combine(missing[-1] + timedelta(days=1), time(0), tzinfo=practice.tz)
+                bookings = await self._backend().load_bookings(practice_id, range_start, range_end)
+                by_day: Dict[date, List[Booking]] = {}
+                for booking in bookings:
+                    by_day.setdefault(booking.start.astimezone(practice.tz).date(), []).append(booking)
+                for day in missing:
+                    practice.build_day(day, by_day.get(day, []))
+                logger.debug(f"Availability: practice {practice_id} indexed {len(missing)} days")
+            return practice
+
+    async def find_slots(
+        self,
+        practice_id: int,
+        start: datetime,
+        end: datetime,
+        duration_minutes: int = 30,
+        provider: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Slot]:
+        """Earliest free slots starting in [start, end), never in the past."""
+        started = clock.monotonic()
+        start = max(start, datetime.now(timezone.utc) + timedelta(minutes=settings.AVAILABILITY_MIN_LEAD_MINUTES))
+        if start >= end:
+            return []
+        practice = await self._practice(practice_id, start, end)
+        slots = practice.find(start, end, duration_minutes, provider, limit)
+        metrics.observe("pms_availability_query_ms", (clock.monotonic() - started) * 1000, "Availability lookup")
+        return slots
+
+    async def practice_tz(self, practice_id: int) -> ZoneInfo:
+        now = datetime.now(timezone.utc)
+        return (await self._practice(practice_id, now, now + timedelta(minutes=1))).tz
+
+    async def book(self, practice_id: int, booking: Booking, patient_id: Optional[int] = None) -> Booking:
+        """
+        Books `booking` if it's still free, through the backend, and updates the index.
+        The provider and operatory are filled in if not given. Raises SlotTaken.
+        """
+        end = booking.start + timedelta(minutes=booking.duration_minutes)
+        practice = await self._practice(practice_id, booking.start, end)
+        # Held across the backend write so two calls can't take the same slot in this process
+        async with self.locks[practice_id]:
+            earliest = datetime.now(timezone.utc) + timedelta(minutes=settings.AVAILABILITY_MIN_LEAD_MINUTES)
+            slots = practice.find(
+                booking.start, booking.start + timedelta(minutes=1), booking.duration_minutes, booking.provider, 1
+            ) if booking.start >= earliest else []
+            if not slots or slots[0].start != booking.start:
+                raise SlotTaken(f"{booking.start.isoformat()} is not available")
+            booking.provider, booking.operatory = slots[0].provider, slots[0].operatory
+            booking.appointment_id = await self._backend().book(practice_id, booking, patient_id)
+            practice.book(booking)
+        metrics.increment("pms_bookings_total", 1, "Appointments booked through the availability engine")
+        return booking
+
+    def booked(self, practice_id: int, booking: Booking):
+        practice = self.practices.get(practice_id)
+        if practice is not None:
+            practice.book(booking)
+
+    def cancelled(self, practice_id: int, booking: Booking):
+        practice = self.practices.get(practice_id)
+        if practice is not None:
+            practice.cancel(booking)
+
+
+availability = AvailabilityEngine()
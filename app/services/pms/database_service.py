@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from app.core.database import async_session
+from app.models.all_models import Appointment, Patient, Practice
+from app.services.pms.availability import DEFAULT_SCHEDULE, Booking, PracticeSchedule
+
+# Appointments starting this long before a range can still overlap it
+_MAX_APPOINTMENT = timedelta(hours=4)
+
+class DatabasePMSService:
+    """Availability backend over our own tables: Practice.schedule and SCHEDULED Appointment rows."""
+
+    async def load_schedule(self, practice_id: int) -> PracticeSchedule:
+        async with async_session() as session:
+            schedule = await session.scalar(select(Practice.schedule).where(Practice.id == practice_id))
+        return PracticeSchedule.from_json(schedule or DEFAULT_SCHEDULE)
+
+    async def load_bookings(self, practice_id: int, start: datetime, end: datetime) -> List[Booking]:
+        query = (
+            select(Appointment.id, Appointment.time, Appointment.duration_minutes, Appointment.provider, Appointment.operatory)
+            .join(Patient, Appointment.patient_id == Patient.id)
+            .where(
+                Patient.practice_id == practice_id,
+                Appointment.status == "SCHEDULED",
+                Appointment.time >= start - _MAX_APPOINTMENT,
+                Appointment.time < end,
+            )
+        )
+        async with async_session() as session:
+            rows = (await session.execute(query)).all()
+        return [
+            Booking(row.time, row.duration_minutes, row.provider, row.operatory, appointment_id=row.id)
+            for row in rows
+        ]
+
+    async def book(self, practice_id: int, booking: Booking, patient_id: Optional[int]) -> int:
+        if patient_id is None:
+            raise ValueError("patient_id is required to book")
+        async with async_session() as session:
+            practice = await session.scalar(select(Patient.practice_id).where(Patient.id == patient_id))
+            if practice != practice_id:
+                raise ValueError(f"Patient {patient_id} not found in practice {practice_id}")
+            appointment = Appointment(
+                patient_id=patient_id,
+                time=booking.start,
+                duration_minutes=booking.duration_minutes,
+                provider=booking.provider,
+                operatory=booking.operatory,
+                status="SCHEDULED",
+            )
+            session.add(appointment)
+            await session.commit()
+            return appointment.id
@@ -1,10 +1,17 @@
 from datetime import datetime, timedelta
-from typing import List
+from typing import Dict, List, Optional
+
+from app.services.pms.availability import DEFAULT_SCHEDULE, Booking, PracticeSchedule
 
 class MockPMSService:
     """
     Simulates interaction with a Practice Management System (e.g. OpenDental).
+    As an availability backend every practice has DEFAULT_SCHEDULE and bookings
+    live in memory, so scheduling can be exercised without a real PMS.
     """
+    def __init__(self):
+        self.bookings: Dict[int, List[Booking]] = {}
+        self.next_id = 1
     
     @staticmethod
     def get_available_slots() -> List[datetime]:
@@ -20,3 +27,18 @@ class MockPMSService:
             slots.append(base_time + timedelta(hours=i))
             
         return slots
+
+    async def load_schedule(self, practice_id: int) -> PracticeSchedule:
+        return PracticeSchedule.from_json(DEFAULT_SCHEDULE)
+
+    async def load_bookings(self, practice_id: int, start: datetime, end: datetime) -> List[Booking]:
+        return [b for b in self.bookings.get(practice_id, []) if start <= b.start < end]
+
+    async def add_booking(self, practice_id: int, booking: Booking):
+        self.bookings.setdefault(practice_id, []).append(booking)
+
+    async def book(self, practice_id: int, booking: Booking, patient_id: Optional[int]) -> int:
+        appointment_id, self.next_id = self.next_id, self.next_id + 1
+        booking.appointment_id = appointment_id
+        await self.add_booking(practice_id, booking)
+        return appointment_id
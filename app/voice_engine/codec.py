@@ -0,0 +1,220 @@
+from dataclasses import dataclass
+from math import gcd
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Internal audio format of the pipeline (VAD, Deepgram, ElevenLabs output)
+PIPELINE_SAMPLE_RATE = 16000
+
+ENCODINGS = ("pcm16", "mulaw", "alaw")
+SAMPLE_RATES = (8000, 16000, 24000)
+
+
+# --- G.711 lookup tables (ITU-T reference segment coding) -------------------------
+
+def _build_ulaw_tables():
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((codes & 0x0F) << 3) + 0x84) << ((codes & 0x70) >> 4)
+    decode = np.where(codes & 0x80, 0x84 - t, t - 0x84).astype(np.int16)
+
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), 8159) + (0x84 >> 2)
+    segment = np.searchsorted(np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), magnitude)
+    code = np.where(
+        segment >= 8, 0x7F,
+        (np.minimum(segment, 7) << 4) | ((magnitude >> (np.minimum(segment, 7) + 1)) & 0x0F)
+    )
+    return decode, _by_uint16((code ^ mask).astype(np.uint8))
+
+
+def _build_alaw_tables():
+    codes = np.arange(256, dtype=np.int32) ^ 0x55
+    exponent = (codes & 0x70) >> 4
+    t = (codes & 0x0F) << 4
+    t = np.where(exponent == 0, t + 8, (t + 0x108) << np.maximum(exponent - 1, 0))
+    decode = np.where(codes & 0x80, t, -t).astype(np.int16)
+
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    magnitude = np.where(pcm >= 0, pcm, -pcm - 1)
+    segment = np.searchsorted(np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF]), magnitude)
+    shift = np.where(segment < 2, 1, np.minimum(segment, 7))
+    code = np.where(segment >= 8, 0x7F, (np.minimum(segment, 7) << 4) | ((magnitude >> shift) & 0x0F))
+    return decode, _by_uint16((code ^ mask).astype(np.uint8))
+
+
+def _by_uint16(table: np.ndarray) -> np.ndarray:
+    """Re-indexes a table built for int16 values -32768..32767 by their uint16 bit pattern."""
+    return np.roll(table, -32768)
+
+
+ULAW_DECODE, ULAW_ENCODE = _build_ulaw_tables()
+ALAW_DECODE, ALAW_ENCODE = _build_alaw_tables()
+_DECODE = {"mulaw": ULAW_DECODE, "alaw": ALAW_DECODE}
+_ENCODE = {"mulaw": ULAW_ENCODE, "alaw": ALAW_ENCODE}
+
+
+# --- Resampling --------------------------------------------------------------------
+
+class Resampler:
+    """
+    Streaming rational resampler (upsample by L, windowed-sinc low-pass, decimate by M).
+    Filter history and decimation phase carry across calls, so frames of any size
+    join without clicks.
+    """
+    TAPS_PER_PHASE = 16
+
+    def __init__(self, src_rate: int, dst_rate: int):
+        g = gcd(src_rate, dst_rate)
+        self.up = dst_rate // g
+        self.down = src_rate // g
+        self.passthrough = self.up == self.down
+        if self.passthrough:
+            return
+
+        n = self.TAPS_PER_PHASE * max(self.up, self.down) + 1
+        cutoff = 1.0 / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2
+        self.taps = (cutoff * np.sinc(cutoff * t) * np.hamming(n) * self.up).astype(np.float32)
+        self.history = np.zeros(n - 1, dtype=np.float32)
+        self.phase = 0
+        self._scratch = np.zeros(0, dtype=np.float32) # Reused: history + zero-stuffed input
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.passthrough or not len(samples):
+            return samples
+
+        history = len(self.history)
+        size = history + len(samples) * self.up
+        if len(self._scratch) != size:
+            self._scratch = np.zeros(size, dtype=np.float32)
+        else:
+            self._scratch[history:] = 0
+        self._scratch[:history] = self.history
+        self._scratch[history::self.up] = samples
+
+        filtered = np.convolve(self._scratch, self.taps, mode="valid")
+        self.history[:] = self._scratch[-history:]
+        out = filtered[self.phase::self.down]
+        self.phase = (self.phase - len(samples) * self.up) % self.down
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+# --- Framing -----------------------------------------------------------------------
+
+class JitterBuffer:
+    """
+    Reorders sequence-numbered media frames. Frames are released in order; a missing
+    frame is given up on once `depth` later frames are waiting, and released as None
+    so the caller can conceal it. Late duplicates are dropped.
+    """
+    def __init__(self, depth: int = 3):
+        self.depth = depth
+        self.pending: Dict[int, bytes] = {}
+        self.next_seq: Optional[int] = None
+        self.lost = 0
+        self.late = 0
+
+    def push(self, seq: int, payload: bytes) -> List[Optional[bytes]]:
+        if self.next_seq is None:
+            self.next_seq = seq
+        if seq < self.next_seq:
+            self.late += 1
+            return []
+        self.pending[seq] = payload
+
+        released: List[Optional[bytes]] = []
+        while self.pending:
+            frame = self.pending.pop(self.next_seq, None)
+            if frame is None and len(self.pending) < self.depth:
+                break
+            if frame is None:
+                self.lost += 1
+            released.append(frame)
+            self.next_seq += 1
+        return released
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """Wire format of a call's audio, in both directions."""
+    encoding: str = "pcm16"
+    sample_rate: int = PIPELINE_SAMPLE_RATE
+
+    def __post_init__(self):
+        if self.encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported encoding {self.encoding!r}, expected one of {ENCODINGS}")
+        if self.sample_rate not in SAMPLE_RATES:
+            raise ValueError(f"Unsupported sample rate {self.sample_rate}, expected one of {SAMPLE_RATES}")
+
+
+class AudioIngress:
+    """
+    Decodes caller audio to pipeline PCM16 at PIPELINE_SAMPLE_RATE.
+    Sequence-numbered frames (carrier media messages) go through a jitter buffer.
+    """
+    def __init__(self, audio_format: AudioFormat, jitter_depth: int = 3):
+        self.format = audio_format
+        self.resampler = Resampler(audio_format.sample_rate, PIPELINE_SAMPLE_RATE)
+        self.jitter = JitterBuffer(jitter_depth)
+        self.remainder = b"" # Odd trailing byte of a PCM16 payload
+        self.last_frame_bytes = 0
+
+    def decode(self, payload: bytes, seq: Optional[int] = None) -> List[bytes]:
+        frames = [payload] if seq is None else self.jitter.push(seq, payload)
+        chunks = []
+        for frame in frames:
+            if frame is None:
+                # Lost frame: conceal with silence of the same duration
+                chunks.append(bytes(self.last_frame_bytes))
+                continue
+            chunk = self._decode_frame(frame)
+            if chunk:
+                self.last_frame_bytes = len(chunk)
+                chunks.append(chunk)
+        return chunks
+
+    def _decode_frame(self, frame: bytes) -> bytes:
+        if self.format.encoding != "pcm16":
+            samples = _DECODE[self.format.encoding][np.frombuffer(frame, dtype=np.uint8)]
+            return self.resampler.process(samples).tobytes()
+
+        if self.remainder:
+            frame = self.remainder + frame
+        usable = len(frame) & ~1
+        self.remainder = frame[usable:]
+        if self.resampler.passthrough:
+            return frame[:usable] if self.remainder else frame
+        return self.resampler.process(np.frombuffer(frame, dtype=np.int16, count=usable // 2)).tobytes()
+
+
+class AudioEgress:
+    """Encodes pipeline PCM16 (PIPELINE_SAMPLE_RATE) audio to the caller's wire format."""
+    def __init__(self, audio_format: AudioFormat):
+        self.format = audio_format
+        self.resampler = Resampler(PIPELINE_SAMPLE_RATE, audio_format.sample_rate)
+        self.remainder = b""
+
+    def frame_bytes(self, frame_ms: int) -> int:
+        """Size of `frame_ms` of audio in the wire format."""
+        width = 2 if self.format.encoding == "pcm16" else 1
+        return self.format.sample_rate * frame_ms // 1000 * width
+
+    def silence(self, size: int) -> bytes:
+        """`size` bytes of silence in the wire format."""
+        if self.format.encoding == "pcm16":
+            return bytes(size)
+        return bytes([int(_ENCODE[self.format.encoding][0])]) * size
+
+    def encode(self, chunk: bytes) -> bytes:
+        if self.format.encoding == "pcm16" and self.resampler.passthrough:
+            return chunk
+        data = self.remainder + bytes(chunk) if self.remainder else chunk
+        usable = len(data) & ~1
+        self.remainder = bytes(data[usable:])
+        samples = self.resampler.process(np.frombuffer(data, dtype=np.int16, count=usable // 2))
+        if self.format.encoding == "pcm16":
+            return samples.tobytes()
+        return _ENCODE[self.format.encoding][samples.view(np.uint16)].tobytes()
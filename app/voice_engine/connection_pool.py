@@ -0,0 +1,216 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import websockets
+from websockets.protocol import State
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.voice_engine.codec import PIPELINE_SAMPLE_RATE
+
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+
+# Deepgram live options (fixed per deployment, so warm sockets are interchangeable)
+DEEPGRAM_OPTIONS = {
+    "model": "nova-2",
+    "encoding": "linear16", # Callers' audio is converted to this by app/voice_engine/codec.py
+    "sample_rate": PIPELINE_SAMPLE_RATE,
+    "language": "en-US",
+    "smart_format": "true",
+    "interim_results": "true",
+    "endpointing": 300,
+}
+
+ELEVENLABS_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.8}
+# Raw PCM16 at the pipeline rate, so egress can re-encode it for the caller
+ELEVENLABS_OUTPUT_FORMAT = f"pcm_{PIPELINE_SAMPLE_RATE}"
+
+
+class WebSocketPool:
+    """
+    Keeps a reserve of pre-opened websockets to one provider endpoint.
+    A maintenance task tops the reserve up, sends keepalives so providers don't
+    close idle sockets, and evicts sockets that closed or idled past max_idle_s.
+    acquire() hands out a warm socket, or connects cold if the reserve is empty.
+    """
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        greeting: Optional[str] = None,
+        keepalive: Optional[str] = None,
+        size: int = 2,
+        keepalive_interval: float = 5.0,
+        max_idle_s: float = 60.0
+    ):
+        self.name = name
+        self.url = url
+        self.headers = headers or {}
+        self.greeting = greeting # Sent right after connecting (e.g. ElevenLabs BOS)
+        self.keepalive = keepalive
+        self.size = size
+        self.keepalive_interval = keepalive_interval
+        self.max_idle_s = max_idle_s
+
+        self.reserve: Deque[Tuple[websockets.ClientConnection, float]] = deque()
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    async def connect(self) -> websockets.ClientConnection:
+        started = time.monotonic()
+        ws = await websockets.connect(self.url, additional_headers=self.headers)
+        if self.greeting:
+            await ws.send(self.greeting)
+        metrics.observe("provider_connect_ms", (time.monotonic() - started) * 1000, "Provider websocket connect, including greeting", provider=self.name)
+        return ws
+
+    async def acquire(self) -> websockets.ClientConnection:
+        """Returns an open socket owned by the caller, who must close it."""
+        self.wakeup.set()
+        while self.reserve:
+            ws, opened_at = self.reserve.popleft()
+            if ws.state is State.OPEN and time.monotonic() - opened_at < self.max_idle_s:
+                self.hits += 1
+                return ws
+            await ws.close()
+
+        self.misses += 1
+        return await self.connect()
+
+    def start(self):
+        if self.task is None and self.size > 0:
+            self.task = asyncio.create_task(self._maintain())
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        while self.reserve:
+            ws, _ = self.reserve.popleft()
+            await ws.close()
+
+    async def _maintain(self):
+        while True:
+            try:
+                now = time.monotonic()
+                # Iterate a snapshot: acquire() may pop sockets while we await
+                for entry in list(self.reserve):
+                    ws, opened_at = entry
+                    if ws.state is not State.OPEN or now - opened_at >= self.max_idle_s:
+                        self._discard(entry)
+                        await ws.close()
+                        continue
+                    if self.keepalive:
+                        try:
+                            await ws.send(self.keepalive)
+                        except websockets.exceptions.ConnectionClosed:
+                            self._discard(entry)
+
+                missing = self.size - len(self.reserve)
+                if missing > 0:
+                    results = await asyncio.gather(*(self.connect() for _ in range(missing)), return_exceptions=True)
+                    for result in results:
+                        if isinstance(result, BaseException):
+                            logger.warning(f"{self.name} pool connect failed: {result}")
+                        else:
+                            self.reserve.append((result, time.monotonic()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"{self.name} pool maintenance error: {e}")
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.keepalive_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _discard(self, entry: Tuple[websockets.ClientConnection, float]):
+        try:
+            self.reserve.remove(entry)
+        except ValueError:
+            pass # Already handed out
+
+    def stats(self) -> Dict[str, int]:
+        return {"warm": len(self.reserve), "hits": self.hits, "misses": self.misses}
+
+
+class ProviderPool:
+    """
+    Process-wide provider connections shared by every VoicePipeline:
+    one Groq HTTP client (keep-alive connection pool) and warm websocket
+    reserves for Deepgram and ElevenLabs. Started from the app lifespan.
+    """
+    def __init__(self):
+        self._groq: Optional["AsyncGroq"] = None
+        size = settings.PROVIDER_POOL_SIZE if settings.PROVIDER_POOL_ENABLED else 0
+
+        self.deepgram = WebSocketPool(
+            "deepgram",
+            f"{settings.DEEPGRAM_WS_URL}?{urlencode(DEEPGRAM_OPTIONS)}",
+            headers={"Authorization": f"Token {settings.DEEPGRAM_API_KEY}"},
+            keepalive=json.dumps({"type": "KeepAlive"}),
+            size=size,
+            max_idle_s=settings.PROVIDER_POOL_MAX_IDLE_S
+        )
+        self.elevenlabs = WebSocketPool(
+            "elevenlabs",
+            f"{settings.ELEVENLABS_WS_URL}/v1/text-to-speech/{settings.ELEVENLABS_VOICE_ID}"
+            f"/stream-input?model_id={settings.ELEVENLABS_MODEL_ID}&output_format={ELEVENLABS_OUTPUT_FORMAT}",
+            # Initial config (BOS) goes out at connect time so a warm socket is ready for text
+            greeting=json.dumps({
+                "text": " ",
+                "voice_settings": ELEVENLABS_VOICE_SETTINGS,
+                "xi_api_key": settings.ELEVENLABS_API_KEY,
+            }),
+            keepalive=json.dumps({"text": " "}),
+            size=size if settings.TTS_ENABLED else 0,
+            max_idle_s=settings.PROVIDER_POOL_MAX_IDLE_S
+        )
+
+    @property
+    def groq(self) -> "AsyncGroq":
+        if self._groq is None:
+            from groq import AsyncGroq # Slow to import; app.core.startup loads it in the background
+            self._groq = AsyncGroq(api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL)
+        return self._groq
+
+    @property
+    def websocket_pools(self) -> List[WebSocketPool]:
+        return [self.deepgram, self.elevenlabs]
+
+    async def start(self):
+        """Warms connections in the background; returns immediately."""
+        for pool in self.websocket_pools:
+            pool.start()
+
+    async def close(self):
+        for pool in self.websocket_pools:
+            await pool.close()
+        if self._groq is not None:
+            await self._groq.close()
+            self._groq = None
+
+    def render_metrics(self) -> List[str]:
+        lines = ["# TYPE provider_pool_warm gauge"]
+        for pool in self.websocket_pools:
+            lines.append(f'provider_pool_warm{{provider="{pool.name}"}} {len(pool.reserve)}')
+        lines.append("# TYPE provider_pool_acquire_total counter")
+        for pool in self.websocket_pools:
+            lines.append(f'provider_pool_acquire_total{{provider="{pool.name}",result="hit"}} {pool.hits}')
+            lines.append(f'provider_pool_acquire_total{{provider="{pool.name}",result="miss"}} {pool.misses}')
+        return lines
+
+
+provider_pool = ProviderPool()
+metrics.register_collector(provider_pool.render_metrics)
@@ -0,0 +1,130 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+from loguru import logger
+
+from app.core.metrics import metrics
+
+Message = Dict[str, str]
+
+# Chat templates add a few tokens of framing per message
+_MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Local estimate for Llama-family tokenizers (~4 characters per token in English)."""
+    return (len(text) + 3) // 4 + _MESSAGE_OVERHEAD
+
+
+class ConversationHistory:
+    """
+    Prompt history for one call, kept within a token budget.
+    The system prompt and a running summary always lead; the newest turns that
+    fit the budget follow. Once the turns outgrow the budget, the oldest ones are
+    folded into the summary by a background task between turns, so the caller
+    never waits on summarization. The message list is cached until it changes.
+    """
+    def __init__(
+        self,
+        system_prompt: str,
+        summarize: Callable[[str, List[Message]], Awaitable[str]],
+        token_budget: int
+    ):
+        self.system = {"role": "system", "content": system_prompt}
+        self.summarize = summarize
+        self.token_budget = token_budget
+
+        self.summary = ""
+        self.turns: List[Message] = []
+        self.turn_tokens: List[int] = []
+        self.summary_task: Optional[asyncio.Task] = None
+        self._messages: Optional[List[Message]] = None
+
+    def append(self, role: str, content: str):
+        self.turns.append({"role": role, "content": content})
+        self.turn_tokens.append(estimate_tokens(content))
+        self._messages = None
+
+    @property
+    def last(self) -> Optional[Message]:
+        return self.turns[-1] if self.turns else None
+
+    def replace_last(self, content: str):
+        self.turns[-1] = {"role": self.turns[-1]["role"], "content": content}
+        self.turn_tokens[-1] = estimate_tokens(content)
+        self._messages = None
+
+    def messages(self) -> List[Message]:
+        """The prompt for the next completion. Shared and cached: do not mutate."""
+        if self._messages is None:
+            self._messages = self._build()
+        return self._messages
+
+    def _build(self) -> List[Message]:
+        head = [self.system]
+        if self.summary:
+            head.append({"role": "system", "content": f"Summary of the call so far: {self.summary}"})
+        budget = self.token_budget - sum(estimate_tokens(m["content"]) for m in head)
+
+        # Newest turns first, until the budget runs out (the latest message is always kept)
+        start = len(self.turns)
+        used = 0
+        while start > 0 and (start == len(self.turns) or used + self.turn_tokens[start - 1] <= budget):
+            start -= 1
+            used += self.turn_tokens[start]
+        # Don't open on a reply whose question was cut
+        while start < len(self.turns) - 1 and self.turns[start]["role"] == "assistant":
+            start += 1
+        return head + self.turns[start:]
+
+    def compact(self):
+        """
+        Called between turns. Starts folding the oldest turns into the summary
+        once the turns exceed the budget, leaving about half of it for new ones.
+        """
+        if self.summary_task and not self.summary_task.done():
+            return
+        if sum(self.turn_tokens) <= self.token_budget:
+            return
+
+        # Fold whole exchanges: cut before a user message, keep at least the last exchange
+        keep = self.token_budget // 2
+        cut, remaining = 0, sum(self.turn_tokens)
+        for i in range(len(self.turns) - 2):
+            remaining -= self.turn_tokens[i]
+            if remaining <= keep and self.turns[i + 1]["role"] == "user":
+                cut = i + 1
+                break
+        if cut == 0:
+            # Recent turns alone exceed the target: fold everything but the last exchange
+            cut = max((i for i in range(1, len(self.turns) - 1) if self.turns[i]["role"] == "user"), default=0)
+        if cut == 0:
+            return
+
+        self.summary_task = asyncio.create_task(self._fold(self.turns[:cut]))
+
+    async def _fold(self, folded: List[Message]):
+        try:
+            summary = await self.summarize(self.summary, folded)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"History summarization failed, trimming instead: {e}")
+            return
+
+        # Only appends happened meanwhile, so the folded turns are still the oldest
+        del self.turns[:len(folded)]
+        del self.turn_tokens[:len(folded)]
+        self.summary = summary.strip()
+        self._messages = None
+        metrics.increment("llm_history_summaries_total", 1, "Older turns folded into the running summary")
+
+    def transcript(self, max_chars: int) -> str:
+        """Running summary plus the retained turns as plain text, keeping the end if it's too long."""
+        lines = [f"Summary: {self.summary}"] if self.summary else []
+        lines += [f"{m['role'].capitalize()}: {m['content']}" for m in self.turns]
+        text = "\n".join(lines)
+        return text if len(text) <= max_chars else "..." + text[-(max_chars - 3):]
+
+    def close(self):
+        if self.summary_task:
+            self.summary_task.cancel()
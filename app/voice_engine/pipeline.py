@@ -1,60 +1,241 @@
 # Fully implemented Pipeline
 import asyncio
-from typing import List
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from fastapi import WebSocket
+from loguru import logger
 
-from app.voice_engine.primitive.worker import BaseWorker
+from app.core.config import settings
+from app.voice_engine.primitive.worker import BaseWorker, drain_queue
+from app.voice_engine.primitive.channel import Channel, OverflowPolicy
+from app.voice_engine.primitive.events import SpeechEvent, TranscriptEvent
+from app.voice_engine.primitive.tracing import TurnTracer
+from app.voice_engine.codec import AudioEgress, AudioFormat, AudioIngress
+from app.core.metrics import metrics
+from app.voice_engine.workers.vad import VoiceActivityDetector
 from app.voice_engine.workers.transcriber import DeepgramTranscriber
 from app.voice_engine.workers.llm import GroqLLMWorker
-# from app.voice_engine.workers.synthesizer import ElevenLabsSynthesizer # Commented out until valid API key usage
+from app.voice_engine.workers.chunker import PhraseChunker
+from app.voice_engine.workers.synthesizer import ElevenLabsSynthesizer
+from app.voice_engine.workers.output import AudioOutputWorker
+from app.voice_engine.tools import ToolSession
+
+def _supersedes_interim(queued: Any, incoming: Any) -> bool:
+    """A newer interim transcript makes a still-queued interim obsolete."""
+    return (
+        isinstance(queued, TranscriptEvent) and not queued.is_final
+        and isinstance(incoming, TranscriptEvent) and not incoming.is_final
+    )
 
 class VoicePipeline:
     """
     Orchestrates the lifecycle of the voice workers (Transcriber -> Agent -> Synthesizer -> Output).
     """
-    def __init__(self):
-        # Queues
-        self.audio_input_queue = asyncio.Queue()
-        self.transcription_queue = asyncio.Queue()
-        self.agent_input_queue = asyncio.Queue() # Same as transcription_queue usually, but separation allows middleware
-        self.synthesis_input_queue = asyncio.Queue()
-        self.audio_output_queue = asyncio.Queue()
-        
+    def __init__(
+        self,
+        audio_format: Optional[AudioFormat] = None,
+        practice_id: Optional[int] = None,
+        caller: Optional[str] = None,
+        websocket: Optional[WebSocket] = None
+    ):
+        self.session_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc)
+        self.started_monotonic = time.monotonic()
+        self.tracer = TurnTracer(self.session_id)
+
+        # Caller wire format <-> pipeline PCM16
+        self.audio_format = audio_format or AudioFormat()
+        self.ingress = AudioIngress(self.audio_format)
+        self.egress = AudioEgress(self.audio_format)
+
+        # Queues (bounded, so a stalled provider can't grow memory without limit)
+        self.audio_input_queue = Channel(
+            "audio_input", settings.AUDIO_INPUT_QUEUE_SIZE, OverflowPolicy.DROP_OLDEST
+        )
+        self.stt_input_queue = Channel( # Speech-gated audio, same as audio_input when the VAD is off
+            "stt_input", settings.AUDIO_INPUT_QUEUE_SIZE, OverflowPolicy.DROP_OLDEST
+        ) if settings.VAD_ENABLED else self.audio_input_queue
+        self.transcription_queue = Channel(
+            "transcription", settings.TRANSCRIPT_QUEUE_SIZE, OverflowPolicy.COALESCE,
+            can_coalesce=_supersedes_interim
+        )
+        self.agent_input_queue = Channel( # Same as transcription_queue usually, but separation allows middleware
+            "agent_input", settings.TRANSCRIPT_QUEUE_SIZE, OverflowPolicy.COALESCE,
+            can_coalesce=_supersedes_interim
+        )
+        self.llm_output_queue = Channel(
+            "llm_output", settings.SYNTHESIS_QUEUE_SIZE, OverflowPolicy.BLOCK
+        )
+        self.synthesis_input_queue = Channel(
+            "synthesis_input", settings.SYNTHESIS_QUEUE_SIZE, OverflowPolicy.BLOCK
+        )
+        self.audio_output_queue = Channel(
+            "audio_output", settings.AUDIO_OUTPUT_QUEUE_SIZE, OverflowPolicy.DROP_OLDEST
+        )
+        self.channels: List[Channel] = [
+            self.audio_input_queue,
+            self.transcription_queue,
+            self.agent_input_queue,
+            self.llm_output_queue,
+            self.synthesis_input_queue,
+            self.audio_output_queue,
+        ]
+        if self.stt_input_queue is not self.audio_input_queue:
+            self.channels.insert(1, self.stt_input_queue)
+
         # Instantiate Workers
+        # 0. VAD: Audio In -> Speech Audio Out (silence held back, speech start/end reported)
+        self.vad: Optional[VoiceActivityDetector] = None
+        if settings.VAD_ENABLED:
+            self.vad = VoiceActivityDetector(
+                input_queue=self.audio_input_queue,
+                output_queue=self.stt_input_queue,
+                on_speech=self.handle_speech_event
+            )
+
         # 1. Transcriber: Audio In -> Transcription Out
         self.transcriber = DeepgramTranscriber(
-            input_queue=self.audio_input_queue,
-            output_queue=self.transcription_queue
+            input_queue=self.stt_input_queue,
+            output_queue=self.transcription_queue,
+            on_speech_start=self.handle_interruption
         )
-        
-        # 2. LLM: Transcription In (as Agent Input) -> Text Chunk Out (to Synthesis)
+        if self.vad:
+            self.transcriber.audio_clock = self.vad.to_input_offset
+
+        # 2. LLM: Transcription In (as Agent Input) -> Token Out (to Chunker), with scheduling tools
+        self.tools: Optional[ToolSession] = None
+        if settings.TOOLS_ENABLED:
+            self.tools = ToolSession(practice_id or settings.TOOLS_DEFAULT_PRACTICE_ID, caller)
         self.llm = GroqLLMWorker(
             input_queue=self.transcription_queue,
+            output_queue=self.llm_output_queue,
+            tools=self.tools
+        )
+
+        # 3. Chunker: Tokens In -> Phrases Out (to Synthesis)
+        self.chunker = PhraseChunker(
+            input_queue=self.llm_output_queue,
             output_queue=self.synthesis_input_queue
         )
-        
-        # 3. Synthesizer: Text Chunk In -> Audio Out
-        # self.synthesizer = ElevenLabsSynthesizer(
-        #     input_queue=self.synthesis_input_queue,
-        #     output_queue=self.audio_output_queue
-        # )
-        
+
+        # 4. Synthesizer: Text Chunk In -> Audio Out
+        # Disabled unless TTS_ENABLED, to avoid spending ElevenLabs credits without a valid API key
+        self.synthesizer: Optional[ElevenLabsSynthesizer] = None
+        if settings.TTS_ENABLED:
+            self.synthesizer = ElevenLabsSynthesizer(
+                input_queue=self.synthesis_input_queue,
+                output_queue=self.audio_output_queue
+            )
+
+        # 5. Output: Audio In -> caller's websocket, paced to real time
+        self.output: Optional[AudioOutputWorker] = None
+        if websocket is not None:
+            self.output = AudioOutputWorker(self.audio_output_queue, websocket, self.egress)
+
         self.workers: List[BaseWorker] = [
             self.transcriber,
             self.llm,
-            # self.synthesizer
+            self.chunker,
         ]
+        if self.vad:
+            self.workers.insert(0, self.vad)
+        if self.synthesizer:
+            self.workers.append(self.synthesizer)
+        if self.output:
+            self.workers.append(self.output)
+        for worker in self.workers:
+            worker.bind_session(self.tracer)
+
+        self.last_interruption_ms: Optional[float] = None
+        self.caller_speaking = False
+        self.last_speech_at: Optional[float] = None # Monotonic time of the last VAD speech event
+        self.last_activity_at = time.monotonic() # Last time the caller or the bot was speaking
 
     async def start(self):
         # Start all workers
         for worker in self.workers:
             worker.start()
+        if self.tools:
+            self.tools.start()
 
     async def terminate(self):
         # Stop all workers
         for worker in self.workers:
             await worker.terminate()
+        logger.info(f"Pipeline queue stats: {self.queue_stats()}")
+
+    async def process_audio_chunk(self, chunk: bytes, sequence: Optional[int] = None):
+        """Entry point for audio from WebSocket, in the caller's wire format"""
+        if self.transcriber.stream_started_at is None:
+            self.transcriber.stream_started_at = time.monotonic()
+        for pcm in self.ingress.decode(chunk, sequence):
+            await self.audio_input_queue.put(pcm)
+
+    def queue_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Depth and drop counters per stage."""
+        return {channel.name: channel.stats() for channel in self.channels}
+
+    @property
+    def is_speaking(self) -> bool:
+        """True while the bot has a reply generating, queued or still playing."""
+        return (
+            self.llm.is_busy
+            or not self.llm_output_queue.empty()
+            or bool(self.chunker.buffer)
+            or not self.synthesis_input_queue.empty()
+            or not self.audio_output_queue.empty()
+            or (self.synthesizer is not None and self.synthesizer.is_speaking)
+            or (self.output is not None and self.output.is_playing)
+        )
 
-    async def process_audio_chunk(self, chunk: bytes):
-        """Entry point for audio from WebSocket"""
-        await self.audio_input_queue.put(chunk)
+    def silent_for(self) -> float:
+        """
+        Seconds since the caller (per the VAD) or the bot last spoke.
+        Without the VAD only bot turns count, and those follow every final transcript.
+        """
+        now = time.monotonic()
+        if self.caller_speaking or self.is_speaking:
+            self.last_activity_at = now
+        elif self.last_speech_at is not None and self.last_speech_at > self.last_activity_at:
+            self.last_activity_at = self.last_speech_at
+        return now - self.last_activity_at
+
+    async def handle_speech_event(self, event: SpeechEvent):
+        """Local VAD speech start/end. Barge-in still waits for recognized words (see transcriber)."""
+        self.caller_speaking = event.kind == "start"
+        self.last_speech_at = event.created_at
+        if self.caller_speaking:
+            metrics.increment("voice_vad_speech_segments_total", 1, "Caller speech segments detected by the VAD")
+
+    async def handle_interruption(self):
+        """
+        Barge-in: the caller started talking over the bot.
+        Stops generation and synthesis and discards queued text and audio.
+        """
+        if not self.is_speaking:
+            return
+
+        started = time.monotonic()
+
+        # 1. Silence the synthesizer first so no new audio is produced
+        spoken_text = self.synthesizer.interrupt() if self.synthesizer else None
+
+        # 2. Cancel the Groq stream and cut history to what the caller heard
+        self.llm.interrupt(spoken_text)
+
+        # 3. Flush everything queued downstream of the LLM
+        self.chunker.reset()
+        dropped = sum(
+            drain_queue(queue)
+            for queue in (self.llm_output_queue, self.synthesis_input_queue, self.audio_output_queue)
+        )
+        if self.output:
+            self.output.interrupt()
 
+        self.last_interruption_ms = (time.monotonic() - started) * 1000
+        metrics.observe("voice_barge_in_ms", self.last_interruption_ms, "Caller speech onset to pipeline silenced")
+        logger.info(f"Barge-in handled in {self.last_interruption_ms:.1f}ms ({dropped} queued items dropped)")
+        if self.last_interruption_ms > settings.BARGE_IN_TARGET_MS:
+            logger.warning(f"Barge-in exceeded {settings.BARGE_IN_TARGET_MS}ms target")
@@ -0,0 +1,107 @@
+import asyncio
+from collections import defaultdict
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.metrics import metrics
+
+class OverflowPolicy(str, Enum):
+    BLOCK = "block"             # Producer waits for room (backpressure)
+    DROP_OLDEST = "drop_oldest" # Evict the head to make room (live audio)
+    DROP_NEWEST = "drop_newest" # Discard the incoming item
+    COALESCE = "coalesce"       # Newer item replaces a superseded one at the tail
+
+# Process-wide drop/coalesce totals per channel name, for node sizing across calls
+_totals: Dict[str, Dict[str, int]] = defaultdict(lambda: {"dropped": 0, "coalesced": 0})
+
+def channel_totals() -> Dict[str, Dict[str, int]]:
+    return {name: dict(counts) for name, counts in _totals.items()}
+
+def _render_totals() -> List[str]:
+    lines: List[str] = []
+    for counter in ("dropped", "coalesced"):
+        lines.append(f"# TYPE voice_queue_{counter}_total counter")
+        for name, counts in sorted(_totals.items()):
+            lines.append(f'voice_queue_{counter}_total{{queue="{name}"}} {counts[counter]}')
+    return lines
+
+metrics.register_collector(_render_totals)
+
+
+class Channel(asyncio.Queue):
+    """
+    Bounded asyncio.Queue with a per-stage overflow policy.
+    Drop-in for the queues workers consume from; adds depth and drop counters.
+
+    `can_coalesce(old, new)` decides whether `new` supersedes `old` (COALESCE only).
+    The None shutdown sentinel is never dropped or coalesced.
+    """
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 0,
+        policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        can_coalesce: Optional[Callable[[Any, Any], bool]] = None
+    ):
+        super().__init__(maxsize)
+        self.name = name
+        self.policy = policy
+        self.can_coalesce = can_coalesce
+        self.dropped = 0
+        self.coalesced = 0
+        self.high_watermark = 0
+
+    async def put(self, item: Any):
+        if item is not None and self._try_overflow(item):
+            return
+        await super().put(item)
+        self._track_depth()
+
+    def put_nowait(self, item: Any):
+        if item is not None and self._try_overflow(item):
+            return
+        super().put_nowait(item)
+        self._track_depth()
+
+    def _try_overflow(self, item: Any) -> bool:
+        """Applies the overflow policy. Returns True if the item was fully handled."""
+        if self.policy == OverflowPolicy.COALESCE and self.can_coalesce and self._queue:
+            tail = self._queue[-1]
+            if tail is not None and self.can_coalesce(tail, item):
+                self._queue[-1] = item
+                self.coalesced += 1
+                _totals[self.name]["coalesced"] += 1
+                return True
+
+        if not self.full():
+            return False
+
+        if self.policy == OverflowPolicy.DROP_OLDEST and self._queue[0] is not None:
+            self._queue.popleft()
+            self._count_drop()
+            # The evicted item will never be consumed, balance unfinished tasks for join()
+            self.task_done()
+            return False
+        if self.policy == OverflowPolicy.DROP_NEWEST:
+            self._count_drop()
+            return True
+        return False
+
+    def _count_drop(self):
+        self.dropped += 1
+        _totals[self.name]["dropped"] += 1
+
+    def _track_depth(self):
+        depth = self.qsize()
+        if depth > self.high_watermark:
+            self.high_watermark = depth
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.qsize(),
+            "maxsize": self.maxsize,
+            "policy": self.policy.value,
+            "high_watermark": self.high_watermark,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
@@ -1,13 +1,42 @@
-from typing import Optional
-from pydantic import BaseModel
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Union
 
-class TranscriptEvent(BaseModel):
+# All events carry the session/turn they belong to and a monotonic creation
+# timestamp, so latency can be attributed to a pipeline stage.
+#
+# These are created per audio frame and per LLM token, so they are plain slotted
+# dataclasses: no validation and no per-instance __dict__. Data from outside
+# (provider messages, websocket parameters) is validated where it is received.
+
+@dataclass(slots=True)
+class TranscriptEvent:
     text: str
     is_final: bool
     confidence: float = 1.0
+    session_id: str = ""
+    turn_id: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    speech_end_at: Optional[float] = None # Monotonic time the caller stopped talking (finals only)
+
+@dataclass(slots=True)
+class SpeechEvent:
+    kind: str # "start" or "end" of caller speech, from the local VAD
+    offset_s: float # Position in the caller's audio stream
+    session_id: str = ""
+    created_at: float = field(default_factory=time.monotonic)
 
-class LLMChunkEvent(BaseModel):
+@dataclass(slots=True)
+class LLMChunkEvent:
     token: str
-    
-class AudioChunkEvent(BaseModel):
-    chunk: bytes
+    flush: bool = False # Render buffered text now (first phrase, end of turn)
+    session_id: str = ""
+    turn_id: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+
+@dataclass(slots=True)
+class AudioChunkEvent:
+    chunk: Union[bytes, memoryview] # memoryview: zero-copy slice of the TTS cache segment
+    session_id: str = ""
+    turn_id: int = 0
+    created_at: float = field(default_factory=time.monotonic)
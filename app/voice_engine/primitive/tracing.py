@@ -0,0 +1,43 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.core.metrics import metrics
+
+# (metric, start mark, end mark, description)
+TURN_METRICS = (
+    ("voice_stt_latency_ms", "speech_end", "final_transcript", "End of caller speech to final transcript"),
+    ("voice_llm_ttft_ms", "final_transcript", "first_token", "Final transcript to first LLM token"),
+    ("voice_tts_ttfb_ms", "first_token", "first_audio", "First LLM token to first synthesized audio byte"),
+    ("voice_mouth_to_ear_ms", "speech_end", "first_audio", "End of caller speech to first audio byte back"),
+)
+
+class TurnTracer:
+    """
+    Collects monotonic timestamps per conversational turn for one session
+    and records stage latencies into the process-wide histograms.
+    Only the first mark of each stage per turn counts. Each turn's latencies are
+    also kept (for the call log) after its marks are evicted.
+    """
+    MAX_TURNS = 16
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns: "OrderedDict[int, Dict[str, float]]" = OrderedDict()
+        self.latencies: Dict[int, Dict[str, float]] = {} # turn -> metric name -> ms
+
+    def mark(self, turn_id: int, stage: str, at: Optional[float] = None):
+        marks = self.turns.get(turn_id)
+        if marks is None:
+            marks = self.turns[turn_id] = {}
+            if len(self.turns) > self.MAX_TURNS:
+                self.turns.popitem(last=False)
+        if stage in marks:
+            return
+
+        marks[stage] = at if at is not None else time.monotonic()
+        for name, start, end, description in TURN_METRICS:
+            if end == stage and start in marks:
+                latency_ms = (marks[end] - marks[start]) * 1000
+                metrics.observe(name, latency_ms, description)
+                self.latencies.setdefault(turn_id, {})[name] = round(latency_ms, 1)
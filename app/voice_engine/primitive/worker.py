@@ -1,7 +1,13 @@
 import asyncio
 import logging
+import random
+import time
 from typing import Optional, Any, Generic, TypeVar
 
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.voice_engine.primitive.tracing import TurnTracer
+
 T = TypeVar("T")
 
 logger = logging.getLogger(__name__)
@@ -10,12 +16,23 @@ class InterruptibleEvent(Generic[T]):
     """
     Wrapper for payloads that can be interrupted.
     Used to propagate interruption signals through the pipeline.
+    One wraps every LLM token, so the asyncio.Event is only created if someone waits on it.
     """
+    __slots__ = ("payload", "is_interruptible", "interrupted", "_event")
+
     def __init__(self, payload: T, is_interruptible: bool = True):
         self.payload = payload
         self.is_interruptible = is_interruptible
-        self.interruption_event = asyncio.Event()
         self.interrupted = False
+        self._event: Optional[asyncio.Event] = None
+
+    @property
+    def interruption_event(self) -> asyncio.Event:
+        if self._event is None:
+            self._event = asyncio.Event()
+            if self.interrupted:
+                self._event.set()
+        return self._event
 
     def interrupt(self) -> bool:
         """
@@ -26,33 +43,97 @@ class InterruptibleEvent(Generic[T]):
             return False
         
         if not self.interrupted:
-            self.interruption_event.set()
             self.interrupted = True
+            if self._event is not None:
+                self._event.set()
             return True
         return False
 
     def is_set(self) -> bool:
-        return self.interruption_event.is_set()
+        return self.interrupted
+
+
+def drain_queue(queue: asyncio.Queue) -> int:
+    """
+    Removes every pending item from a queue without blocking.
+    Wrapped items are interrupted so holders of a reference drop them too.
+    Returns the number of items removed.
+    """
+    drained = 0
+    while True:
+        try:
+            item = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return drained
+        if item is None:
+            # Keep shutdown sentinels, they are not pipeline payloads
+            queue.put_nowait(None)
+            return drained
+        if isinstance(item, InterruptibleEvent):
+            item.interrupt()
+        queue.task_done()
+        drained += 1
 
 
 class BaseWorker:
     """
     Base class for all pipeline workers.
     Consumes from input_queue processing items and optionally putting to output_queue.
+    If _run_loop() itself crashes, it is restarted with exponential backoff.
     """
     def __init__(self, input_queue: asyncio.Queue, output_queue: Optional[asyncio.Queue] = None):
         self.input_queue = input_queue
         self.output_queue = output_queue
         self.active = False
         self.task: Optional[asyncio.Task] = None
+        # Set by the pipeline via bind_session()
+        self.session_id = ""
+        self.tracer: Optional[TurnTracer] = None
+
+    def bind_session(self, tracer: TurnTracer):
+        """Attaches the session's turn tracer so emitted events can be correlated."""
+        self.tracer = tracer
+        self.session_id = tracer.session_id
+
+    def mark(self, turn_id: int, stage: str, at: Optional[float] = None):
+        if self.tracer:
+            self.tracer.mark(turn_id, stage, at)
+
+    def record_process_time(self, started: float):
+        # Sampled: most items are single audio frames or LLM tokens
+        if random.random() >= settings.WORKER_PROCESS_SAMPLE_RATE:
+            return
+        metrics.observe(
+            "voice_worker_process_ms", (time.monotonic() - started) * 1000,
+            "Time spent processing one item per worker (sampled, WORKER_PROCESS_SAMPLE_RATE)", worker=self.__class__.__name__
+        )
 
     def start(self):
         """Start the worker's processing loop."""
         if not self.active:
             self.active = True
-            self.task = asyncio.create_task(self._run_loop())
+            self.task = asyncio.create_task(self._supervise())
             logger.info(f"{self.__class__.__name__} started")
 
+    async def _supervise(self):
+        restarts = 0
+        while self.active:
+            started = time.monotonic()
+            try:
+                await self._run_loop()
+                return # Sentinel or terminate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if time.monotonic() - started > settings.WORKER_RESTART_BACKOFF_MAX_S:
+                    restarts = 0 # It had been running fine, this is a new failure
+                delay = min(settings.WORKER_RESTART_BACKOFF_S * 2 ** restarts, settings.WORKER_RESTART_BACKOFF_MAX_S)
+                restarts += 1
+                name = self.__class__.__name__
+                metrics.increment("voice_worker_restarts_total", 1, "Pipeline workers restarted after crashing", worker=name)
+                logger.exception(f"{name} crashed, restarting in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
     async def _run_loop(self):
         """Main loop: consumes items from queue and processes them."""
         while self.active:
@@ -61,7 +142,9 @@ class BaseWorker:
                 if item is None: # Sentinel for shutdown
                     break
                 
+                started = time.monotonic()
                 await self.process(item)
+                self.record_process_time(started)
                 self.input_queue.task_done()
             except asyncio.CancelledError:
                 break
@@ -82,3 +165,64 @@ class BaseWorker:
             except asyncio.CancelledError:
                 pass
         logger.info(f"{self.__class__.__name__} terminated")
+
+
+class InterruptibleWorker(BaseWorker):
+    """
+    Worker whose current item can be cancelled mid-flight (barge-in).
+    Items are wrapped in InterruptibleEvent; interrupted items are skipped
+    and process() receives the unwrapped payload.
+    """
+    def __init__(self, input_queue: asyncio.Queue, output_queue: Optional[asyncio.Queue] = None):
+        super().__init__(input_queue, output_queue)
+        self.current_event: Optional[InterruptibleEvent] = None
+        self.current_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_busy(self) -> bool:
+        return self.current_task is not None and not self.current_task.done()
+
+    async def _run_loop(self):
+        while self.active:
+            try:
+                item = await self.input_queue.get()
+                if item is None: # Sentinel for shutdown
+                    break
+
+                event = item if isinstance(item, InterruptibleEvent) else InterruptibleEvent(item)
+                if event.is_set():
+                    self.input_queue.task_done()
+                    continue
+
+                self.current_event = event
+                started = time.monotonic()
+                self.current_task = asyncio.create_task(self.process(event.payload))
+                try:
+                    # wait() does not propagate the inner task's cancellation to us
+                    await asyncio.wait({self.current_task})
+                finally:
+                    if not self.current_task.done():
+                        self.current_task.cancel()
+
+                self.record_process_time(started)
+                if not self.current_task.cancelled() and self.current_task.exception():
+                    exc = self.current_task.exception()
+                    logger.error(f"Error in {self.__class__.__name__}: {exc}", exc_info=exc)
+
+                self.current_event = None
+                self.input_queue.task_done()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.exception(f"Error in {self.__class__.__name__}: {e}")
+
+    def interrupt_current(self) -> bool:
+        """
+        Cancels the item currently being processed.
+        Returns True if there was an in-flight item to interrupt.
+        """
+        if self.current_event is None or not self.current_event.interrupt():
+            return False
+        if self.current_task and not self.current_task.done():
+            self.current_task.cancel()
+        return True
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import re
+import time
+from datetime import date, datetime, time as day_time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.metrics import metrics
+from app.services.patients import find_patients_by_phone
+from app.services.pms.availability import Booking, Slot, availability
+
+TOOLS_PROMPT = (
+    " You can look up the caller, check free appointment times and book appointments with your tools."
+    " Only offer times that find_slots returned, and confirm the time with the caller before booking."
+    " You can only look up and book for the caller's own record, found from the number they call from."
+    " Say times the way people speak them, like two thirty on Thursday."
+)
+
+TOOL_SPECS: List[Dict[str, Any]] = [
+    {
+        "type": "function",
+        "function": {
+            "name": "find_slots",
+            "description": "Free appointment times on a day (or the next free ones after it).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "day": {
+                        "type": "string",
+                        "description": "As the caller said it: today, tomorrow, a weekday name like next thursday, or YYYY-MM-DD",
+                    },
+                    "part_of_day": {"type": "string", "enum": ["any", "morning", "afternoon", "evening"]},
+                    "duration_minutes": {"type": "integer", "description": "Visit length, 30 for a cleaning or checkup"},
+                    "provider": {"type": "string", "description": "Only if the caller asked for someone"},
+                },
+                "required": ["day"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "book_appointment",
+            "description": "Books a time returned by find_slots for the caller, after they confirmed it.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "start": {"type": "string", "description": "The slot's start, exactly as find_slots returned it"},
+                    "duration_minutes": {"type": "integer"},
+                    "provider": {"type": "string"},
+                },
+                "required": ["start"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "lookup_patient",
+            "description": "Finds the caller's patient record from the number they are calling from.",
+            "parameters": {"type": "object", "properties": {}},
+        },
+    },
+]
+
+# Interim transcripts that sound like scheduling start loading availability
+_SCHEDULING_INTENT = re.compile(
+    r"\b(book|booking|appointment|schedule|reschedule|available|availability|opening|openings|"
+    r"cleaning|checkup|check-up|come in|see the dentist)\b",
+    re.IGNORECASE,
+)
+_WEEKDAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+_PARTS_OF_DAY = {
+    "morning": (day_time(0), day_time(12)),
+    "afternoon": (day_time(12), day_time(17)),
+    "evening": (day_time(17), day_time(23, 59)),
+}
+# Options read back to the caller, at least this far apart
+_OFFERED_SLOTS = 3
+_OFFER_SPACING = timedelta(hours=1)
+
+
+def resolve_day(text: str, today: date) -> Optional[date]:
+    """Day named in caller/LLM phrasing ("tomorrow", "next thursday", "2026-10-22"), or None."""
+    text = text.lower()
+    match = re.search(r"\d{4}-\d{2}-\d{2}", text)
+    if match:
+        try:
+            return date.fromisoformat(match.group())
+        except ValueError:
+            return None
+    if re.search(r"\btoday\b", text):
+        return today
+    if re.search(r"\btomorrow\b", text):
+        return today + timedelta(days=1)
+    for weekday, name in enumerate(_WEEKDAY_NAMES):
+        if re.search(rf"\b{name}\b", text):
+            # The coming one, never today ("next thursday" is read the same way; the model confirms the date)
+            return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+    return None
+
+
+def _label(at: datetime) -> str:
+    return f"{at:%A %B} {at.day} at {at.hour % 12 or 12}:{at:%M %p}"
+
+
+class ToolSession:
+    """
+    Scheduling tools for one call. The LLM's tool calls for a round run
+    concurrently, each bounded by TOOLS_TIMEOUT_S; failures come back to the
+    model as {"error": ...} so it can say so instead of going silent.
+    Work the call will likely need is started early: the caller's patient record
+    at call start, and the practice's availability index as soon as an interim
+    transcript sounds like scheduling, so the tool calls mostly hit warm caches.
+    Patients are only ever resolved from the call's own caller ID: nothing the
+    caller says can look up or book as someone else.
+    """
+    def __init__(self, practice_id: int, caller: Optional[str] = None):
+        self.practice_id = practice_id
+        self.caller = caller
+        self.handlers: Dict[str, Callable[..., Any]] = {
+            "find_slots": self.find_slots,
+            "book_appointment": self.book_appointment,
+            "lookup_patient": self.lookup_patient,
+        }
+        self.caller_lookup: Optional[asyncio.Task] = None
+        self.prefetched: Set[Tuple[date, date]] = set()
+        self.tz: Optional[ZoneInfo] = None # The practice's, loaded with the first prefetch
+        self.tz_lookup: Optional[asyncio.Task] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    def start(self):
+        if self.caller:
+            self.caller_lookup = self._spawn(self._lookup(self.caller))
+
+    def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Tool prefetch failed: {task.exception()!r}")
+
+    # --- Prefetch ----------------------------------------------------------------
+
+    def prefetch(self, text: str):
+        """Called with each interim transcript; warms availability for the days it mentions."""
+        if not _SCHEDULING_INTENT.search(text):
+            return
+        if self.tz is None:
+            # "Today" is the practice's, so the first prefetch waits for its timezone
+            if self.tz_lookup is None:
+                self.tz_lookup = self._spawn(self._prefetch_in_practice_tz(text))
+            return
+        self._prefetch_days(text)
+
+    async def _prefetch_in_practice_tz(self, text: str):
+        try:
+            self.tz = await availability.practice_tz(self.practice_id)
+        finally:
+            if self.tz is None:
+                self.tz_lookup = None # Failed: the next scheduling transcript tries again
+        self._prefetch_days(text)
+
+    def _prefetch_days(self, text: str):
+        today = datetime.now(self.tz).date()
+        first = resolve_day(text, today) or today
+        days = (first, first + timedelta(days=settings.TOOLS_PREFETCH_DAYS))
+        if days in self.prefetched:
+            return
+        self.prefetched.add(days)
+        metrics.increment("llm_tool_prefetch_total", 1, "Availability prefetches started from interim transcripts")
+        start = datetime.combine(days[0], day_time(0), tzinfo=self.tz)
+        end = datetime.combine(days[1], day_time(0), tzinfo=self.tz)
+        self._spawn(availability.find_slots(self.practice_id, start, end, limit=1))
+
+    # --- Execution ---------------------------------------------------------------
+
+    async def run(self, calls: List[Dict[str, str]]) -> List[str]:
+        """Runs one round of tool calls ({"id", "name", "arguments"}) concurrently, results in order."""
+        return await asyncio.gather(*(self._run_one(call) for call in calls))
+
+    async def _run_one(self, call: Dict[str, str]) -> str:
+        started = time.monotonic()
+        name = call["name"]
+        try:
+            handler = self.handlers.get(name)
+            if handler is None:
+                raise ValueError(f"Unknown tool {name}")
+            arguments = json.loads(call["arguments"] or "{}")
+            result = await asyncio.wait_for(handler(**arguments), timeout=settings.TOOLS_TIMEOUT_S)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            result, outcome = {"error": "The scheduling system did not answer in time."}, "timeout"
+        except Exception as e:
+            result, outcome = {"error": str(e) or e.__class__.__name__}, "error"
+        elapsed_ms = (time.monotonic() - started) * 1000
+        metrics.observe("llm_tool_ms", elapsed_ms, "Tool call execution", tool=name)
+        metrics.increment("llm_tool_calls_total", 1, "Tool calls by outcome", tool=name, result=outcome)
+        logger.info(f"Tool {name}({call['arguments']}) -> {outcome} in {elapsed_ms:.0f}ms")
+        return json.dumps(result, default=str)
+
+    # --- Tools -------------------------------------------------------------------
+
+    async def find_slots(
+        self,
+        day: str,
+        part_of_day: str = "any",
+        duration_minutes: int = 30,
+        provider: Optional[str] = None
+    ) -> Dict[str, Any]:
+        tz = await availability.practice_tz(self.practice_id)
+        today = datetime.now(tz).date()
+        first = resolve_day(day, today)
+        if first is None:
+            return {"error": f"Could not tell which day '{day}' is; ask for a date."}
+
+        begin, finish = _PARTS_OF_DAY.get(part_of_day, (day_time(0), day_time(23, 59)))
+        start = datetime.combine(first, begin, tzinfo=tz)
+        slots = await availability.find_slots(
+            self.practice_id, start, datetime.combine(first, finish, tzinfo=tz), duration_minutes, provider, limit=100
+        )
+        result: Dict[str, Any] = {"day": f"{first:%A %B} {first.day}"}
+        if not slots:
+            # Nothing that day: offer the next free times instead of a dead end
+            end = start + timedelta(days=settings.TOOLS_PREFETCH_DAYS)
+            slots = await availability.find_slots(self.practice_id, start, end, duration_minutes, provider, limit=100)
+            result["requested_day_full"] = True
+        result["slots"] = [self._offer(slot, tz) for slot in self._spread(slots)]
+        return result
+
+    @staticmethod
+    def _spread(slots: List[Slot]) -> List[Slot]:
+        offered: List[Slot] = []
+        for slot in slots:
+            if not offered or slot.start - offered[-1].start >= _OFFER_SPACING:
+                offered.append(slot)
+                if len(offered) == _OFFERED_SLOTS:
+                    break
+        return offered
+
+    @staticmethod
+    def _offer(slot: Slot, tz: ZoneInfo) -> Dict[str, str]:
+        local = slot.start.astimezone(tz)
+        return {"start": local.isoformat(), "label": _label(local), "provider": slot.provider}
+
+    async def book_appointment(
+        self,
+        start: str,
+        duration_minutes: int = 30,
+        provider: Optional[str] = None
+    ) -> Dict[str, Any]:
+        tz = await availability.practice_tz(self.practice_id)
+        at = datetime.fromisoformat(start)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=tz)
+        found = await self.lookup_patient()
+        if "error" in found:
+            return found
+        matches = found["patients"]
+        if not matches:
+            return {"error": "No patient record has the number they are calling from; the office has to book this visit."}
+        if len(matches) > 1:
+            return {"error": "Several patients share the number they are calling from; the office has to book this visit."}
+
+        booking = await availability.book(
+            self.practice_id, Booking(at, duration_minutes, provider), matches[0]["patient_id"]
+        )
+        return {
+            "booked": True,
+            "appointment_id": booking.appointment_id,
+            "start": at.astimezone(tz).isoformat(),
+            "label": _label(at.astimezone(tz)),
+            "provider": booking.provider,
+        }
+
+    async def lookup_patient(self) -> Dict[str, Any]:
+        if not self.caller:
+            return {"error": "No caller ID on this call, so their record can't be looked up; the office can help."}
+        lookup = self.caller_lookup
+        if lookup is None or lookup.cancelled() or (lookup.done() and lookup.exception()):
+            self.caller_lookup = self._spawn(self._lookup(self.caller)) # Not started, or the one at call start failed
+        return {"patients": await asyncio.shield(self.caller_lookup)}
+
+    async def _lookup(self, phone: str) -> List[Dict[str, Any]]:
+        async with async_session() as db:
+            patients = await find_patients_by_phone(db, phone, self.practice_id)
+            return [{"patient_id": p.id, "first_name": p.first_name, "last_name": p.last_name} for p in patients]
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+AudioBuffer = Union[bytes, memoryview]
+
+# On-disk segment layout (little endian):
+#   header: magic, entry count
+#   index:  entry count x (sha256 key, data offset, data length, duration ms)
+#   data:   concatenated audio
+_MAGIC = b"SVTTS001"
+_HEADER = struct.Struct("<8sI")
+_ENTRY = struct.Struct("<32sQII")
+
+# Disk hits are served as slices of the mapping, this many bytes per AudioChunkEvent
+SEGMENT_CHUNK_BYTES = 8192
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a phrase for cache lookups (case and punctuation affect prosody, so they stay)."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(text: str, voice_id: str, model_id: str, voice_settings: Dict, output_format: str) -> bytes:
+    material = json.dumps([normalize_text(text), voice_id, model_id, voice_settings, output_format], sort_keys=True)
+    return hashlib.sha256(material.encode()).digest()
+
+
+class CachedAudio:
+    """Rendered audio for one phrase, held as the chunks it is streamed in."""
+    __slots__ = ("chunks", "duration_ms", "nbytes")
+
+    def __init__(self, chunks: Sequence[AudioBuffer], duration_ms: int):
+        self.chunks = tuple(chunks)
+        self.duration_ms = duration_ms
+        self.nbytes = sum(len(chunk) for chunk in self.chunks)
+
+
+class SegmentStore:
+    """
+    Read-only, memory-mapped segment file written by scripts/prewarm_tts_cache.py.
+    Every worker process maps the same file, so the audio lives once in the page
+    cache and hits are served as memoryview slices without copying. The file is
+    replaced atomically by the pre-warm command and picked up on process start.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.index: Dict[bytes, Tuple[int, int, int]] = {}
+        self.view: Optional[memoryview] = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    def open(self):
+        try:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError): # ValueError: empty file
+            logger.info(f"No TTS cache segment at {self.path}")
+            return
+
+        magic, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            logger.warning(f"Ignoring TTS cache segment with unknown format: {self.path}")
+            self._mmap.close()
+            self._mmap = None
+            return
+
+        for i in range(count):
+            key, offset, length, duration_ms = _ENTRY.unpack_from(self._mmap, _HEADER.size + i * _ENTRY.size)
+            self.index[key] = (offset, length, duration_ms)
+        self.view = memoryview(self._mmap)
+        logger.info(f"Mapped TTS cache segment {self.path} ({count} phrases, {len(self._mmap)} bytes)")
+
+    def get(self, key: bytes) -> Optional[CachedAudio]:
+        entry = self.index.get(key)
+        if entry is None or self.view is None:
+            return None
+        offset, length, duration_ms = entry
+        audio = self.view[offset:offset + length]
+        chunks = [audio[i:i + SEGMENT_CHUNK_BYTES] for i in range(0, length, SEGMENT_CHUNK_BYTES)]
+        return CachedAudio(chunks, duration_ms)
+
+    @staticmethod
+    def write(path: str, entries: Iterable[Tuple[bytes, bytes, int]]):
+        """Writes (key, audio, duration_ms) entries to a new segment, replacing `path` atomically."""
+        entries = list(entries)
+        offset = _HEADER.size + len(entries) * _ENTRY.size
+        index = bytearray(_HEADER.pack(_MAGIC, len(entries)))
+        for key, audio, duration_ms in entries:
+            index += _ENTRY.pack(key, offset, len(audio), duration_ms)
+            offset += len(audio)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(index)
+            for _, audio, _ in entries:
+                f.write(audio)
+        os.replace(tmp_path, path)
+
+
+class TTSCache:
+    """
+    Synthesized audio for recurring phrases, keyed by normalized text, voice, model,
+    voice settings and output format. Two tiers: a per-process LRU (bounded by
+    TTS_CACHE_MEMORY_MB) filled from live ElevenLabs renders, and the shared
+    on-disk segment.
+    """
+    def __init__(self):
+        self.memory: "OrderedDict[bytes, CachedAudio]" = OrderedDict()
+        self.memory_bytes = 0
+        self.max_memory_bytes = settings.TTS_CACHE_MEMORY_MB * 2**20
+        self.segment = SegmentStore(settings.TTS_CACHE_SEGMENT_PATH)
+        self._opened = False
+
+    def get(self, key: bytes) -> Optional[CachedAudio]:
+        cached = self.memory.get(key)
+        if cached is not None:
+            self.memory.move_to_end(key)
+            metrics.increment("voice_tts_cache_total", 1, "TTS cache lookups", result="memory")
+            return cached
+
+        if not self._opened:
+            self._opened = True
+            self.segment.open()
+        cached = self.segment.get(key)
+        metrics.increment("voice_tts_cache_total", 1, "TTS cache lookups", result="disk" if cached else "miss")
+        return cached
+
+    def put(self, key: bytes, chunks: List[bytes], duration_ms: int):
+        cached = CachedAudio(chunks, duration_ms)
+        if cached.nbytes > self.max_memory_bytes:
+            return
+        previous = self.memory.pop(key, None)
+        if previous is not None:
+            self.memory_bytes -= previous.nbytes
+        self.memory[key] = cached
+        self.memory_bytes += cached.nbytes
+        while self.memory_bytes > self.max_memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted.nbytes
+
+    def render_metrics(self) -> List[str]:
+        return [
+            "# TYPE voice_tts_cache_memory_bytes gauge",
+            f"voice_tts_cache_memory_bytes {self.memory_bytes}",
+            "# TYPE voice_tts_cache_entries gauge",
+            f'voice_tts_cache_entries{{tier="memory"}} {len(self.memory)}',
+            f'voice_tts_cache_entries{{tier="disk"}} {len(self.segment.index)}',
+        ]
+
+
+tts_cache = TTSCache()
+metrics.register_collector(tts_cache.render_metrics)
@@ -0,0 +1,139 @@
+import asyncio
+import re
+import time
+from typing import Optional
+from loguru import logger
+
+from app.core.config import settings
+from app.voice_engine.primitive.worker import BaseWorker, InterruptibleEvent
+from app.voice_engine.primitive.events import LLMChunkEvent
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets), whitespace, then the next word
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+(?=\S)")
+# Clause end: comma, semicolon, colon or dash followed by whitespace ("3:30" and "1,000" don't match)
+_CLAUSE_END = re.compile(r"(?:[,;:]|\s[-–—])\s+(?=\S)")
+
+# Never end a sentence after these
+_TITLES = {"dr.", "mr.", "mrs.", "ms.", "st.", "vs.", "e.g.", "i.e.", "approx.", "no.", "apt."}
+# End a sentence only if the next word is capitalized ("3:30 p.m. Which one...")
+_AMBIGUOUS = {"a.m.", "p.m.", "etc.", "jr.", "sr.", "inc."}
+
+
+def _is_sentence_end(buffer: str, match: re.Match) -> bool:
+    words = buffer[:match.start() + 1].split()
+    last_word = words[-1].lower() if words else ""
+    if last_word in _TITLES:
+        return False
+    if last_word in _AMBIGUOUS or re.fullmatch(r"[a-z]\.", last_word):
+        return buffer[match.end()].isupper()
+    return True
+
+
+def find_split(buffer: str, first_phrase: bool) -> int:
+    """
+    Returns the index to cut `buffer` at (end of a complete phrase), or 0 if none yet.
+    The first phrase of a turn may end at any clause; later ones need MIN_CLAUSE chars.
+    """
+    for match in _SENTENCE_END.finditer(buffer):
+        if _is_sentence_end(buffer, match):
+            return match.end()
+
+    min_clause = 1 if first_phrase else settings.TTS_CHUNK_MIN_CLAUSE_CHARS
+    for match in _CLAUSE_END.finditer(buffer):
+        if match.start() >= min_clause:
+            return match.end()
+    return 0
+
+
+class PhraseChunker(BaseWorker):
+    """
+    Aggregates LLM tokens into phrases before synthesis.
+    Flushes on sentence/clause boundaries, a character budget or a time budget,
+    and flushes the first phrase of each turn early to keep time-to-first-audio low.
+    Fewer, larger websocket messages also give ElevenLabs better prosody.
+    """
+    def __init__(self, input_queue: asyncio.Queue, output_queue: asyncio.Queue):
+        super().__init__(input_queue, output_queue)
+        self.buffer = ""
+        self.buffered_since: Optional[float] = None
+        self.turn_id = 0
+        self.first_phrase = True
+
+    async def _run_loop(self):
+        while self.active:
+            try:
+                timeout = None
+                if self.buffered_since is not None:
+                    deadline = self.buffered_since + settings.TTS_CHUNK_MAX_WAIT_MS / 1000
+                    timeout = max(deadline - time.monotonic(), 0)
+
+                try:
+                    item = await asyncio.wait_for(self.input_queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    # Time budget spent without a boundary: emit up to the last whole word
+                    cut = self.buffer.rfind(" ") + 1
+                    await self._emit(cut or len(self.buffer))
+                    continue
+
+                if item is None: # Sentinel for shutdown
+                    break
+
+                if isinstance(item, InterruptibleEvent):
+                    if item.is_set():
+                        self.input_queue.task_done()
+                        continue
+                    item = item.payload
+
+                await self.process(item)
+                self.input_queue.task_done()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.exception(f"Error in {self.__class__.__name__}: {e}")
+
+    async def process(self, item: LLMChunkEvent):
+        if item.turn_id != self.turn_id:
+            self.reset()
+            self.turn_id = item.turn_id
+
+        if item.token:
+            if not self.buffer:
+                self.buffered_since = time.monotonic()
+            self.buffer += item.token
+
+        # End of turn: send everything and ask the synthesizer to render it now
+        if item.flush:
+            await self._emit(len(self.buffer), flush=True)
+            self.first_phrase = True
+            return
+
+        while self.buffer:
+            cut = find_split(self.buffer, self.first_phrase)
+            if not cut and len(self.buffer) >= settings.TTS_CHUNK_MAX_CHARS:
+                cut = self.buffer.rfind(" ", 0, settings.TTS_CHUNK_MAX_CHARS) + 1 or settings.TTS_CHUNK_MAX_CHARS
+            if not cut:
+                break
+            await self._emit(cut)
+
+    async def _emit(self, cut: int, flush: bool = False):
+        phrase, self.buffer = self.buffer[:cut], self.buffer[cut:]
+        self.buffered_since = time.monotonic() if self.buffer else None
+        if not phrase.strip() and not flush:
+            return
+
+        # The first phrase is flushed so ElevenLabs starts rendering without waiting for more text
+        event = LLMChunkEvent(
+            token=phrase,
+            session_id=self.session_id,
+            turn_id=self.turn_id,
+            flush=flush or self.first_phrase
+        )
+        self.first_phrase = False
+        if self.output_queue:
+            await self.output_queue.put(InterruptibleEvent(event))
+
+    def reset(self):
+        """Drops buffered text (new turn or barge-in)."""
+        self.buffer = ""
+        self.buffered_since = None
+        self.first_phrase = True
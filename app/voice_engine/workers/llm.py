@@ -1,57 +1,352 @@
 import asyncio
-from typing import List, Dict
+import difflib
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
 from loguru import logger
-from groq import AsyncGroq
 
 from app.core.config import settings
-from app.voice_engine.primitive.worker import BaseWorker
+from app.core.logging import log_sampler
+from app.core.metrics import metrics
+from app.voice_engine.connection_pool import provider_pool
+from app.voice_engine.history import ConversationHistory, Message
+from app.voice_engine.primitive.worker import InterruptibleWorker, InterruptibleEvent
 from app.voice_engine.primitive.events import TranscriptEvent, LLMChunkEvent
+from app.voice_engine.tools import TOOL_SPECS, TOOLS_PROMPT, ToolSession
 
-class GroqLLMWorker(BaseWorker):
-    def __init__(self, input_queue: asyncio.Queue, output_queue: asyncio.Queue):
+_NON_WORD = re.compile(r"[^\w\s]")
+
+SYSTEM_PROMPT = "You are a helpful dental receptionist named Sarah. Keep answers brief and conversational. Do not use emojis."
+SUMMARY_PROMPT = (
+    "Update the summary of a phone call between a dental receptionist and a caller. "
+    "Keep every fact needed to continue the call (caller details, requested services, "
+    "dates, times, decisions, open questions). Reply with the summary only, under 120 words."
+)
+
+# Spoken when Groq fails (pre-rendered by scripts/prewarm_tts_cache.py)
+FALLBACK_REPLY = "I am having trouble connecting right now."
+
+class ToolsRequested(Exception):
+    """A speculative completion reached a tool call; tools only run once the turn is final."""
+    def __init__(self, text: str, calls: Dict[int, Dict[str, str]]):
+        super().__init__()
+        self.text = text # Content streamed (and spoken) before the tool calls
+        self.calls = calls
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_NON_WORD.sub("", text.lower()).split())
+
+
+class Speculation:
+    """
+    A Groq completion started on a stable interim transcript, before the final.
+    Tokens are buffered until the final transcript commits or discards it.
+    """
+    def __init__(self, text: str, messages: List[Message]):
+        self.text = text
+        self.messages = messages
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.token_count = 0
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def matches(self, final_text: str) -> bool:
+        ratio = difflib.SequenceMatcher(None, _normalize(self.text), _normalize(final_text)).ratio()
+        return ratio >= settings.LLM_SPECULATION_MATCH_THRESHOLD
+
+    async def tokens(self) -> AsyncIterator[str]:
+        while True:
+            token = await self.queue.get()
+            if token is None:
+                if self.error:
+                    raise self.error
+                return
+            yield token
+
+    def cancel(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+        metrics.increment("llm_speculation_wasted_tokens_total", self.token_count, "Tokens generated by discarded speculations")
+
+
+class GroqLLMWorker(InterruptibleWorker):
+    def __init__(self, input_queue: asyncio.Queue, output_queue: asyncio.Queue, tools: Optional[ToolSession] = None):
         super().__init__(input_queue, output_queue)
-        self.client = AsyncGroq(api_key=settings.GROQ_API_KEY)
-        self.conversation_history: List[Dict[str, str]] = [
-            {"role": "system", "content": "You are a helpful dental receptionist named Sarah. Keep answers brief and conversational. Do not use emojis."}
-        ]
+        self.client = provider_pool.groq # Shared across sessions, reuses warm HTTP connections
+        self.tools = tools
+        system_prompt = SYSTEM_PROMPT + TOOLS_PROMPT if tools else SYSTEM_PROMPT
+        # System prompt, rolling summary and recent turns within LLM_HISTORY_TOKEN_BUDGET
+        self.history = ConversationHistory(system_prompt, self._summarize, settings.LLM_HISTORY_TOKEN_BUDGET)
+        self.tool_notes: List[str] = [] # Tool results of the current turn, kept in history
+        self.turn_id = 0
+        # Text the caller actually heard before barging in (None = unknown, keep everything)
+        self.spoken_text: Optional[str] = None
+
+        # Speculative generation (opt-in): latest interim text and its stability timer
+        self.interim_text = ""
+        self.stability_timer: Optional[asyncio.Task] = None
+        self.speculation: Optional[Speculation] = None
 
     async def process(self, item: TranscriptEvent):
-        # We only want to process Final transcripts for logic
-        # Interim transcripts could be used for advanced "speech-while-thinking" logic later (backchanneling)
+        # We only want to process Final transcripts for logic.
+        # Interim transcripts only feed speculative generation, when enabled.
         if not item.is_final:
+            if self.tools:
+                self.tools.prefetch(item.text)
+            if settings.LLM_SPECULATIVE_ENABLED:
+                self._on_interim(item.text)
             return
 
         user_text = item.text
-        logger.info(f"User: {user_text}")
-        
+        if log_sampler.allow("turn_text"):
+            logger.info(f"User: {user_text}")
+
         # Append User Input
-        self.conversation_history.append({"role": "user", "content": user_text})
+        self.history.append("user", user_text)
+        self.turn_id = item.turn_id
+        self.spoken_text = None
+        self.tool_notes = []
+        speculation = self._claim_speculation(user_text)
 
-        # Call Groq
+        # Call Groq (or continue the committed speculative stream)
+        full_response = ""
+        tokens = self._reply(speculation)
         try:
-            stream = await self.client.chat.completions.create(
-                messages=self.conversation_history,
-                model="llama3-70b-8192",
-                stream=True,
-                temperature=0.7,
-                max_tokens=256
-            )
-
-            full_response = ""
-            async for chunk in stream:
-                content = chunk.choices[0].delta.content
-                if content:
-                    full_response += content
-                    # Stream chunk to Synthesizer
-                    if self.output_queue:
-                         await self.output_queue.put(LLMChunkEvent(token=content))
+            async for content in tokens:
+                if not full_response:
+                    self.mark(self.turn_id, "first_token")
+                full_response += content
+                # Stream chunk to Synthesizer
+                if self.output_queue:
+                     await self.output_queue.put(InterruptibleEvent(self._chunk(content)))
 
             # Append Assistant Response (for history)
-            self.conversation_history.append({"role": "assistant", "content": full_response})
-            logger.info(f"Bot: {full_response}")
+            self._record_tools()
+            self.history.append("assistant", full_response)
+            if log_sampler.allow("turn_text"):
+                logger.info(f"Bot: {full_response}")
+            await self._end_turn()
+            self.history.compact()
+
+        except asyncio.CancelledError:
+            # Barge-in: stop paying for tokens and keep only what the caller heard
+            await tokens.aclose()
+            if speculation and speculation.task:
+                speculation.task.cancel()
+            reply = self._spoken_prefix(full_response)
+            self._record_tools() # A booking made before the barge-in still happened
+            if reply:
+                self.history.append("assistant", reply)
+            if log_sampler.allow("turn_text"):
+                logger.info(f"Bot (interrupted): {reply}")
+            self.history.compact()
+            raise
 
         except Exception as e:
             logger.exception(f"LLM Error: {e}")
+            self._record_tools()
             # Fallback (optional)
             if self.output_queue:
-                 await self.output_queue.put(LLMChunkEvent(token="I am having trouble connecting right now."))
+                 await self.output_queue.put(InterruptibleEvent(self._chunk(FALLBACK_REPLY)))
+            await self._end_turn()
+
+    async def _reply(self, speculation: Optional[Speculation]) -> AsyncIterator[str]:
+        if speculation:
+            try:
+                async for content in speculation.tokens():
+                    yield content
+                return
+            except ToolsRequested as e:
+                # The reply needs tools: run the ones it asked for and continue after the text
+                # already yielded, rather than regenerating (and repeating) its opening
+                async for content in self._generate(self.history.messages(), resume=e):
+                    yield content
+                return
+        async for content in self._generate(self.history.messages()):
+            yield content
+
+    async def _generate(
+        self, messages: List[Message], run_tools: bool = True, resume: Optional[ToolsRequested] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streams content tokens from Groq. Closing the generator closes the HTTP stream.
+        With tools, a completion that asks for tool calls gets them run (a round's calls
+        concurrently), the results appended, and is continued, up to TOOLS_MAX_ROUNDS times.
+        The filler phrase is spoken while the first round runs. resume starts from a
+        speculative completion's tool calls instead of a new request.
+        """
+        prompt: List[Dict[str, Any]] = list(messages)
+        said = False
+        for attempt in range(settings.TOOLS_MAX_ROUNDS + 1):
+            if resume is not None:
+                text, calls, said = resume.text, resume.calls, bool(resume.text)
+                resume = None
+            else:
+                tool_args: Dict[str, Any] = {}
+                if self.tools:
+                    tool_args = {"tools": TOOL_SPECS, "tool_choice": "auto" if attempt < settings.TOOLS_MAX_ROUNDS else "none"}
+                stream = await self.client.chat.completions.create(
+                    messages=prompt,
+                    model="llama3-70b-8192",
+                    stream=True,
+                    temperature=0.7,
+                    max_tokens=256,
+                    **tool_args
+                )
+                text = ""
+                calls: Dict[int, Dict[str, str]] = {}
+                try:
+                    async for chunk in stream:
+                        delta = chunk.choices[0].delta
+                        if delta.content:
+                            text += delta.content
+                            said = True
+                            yield delta.content
+                        for call in delta.tool_calls or []:
+                            # Streamed in pieces: the id and name first, the arguments in fragments
+                            entry = calls.setdefault(call.index, {"id": "", "name": "", "arguments": ""})
+                            entry["id"] = call.id or entry["id"]
+                            if call.function:
+                                entry["name"] += call.function.name or ""
+                                entry["arguments"] += call.function.arguments or ""
+                finally:
+                    await stream.close()
+
+            if not calls:
+                return
+            if not run_tools:
+                raise ToolsRequested(text, calls)
+            if not said and settings.TOOLS_FILLER_PHRASE:
+                # Spoken as its own phrase (and from the TTS cache) while the tools run
+                said = True
+                yield settings.TOOLS_FILLER_PHRASE + " "
+                if self.output_queue:
+                    await self.output_queue.put(InterruptibleEvent(self._chunk("", flush=True)))
+
+            ordered = [calls[index] for index in sorted(calls)]
+            results = await self.tools.run(ordered)
+            prompt.append({
+                "role": "assistant",
+                "content": text or None,
+                "tool_calls": [
+                    {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                    for c in ordered
+                ],
+            })
+            for call, result in zip(ordered, results):
+                prompt.append({"role": "tool", "tool_call_id": call["id"], "content": result})
+                self.tool_notes.append(f"{call['name']}({call['arguments']}) returned {result}")
+
+    async def _summarize(self, summary: str, turns: List[Message]) -> str:
+        """Folds older turns into the running summary (background, between turns)."""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turns)
+        response = await self.client.chat.completions.create(
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Current summary: {summary or '(none)'}\n\nNew turns:\n{transcript}"},
+            ],
+            model=settings.LLM_SUMMARY_MODEL,
+            temperature=0.2,
+            max_tokens=200
+        )
+        return response.choices[0].message.content or summary
+
+    def _on_interim(self, text: str):
+        """Restarts the stability timer whenever the interim text changes."""
+        if _normalize(text) == _normalize(self.interim_text):
+            return
+        self.interim_text = text
+        if self.stability_timer:
+            self.stability_timer.cancel()
+        self.stability_timer = asyncio.create_task(self._speculate_when_stable(text))
+
+    async def _speculate_when_stable(self, text: str):
+        await asyncio.sleep(settings.LLM_SPECULATION_STABLE_MS / 1000)
+        if self.speculation:
+            if self.speculation.matches(text):
+                return
+            self.speculation.cancel()
+
+        speculation = Speculation(text, self.history.messages() + [{"role": "user", "content": text}])
+        speculation.task = asyncio.create_task(self._run_speculation(speculation))
+        self.speculation = speculation
+        metrics.increment("llm_speculation_started_total", 1, "Speculative completions started")
+
+    async def _run_speculation(self, speculation: Speculation):
+        try:
+            async for content in self._generate(speculation.messages, run_tools=False):
+                speculation.token_count += 1
+                speculation.queue.put_nowait(content)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            speculation.error = e
+        finally:
+            speculation.queue.put_nowait(None)
+
+    def _reset_speculation(self) -> Optional[Speculation]:
+        """Stops the stability timer and detaches the pending speculation, if any."""
+        if self.stability_timer:
+            self.stability_timer.cancel()
+            self.stability_timer = None
+        self.interim_text = ""
+        speculation, self.speculation = self.speculation, None
+        return speculation
+
+    def _claim_speculation(self, final_text: str) -> Optional[Speculation]:
+        """Commits the pending speculation if it predicted the final transcript, else discards it."""
+        speculation = self._reset_speculation()
+        if speculation is None:
+            return None
+        if speculation.matches(final_text):
+            metrics.increment("llm_speculation_total", 1, "Speculations resolved by a final transcript", result="hit")
+            return speculation
+        metrics.increment("llm_speculation_total", 1, "Speculations resolved by a final transcript", result="miss")
+        speculation.cancel()
+        return None
+
+    async def terminate(self):
+        speculation = self._reset_speculation()
+        if speculation:
+            speculation.cancel()
+        if self.tools:
+            self.tools.close()
+        self.history.close()
+        await super().terminate()
+
+    def _record_tools(self):
+        """Keeps this turn's tool results in history so later turns know what was found or booked."""
+        for note in self.tool_notes:
+            self.history.append("system", f"Tool call {note}")
+        self.tool_notes = []
+
+    def _chunk(self, token: str, flush: bool = False) -> LLMChunkEvent:
+        return LLMChunkEvent(token=token, session_id=self.session_id, turn_id=self.turn_id, flush=flush)
+
+    async def _end_turn(self):
+        """Tells downstream stages the reply is complete so buffered text gets spoken."""
+        if self.output_queue:
+            await self.output_queue.put(InterruptibleEvent(self._chunk("", flush=True)))
+
+    def interrupt(self, spoken_text: Optional[str] = None) -> bool:
+        """
+        Handles caller barge-in. Cancels the in-flight Groq stream, or, if the
+        reply already finished generating, cuts it down to what was spoken.
+        """
+        self.spoken_text = spoken_text
+        if self.interrupt_current():
+            return True
+
+        last = self.history.last
+        if spoken_text is not None and last and last["role"] == "assistant":
+            self.history.replace_last(self._spoken_prefix(last["content"]))
+        return False
+
+    def _spoken_prefix(self, response: str) -> str:
+        """Truncates a reply to the length the synthesizer reported as spoken, on a word boundary."""
+        if self.spoken_text is None or len(self.spoken_text) >= len(response):
+            return response
+        cut = response[:len(self.spoken_text)]
+        if len(cut) < len(response) and not response[len(cut)].isspace():
+            cut = cut.rsplit(" ", 1)[0] if " " in cut else ""
+        return cut.strip()
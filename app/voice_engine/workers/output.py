@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Optional, Union
+from fastapi import WebSocket, WebSocketDisconnect
+from loguru import logger
+
+from app.core.config import settings
+from app.core.logging import log_sampler
+from app.core.metrics import metrics
+from app.voice_engine.codec import AudioEgress
+from app.voice_engine.primitive.worker import BaseWorker
+from app.voice_engine.primitive.events import AudioChunkEvent
+
+# Sent as a text frame on barge-in: the client drops the audio it has buffered
+CLEAR_MESSAGE = '{"event": "clear"}'
+
+
+class AudioOutputWorker(BaseWorker):
+    """
+    Sends synthesized audio to the caller as binary websocket frames of
+    OUTPUT_FRAME_MS in the call's wire format.
+
+    Sends are paced to real time, staying OUTPUT_JITTER_BUFFER_MS ahead of the
+    client's playout, so the client never holds more than that and a slow client
+    backs up into the (drop-oldest) audio_output queue instead of send buffers.
+    Frames are memoryview slices of the synthesized or cached audio; only a
+    chunk's trailing partial frame is copied, to be joined with the next chunk.
+    A partial frame left at the end of a reply is padded with silence.
+    """
+    def __init__(self, input_queue: asyncio.Queue, websocket: WebSocket, egress: AudioEgress):
+        super().__init__(input_queue)
+        self.websocket = websocket
+        self.egress = egress
+        self.frame_bytes = egress.frame_bytes(settings.OUTPUT_FRAME_MS)
+        self.frame_s = settings.OUTPUT_FRAME_MS / 1000
+        self.lead_s = settings.OUTPUT_JITTER_BUFFER_MS / 1000
+
+        self.partial = bytearray()
+        self.playback_until = 0.0 # Monotonic time the client plays out what it was sent
+        self.epoch = 0 # Bumped on barge-in; frames of an older epoch are not sent
+        self.clear_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_playing(self) -> bool:
+        return time.monotonic() < self.playback_until
+
+    async def _run_loop(self):
+        while self.active:
+            try:
+                # A partial frame is only held while more audio may follow right away
+                timeout = self.frame_s if self.partial else None
+                try:
+                    item = await asyncio.wait_for(self.input_queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    await self._flush_partial()
+                    continue
+                if item is None: # Sentinel for shutdown
+                    break
+
+                await self.process(item)
+                self.input_queue.task_done()
+            except asyncio.CancelledError:
+                break
+            except (WebSocketDisconnect, RuntimeError, OSError):
+                logger.info("Caller gone, audio output stopped")
+                break
+            except Exception as e:
+                logger.exception(f"Error in {self.__class__.__name__}: {e}")
+
+    async def process(self, item: AudioChunkEvent):
+        epoch = self.epoch
+        data = memoryview(self.egress.encode(item.chunk))
+        offset = 0
+
+        if self.partial:
+            offset = min(self.frame_bytes - len(self.partial), len(data))
+            self.partial += data[:offset]
+            if len(self.partial) < self.frame_bytes:
+                return
+            frame, self.partial = bytes(self.partial), bytearray()
+            await self._send(frame, epoch)
+
+        whole = offset + (len(data) - offset) // self.frame_bytes * self.frame_bytes
+        for start in range(offset, whole, self.frame_bytes):
+            if epoch != self.epoch:
+                return
+            await self._send(data[start:start + self.frame_bytes], epoch)
+        if epoch == self.epoch:
+            self.partial += data[whole:]
+
+    async def _flush_partial(self):
+        frame = bytes(self.partial) + self.egress.silence(self.frame_bytes - len(self.partial))
+        self.partial = bytearray()
+        await self._send(frame, self.epoch)
+
+    async def _send(self, frame: Union[bytes, memoryview], epoch: int):
+        # Real-time pacing: wait until the client is within lead_s of running out
+        delay = self.playback_until - self.lead_s - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if epoch != self.epoch:
+            return # Barge-in while waiting
+
+        now = time.monotonic()
+        if 0 < now - self.playback_until < 1.0:
+            # The client ran dry mid-reply: an audible gap
+            metrics.increment("voice_output_underruns_total", 1, "Audio output frames sent after the client ran out")
+            if log_sampler.allow("frame_stats"):
+                logger.debug(f"Audio output underrun: client dry for {(now - self.playback_until) * 1000:.0f}ms")
+        self.playback_until = max(now, self.playback_until) + self.frame_s
+        await self.websocket.send_bytes(frame)
+
+    def interrupt(self):
+        """Barge-in: drops the partial frame and anything waiting to be paced, and clears the client."""
+        self.epoch += 1
+        self.partial = bytearray()
+        buffered = self.playback_until > time.monotonic()
+        self.playback_until = 0.0
+        if buffered and self.active:
+            self.clear_task = asyncio.create_task(self._clear())
+
+    async def _clear(self):
+        try:
+            await self.websocket.send_text(CLEAR_MESSAGE)
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            pass
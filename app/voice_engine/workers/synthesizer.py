@@ -2,70 +2,251 @@ import asyncio
 import websockets
 import json
 import base64
+import time
+from typing import List, Optional
 from loguru import logger
 
 from app.core.config import settings
-from app.voice_engine.primitive.worker import BaseWorker
+from app.core.metrics import metrics
+from app.voice_engine.connection_pool import provider_pool, ELEVENLABS_OUTPUT_FORMAT, ELEVENLABS_VOICE_SETTINGS
+from app.voice_engine.tts_cache import tts_cache, cache_key, normalize_text
+from app.voice_engine.primitive.worker import BaseWorker, InterruptibleEvent
 from app.voice_engine.primitive.events import LLMChunkEvent, AudioChunkEvent
 
+class _Capture:
+    """Audio of a phrase rendered live, collected for the TTS cache."""
+    def __init__(self, key: bytes, text: str):
+        self.key = key
+        self.target_chars = sum(not c.isspace() for c in normalize_text(text))
+        self.chars = 0
+        self.chunks: List[bytes] = []
+        self.duration_ms = 0
+
+
 class ElevenLabsSynthesizer(BaseWorker):
     def __init__(self, input_queue: asyncio.Queue, output_queue: asyncio.Queue):
         super().__init__(input_queue, output_queue)
-        self.voice_id = "21m00Tcm4TlvDq8ikWAM" # Default: Rachel. Replace with Dental Receptionist ID later.
-        self.model_id = "eleven_turbo_v2_5"
-        self.ws_url = f"wss://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}/stream-input?model_id={self.model_id}"
+        self.voice_id = settings.ELEVENLABS_VOICE_ID
+        self.model_id = settings.ELEVENLABS_MODEL_ID
+
+        # Barge-in state
+        self.stop_event = asyncio.Event()
+        self.turn_id = 0
+        self.spoken_text = "" # Characters of the current turn rendered to audio so far
+        self.playback_until = 0.0 # Monotonic estimate of when the caller stops hearing audio
+
+        self.unsent: Optional[str] = None # Message whose send hit a closed socket, resent on the next one
+
+        # TTS cache state
+        self.turn_sent_to_provider = False # Later phrases of the turn must follow ElevenLabs audio
+        self.capture: Optional[_Capture] = None
+
+    @property
+    def is_speaking(self) -> bool:
+        return time.monotonic() < self.playback_until
 
     async def _run_loop(self):
         logger.info("ElevenLabs Synthesizer Started")
-        
-        async with websockets.connect(self.ws_url) as ws:
-            # Send initial config (BOS)
-            bos_message = {
-                "text": " ",
-                "voice_settings": {"stability": 0.5, "similarity_boost": 0.8},
-                "xi_api_key": settings.ELEVENLABS_API_KEY,
-            }
-            await ws.send(json.dumps(bos_message))
-
-            # Task 1: Receiver (Audio from ElevenLabs)
-            rx_task = asyncio.create_task(self._receiver(ws))
-            
-            # Task 2: Sender (Text to ElevenLabs)
+
+        # One websocket per uninterrupted stretch of speech.
+        # A barge-in closes the socket so ElevenLabs stops rendering buffered text;
+        # a socket ElevenLabs closed is replaced the same way.
+        while self.active:
+            self.stop_event.clear()
             try:
-                while self.active:
-                    item = await self.input_queue.get()
-                    if item is None:
-                        break
-                    
-                    if isinstance(item, LLMChunkEvent):
-                        # Send text chunk
-                        payload = {"text": item.token, "try_trigger_generation": True}
-                        await ws.send(json.dumps(payload))
-                    
-                    self.input_queue.task_done()
-                
-                # Send EOS
-                await ws.send(json.dumps({"text": ""}))
+                # Warm socket from the provider pool, initial config (BOS) already sent
+                async with await provider_pool.elevenlabs.acquire() as ws:
+                    # Task 1: Receiver (Audio from ElevenLabs)
+                    rx_task = asyncio.create_task(self._receiver(ws))
+                    # Task 2: Sender (Text to ElevenLabs)
+                    tx_task = asyncio.create_task(self._sender(ws))
+                    stop_task = asyncio.create_task(self.stop_event.wait())
 
+                    try:
+                        await asyncio.wait({tx_task, rx_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+                        if self.stop_event.is_set():
+                            logger.info("Synthesizer interrupted, reconnecting")
+                            continue
+                        if tx_task.done() and tx_task.exception() is None:
+                            await rx_task # EOS sent: the input has ended
+                            break
+                        if tx_task.done() and not isinstance(tx_task.exception(), websockets.exceptions.ConnectionClosed):
+                            tx_task.result() # Raises
+                        if rx_task.done() and rx_task.exception() is not None:
+                            rx_task.result() # Raises (a closed socket ends the receiver without one)
+                    finally:
+                        for task in (tx_task, rx_task, stop_task):
+                            task.cancel()
+                        await asyncio.gather(tx_task, rx_task, stop_task, return_exceptions=True)
+
+                    # The receiver ended or a send failed: ElevenLabs closed the socket
+                    self.capture = None # Its audio may be cut off
+                    logger.warning("ElevenLabs socket closed mid-call, reconnecting")
+                    metrics.increment("voice_tts_reconnects_total", 1, "ElevenLabs sockets replaced after the provider closed them")
             except Exception as e:
-                logger.exception(f"Synthesizer Sender Error: {e}")
-            finally:
-                await rx_task
+                # BaseWorker restarts the synthesizer with backoff
+                logger.error(f"Synthesizer Error: {e!r}")
+                raise
+
+    async def _sender(self, ws):
+        """Sends text until the input ends (then EOS). A closed socket raises ConnectionClosed."""
+        try:
+            if self.unsent is not None:
+                await ws.send(self.unsent)
+                self.unsent = None
+
+            while self.active:
+                try:
+                    item = await asyncio.wait_for(self.input_queue.get(), timeout=settings.TTS_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    # The caller is talking (or silent): keep the socket from idling out
+                    await ws.send(json.dumps({"text": " "}))
+                    continue
+                if item is None:
+                    break
+
+                if isinstance(item, InterruptibleEvent):
+                    if item.is_set():
+                        self.input_queue.task_done()
+                        continue
+                    item = item.payload
+
+                if isinstance(item, LLMChunkEvent):
+                    if item.turn_id != self.turn_id:
+                        self.turn_id = item.turn_id
+                        self.spoken_text = ""
+                        self.turn_sent_to_provider = False
+
+                    # Cached phrases play directly, as long as nothing earlier in the turn is still rendering
+                    if not self.turn_sent_to_provider:
+                        if not item.token.strip() or await self._play_cached(item.token):
+                            self.input_queue.task_done()
+                            continue
+                        # The turn's first phrase is flushed, so its audio arrives alone and can be cached
+                        if settings.TTS_CACHE_ENABLED and item.flush:
+                            self.capture = _Capture(self._cache_key(item.token), item.token)
+                        self.turn_sent_to_provider = True
+
+                    # Send phrase (ElevenLabs expects text chunks to end with a space)
+                    text = item.token if item.token.endswith(" ") else item.token + " "
+                    payload = {"text": text}
+                    if item.flush:
+                        payload["flush"] = True
+                    message = json.dumps(payload)
+                    try:
+                        await ws.send(message)
+                    except websockets.exceptions.ConnectionClosed:
+                        self.unsent = message
+                        self.input_queue.task_done()
+                        raise
+                    metrics.increment("voice_tts_text_messages_total", 1, "Text messages sent to ElevenLabs")
+
+                self.input_queue.task_done()
+
+            # Send EOS
+            await ws.send(json.dumps({"text": ""}))
+
+        except (asyncio.CancelledError, websockets.exceptions.ConnectionClosed):
+            raise
+        except Exception as e:
+            logger.error(f"Synthesizer Sender Error: {e!r}")
+            raise
 
     async def _receiver(self, ws):
         try:
             while True:
                 response = await ws.recv()
                 data = json.loads(response)
-                
+
+                # Audio still in flight when a barge-in lands is stale
+                if self.stop_event.is_set():
+                    break
+
                 if data.get("audio"):
                     chunk = base64.b64decode(data["audio"])
+                    alignment = data.get("alignment") or {}
+                    self._track_alignment(alignment)
+                    if self.capture:
+                        self._capture_audio(chunk, alignment)
+                    event = AudioChunkEvent(chunk=chunk, session_id=self.session_id, turn_id=self.turn_id)
+                    self.mark(self.turn_id, "first_audio", event.created_at)
                     if self.output_queue:
-                         await self.output_queue.put(AudioChunkEvent(chunk=chunk))
-                
+                         await self.output_queue.put(event)
+
                 if data.get("isFinal"):
                     break
         except websockets.exceptions.ConnectionClosed:
             logger.info("ElevenLabs Connection Closed")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.exception(f"Synthesizer Receiver Error: {e}")
+            logger.error(f"Synthesizer Receiver Error: {e!r}")
+            raise
+
+    def _track_alignment(self, alignment: dict):
+        """Uses ElevenLabs character timings to follow what was spoken and for how long."""
+        chars = alignment.get("chars") or []
+        self.spoken_text += "".join(chars)
+
+        starts = alignment.get("charStartTimesMs") or []
+        durations = alignment.get("charDurationsMs") or []
+        if starts and durations:
+            now = time.monotonic()
+            self.playback_until = max(now, self.playback_until) + (starts[-1] + durations[-1]) / 1000
+
+    def _cache_key(self, text: str) -> bytes:
+        return cache_key(text, self.voice_id, self.model_id, ELEVENLABS_VOICE_SETTINGS, ELEVENLABS_OUTPUT_FORMAT)
+
+    async def _play_cached(self, text: str) -> bool:
+        """Streams a cached rendering of `text` to the output queue. Returns False on a miss."""
+        if not settings.TTS_CACHE_ENABLED:
+            return False
+        cached = tts_cache.get(self._cache_key(text))
+        if cached is None:
+            return False
+
+        for chunk in cached.chunks:
+            if self.stop_event.is_set():
+                break
+            event = AudioChunkEvent(chunk=chunk, session_id=self.session_id, turn_id=self.turn_id)
+            self.mark(self.turn_id, "first_audio", event.created_at)
+            if self.output_queue:
+                await self.output_queue.put(event)
+
+        self.spoken_text += text
+        self.playback_until = max(time.monotonic(), self.playback_until) + cached.duration_ms / 1000
+        return True
+
+    def _capture_audio(self, chunk: bytes, alignment: dict):
+        """Collects audio for the phrase being captured; stores it once its characters are all aligned."""
+        chars = alignment.get("chars")
+        if not chars:
+            self.capture = None # Can't tell where the phrase ends
+            return
+
+        capture = self.capture
+        capture.chunks.append(chunk)
+        capture.chars += sum(not c.isspace() for c in chars)
+        starts = alignment.get("charStartTimesMs") or []
+        durations = alignment.get("charDurationsMs") or []
+        if starts and durations:
+            capture.duration_ms += starts[-1] + durations[-1]
+
+        if capture.chars >= capture.target_chars:
+            # Overshoot means the audio also covers the next phrase
+            if capture.chars == capture.target_chars:
+                tts_cache.put(capture.key, capture.chunks, capture.duration_ms)
+            self.capture = None
+
+    def interrupt(self) -> str:
+        """
+        Stops speaking immediately: the current websocket is dropped along with
+        any text ElevenLabs has buffered. Returns the text spoken this turn.
+        """
+        spoken = self.spoken_text
+        self.spoken_text = ""
+        self.playback_until = 0.0
+        self.capture = None
+        self.unsent = None
+        self.stop_event.set()
+        return spoken
@@ -1,94 +1,291 @@
 import asyncio
 import json
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Set, Tuple
+import websockets
 from loguru import logger
-from deepgram import DeepgramClient
-
-# Try importing EventType, fallback to string literals if needed
-try:
-    from deepgram.core.events import EventType
-    EVENT_MESSAGE = EventType.MESSAGE
-    EVENT_ERROR = EventType.ERROR
-except ImportError:
-    EVENT_MESSAGE = "message"
-    EVENT_ERROR = "error"
 
 from app.core.config import settings
+from app.core.logging import log_sampler
+from app.core.metrics import metrics
+from app.voice_engine.codec import PIPELINE_SAMPLE_RATE
+from app.voice_engine.connection_pool import provider_pool
 from app.voice_engine.primitive.worker import BaseWorker
 from app.voice_engine.primitive.events import TranscriptEvent
 
+BYTES_PER_S = PIPELINE_SAMPLE_RATE * 2 # PCM16 mono
+# A final result's end within this of a chunk's end covers the chunk (offsets are rounded floats)
+_ACK_TOLERANCE_BYTES = BYTES_PER_S // 100
+
+
+class AudioReplayBuffer:
+    """
+    Caller audio sent to Deepgram that no final result covers yet, so a
+    replacement socket can be fed it again. Holds at most max_s of audio
+    (oldest dropped). Positions are bytes of audio sent since the call started.
+    """
+    def __init__(self, max_s: float):
+        self.max_bytes = int(max_s * BYTES_PER_S)
+        self.chunks: Deque[Tuple[int, bytes]] = deque() # (start, chunk)
+        self.end = 0
+
+    @property
+    def start(self) -> int:
+        return self.chunks[0][0] if self.chunks else self.end
+
+    @property
+    def start_s(self) -> float:
+        return self.start / BYTES_PER_S
+
+    @property
+    def duration_s(self) -> float:
+        return (self.end - self.start) / BYTES_PER_S
+
+    def append(self, chunk: bytes):
+        self.chunks.append((self.end, chunk))
+        self.end += len(chunk)
+        while self.end - self.chunks[0][0] > self.max_bytes:
+            self.chunks.popleft()
+            metrics.increment("stt_replay_overflow_total", 1, "Audio chunks dropped from a full STT replay buffer")
+
+    def acknowledge(self, until_s: float):
+        """Drops chunks that end by until_s (covered by a final result)."""
+        until = round(until_s * BYTES_PER_S) + _ACK_TOLERANCE_BYTES
+        while self.chunks and self.chunks[0][0] + len(self.chunks[0][1]) <= until:
+            self.chunks.popleft()
+
+
 class DeepgramTranscriber(BaseWorker):
-    def __init__(self, input_queue: asyncio.Queue, output_queue: asyncio.Queue):
+    """
+    Streams caller audio to Deepgram's live websocket API and emits TranscriptEvents.
+    Speaks the documented wire protocol directly (like ElevenLabsSynthesizer) so the
+    endpoint can be pointed at a local stand-in via DEEPGRAM_WS_URL. Sockets come
+    pre-opened from the process-wide provider pool.
+
+    A socket that closes, or stalls (audio unanswered for STT_STALL_TIMEOUT_S and no
+    pong either), is replaced with a warm one from the pool, which is first sent
+    the audio no final result has covered yet, so no caller speech is lost.
+    """
+    def __init__(
+        self,
+        input_queue: asyncio.Queue,
+        output_queue: asyncio.Queue,
+        on_speech_start: Optional[Callable[[], Awaitable[None]]] = None
+    ):
         super().__init__(input_queue, output_queue)
-        # Initialize client without options first
-        self.dg_client = DeepgramClient(api_key=settings.DEEPGRAM_API_KEY)
+        # Called on the first words of each caller utterance (barge-in trigger)
+        self.on_speech_start = on_speech_start
+        self.in_utterance = False
+        self.turn_id = 0
+        # Monotonic time the first audio byte arrived from the caller (set by the pipeline).
+        # Maps Deepgram audio offsets to our clock even if audio queued while connecting.
+        self.stream_started_at: Optional[float] = None
+        # Maps Deepgram's audio offsets to caller audio offsets when a VAD gates the stream
+        self.audio_clock: Optional[Callable[[float], float]] = None
 
-    async def _run_loop(self):
-        # Configure Options via kwargs
-        options = {
-            "model": "nova-2",
-            "language": "en-US",
-            "smart_format": True,
-            "interim_results": True,
-            "endpointing": 300,
-        }
-
-        # Events
-        async def on_message(self_handler, result, **kwargs):
-             # Deepgram SDK v3+ returns an object, not dict
-             # Use safe access or check type
-             # result might be ListenV1ResultsEvent type
-             
-             # The result structure usually matches the JSON response
-             # e.g. result.channel.alternatives[0].transcript
-             
-             try:
-                 # Check if it has 'channel' attribute (Result Event)
-                 if hasattr(result, 'channel'):
-                     alternatives = result.channel.alternatives
-                     if alternatives and len(alternatives) > 0:
-                         sentence = alternatives[0].transcript
-                         if len(sentence) == 0:
-                             return
-                             
-                         is_final = result.is_final
-                         confidence = alternatives[0].confidence
-                         
-                         event = TranscriptEvent(
-                             text=sentence,
-                             is_final=is_final,
-                             confidence=confidence
-                         )
-                         
-                         if self.output_queue:
-                             await self.output_queue.put(event)
-                         
-                         logger.debug(f"Transcript: {sentence} (Final: {is_final})")
-             except Exception as e:
-                 logger.error(f"Error processing transcript: {e}")
-
-        async def on_error(self_handler, error, **kwargs):
-            logger.error(f"Deepgram Error: {error}")
+        self.replay = AudioReplayBuffer(settings.STT_REPLAY_BUFFER_MS / 1000)
+        self.socket_start_s = 0.0 # Where the current socket's audio (offset 0) starts in the stream
+        self.awaiting_since: Optional[float] = None # First audio sent since Deepgram last answered
+        self.next_chunk: Optional[asyncio.Future] = None # Kept across reconnects so no chunk is lost
+        self.unanswered_sockets = 0 # Sockets taken since Deepgram last answered (backoff and give-up count)
+        self.closing: Set[asyncio.Task] = set()
 
-        logger.info("Deepgram Transcriber Started")
-        
+    def _speech_end_at(self, result: dict) -> Optional[float]:
+        """Converts the result's audio offset (start + duration) to a monotonic timestamp."""
+        if self.stream_started_at is None:
+            return None
+        start = result.get("start")
+        duration = result.get("duration")
+        if start is None or duration is None:
+            return None
+        offset = self.socket_start_s + start + duration
+        if self.audio_clock:
+            offset = self.audio_clock(offset)
+        return min(self.stream_started_at + offset, time.monotonic())
+
+    async def on_message(self, result: dict):
+        self.awaiting_since = None
+        self.unanswered_sockets = 0
+        try:
+            # Only "Results" messages carry transcripts (others: Metadata, SpeechStarted, UtteranceEnd)
+            if result.get("type") != "Results":
+                return
+            if result.get("is_final") and result.get("start") is not None and result.get("duration") is not None:
+                # Finalized audio (even silence) no longer needs replaying
+                self.replay.acknowledge(self.socket_start_s + result["start"] + result["duration"])
+
+            alternatives = result.get("channel", {}).get("alternatives") or []
+            if alternatives and len(alternatives) > 0:
+                sentence = alternatives[0].get("transcript", "")
+                if len(sentence) == 0:
+                    return
+
+                is_final = result.get("is_final", False)
+                confidence = alternatives[0].get("confidence", 1.0)
+
+                # Speech onset: first recognized words of a new utterance.
+                # Waiting for words (not raw VAD) keeps coughs and line noise from interrupting.
+                if not self.in_utterance:
+                    self.in_utterance = True
+                    self.turn_id += 1
+                    if self.on_speech_start:
+                        await self.on_speech_start()
+                turn_id = self.turn_id
+                if result.get("speech_final", is_final):
+                    self.in_utterance = False
+
+                event = TranscriptEvent(
+                    text=sentence,
+                    is_final=is_final,
+                    confidence=confidence,
+                    session_id=self.session_id,
+                    turn_id=turn_id,
+                    speech_end_at=self._speech_end_at(result) if is_final else None
+                )
+                if is_final:
+                    if event.speech_end_at is not None:
+                        self.mark(turn_id, "speech_end", event.speech_end_at)
+                    self.mark(turn_id, "final_transcript", event.created_at)
+
+                if self.output_queue:
+                    await self.output_queue.put(event)
+
+                if is_final or log_sampler.allow("interim_transcript"):
+                    logger.debug(f"Transcript: {sentence} (Final: {is_final})")
+        except Exception as e:
+            logger.error(f"Error processing transcript: {e}")
+
+    async def _receiver(self, ws):
         try:
-            # Connect using the new pattern
-            async with self.dg_client.listen.asyncwebsocket.v("1").connect(**options) as socket:
-                
-                # Register handlers
-                socket.on(EVENT_MESSAGE, on_message)
-                socket.on(EVENT_ERROR, on_error)
-                
-                # Send Audio Loop
-                while self.active:
-                    chunk = await self.input_queue.get()
-                    if chunk is None:
-                        break
-                        
-                    await socket.send(chunk)
-                    self.input_queue.task_done()
-                    
+            async for message in ws:
+                await self.on_message(json.loads(message))
+        except websockets.exceptions.ConnectionClosed as e:
+            logger.info(f"Deepgram Connection Closed: {e}")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.exception(f"Transcriber Loop Error: {e}")
+            logger.error(f"Deepgram Error: {e}")
+
+    async def _watchdog(self, ws):
+        """Returns when the socket looks stalled: audio unanswered and no pong within STT_STALL_TIMEOUT_S."""
+        stall_s = settings.STT_STALL_TIMEOUT_S
+        while True:
+            await asyncio.sleep(stall_s / 2)
+            if self.awaiting_since is None or time.monotonic() - self.awaiting_since < stall_s:
+                continue
+            try:
+                pong = await ws.ping()
+                await asyncio.wait_for(pong, timeout=stall_s)
+            except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed):
+                return
+            # The socket is fine, Deepgram just had nothing to say
+            self.awaiting_since = time.monotonic()
+
+    async def _connect(self):
+        """Acquires a socket and replays the audio no final result covers yet."""
+        ws = await provider_pool.deepgram.acquire()
+        self.socket_start_s = self.replay.start_s
+        self.awaiting_since = time.monotonic() if self.replay.chunks else None
+        try:
+            for _, chunk in list(self.replay.chunks):
+                await ws.send(chunk)
+        except BaseException:
+            self._close_later(ws)
+            raise
+        return ws
+
+    async def _reconnect(self, ws, reason: str):
+        started = time.monotonic()
+        logger.warning(f"Deepgram stream {reason}, reconnecting ({self.replay.duration_s:.2f}s of audio to replay)")
+        metrics.increment("stt_reconnects_total", 1, "Deepgram stream reconnects", reason=reason)
+        self._close_later(ws)
+
+        # Backoff counts sockets that failed to connect and sockets that closed before answering
+        # (e.g. during the replay): only the first replacement after a result is immediate
+        while True:
+            if self.unanswered_sockets >= settings.STT_RECONNECT_ATTEMPTS:
+                # The worker restarts, still with the replay buffer
+                raise ConnectionError(f"Deepgram failed {self.unanswered_sockets} sockets in a row without answering")
+            if self.unanswered_sockets:
+                delay = settings.STT_RECONNECT_BACKOFF_S * 2 ** (self.unanswered_sockets - 1)
+                logger.warning(f"Deepgram has not answered on {self.unanswered_sockets} new socket(s), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            self.unanswered_sockets += 1
+            try:
+                ws = await self._connect()
+                break
+            except Exception as e:
+                logger.warning(f"Deepgram reconnect failed ({e!r})")
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        metrics.observe("stt_reconnect_ms", elapsed_ms, "Deepgram stream failure detected -> new socket replayed")
+        logger.info(f"Deepgram stream recovered in {elapsed_ms:.0f}ms")
+        return ws
+
+    def _close_later(self, ws):
+        # Closing a stalled socket can wait out the close handshake; don't hold up the stream
+        task = asyncio.create_task(ws.close())
+        self.closing.add(task)
+        task.add_done_callback(self.closing.discard)
+
+    async def _stream(self, ws) -> Optional[str]:
+        """Sends audio until the input ends (returns None) or the socket fails (returns why)."""
+        rx_task = asyncio.create_task(self._receiver(ws))
+        watchdog = asyncio.create_task(self._watchdog(ws))
+        try:
+            while self.active:
+                if self.next_chunk is None:
+                    self.next_chunk = asyncio.ensure_future(self.input_queue.get())
+                done, _ = await asyncio.wait(
+                    {self.next_chunk, rx_task, watchdog},
+                    timeout=settings.DEEPGRAM_KEEPALIVE_S,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if rx_task in done:
+                    return "closed"
+                if watchdog in done:
+                    return "stalled"
+                if not done:
+                    # No audio (the VAD is holding back silence): keep the socket open
+                    await ws.send(json.dumps({"type": "KeepAlive"}))
+                    continue
+
+                chunk = self.next_chunk.result()
+                self.next_chunk = None
+                if chunk is None:
+                    break
+                self.input_queue.task_done()
+
+                self.replay.append(chunk) # Before sending: a failed send is replayed
+                if self.awaiting_since is None:
+                    self.awaiting_since = time.monotonic()
+                await ws.send(chunk)
+
+            # Ask Deepgram to flush pending results before closing
+            await ws.send(json.dumps({"type": "CloseStream"}))
+            await rx_task
+            return None
+        except websockets.exceptions.ConnectionClosed:
+            return "closed"
+        finally:
+            rx_task.cancel()
+            watchdog.cancel()
+
+    async def _run_loop(self):
+        logger.info("Deepgram Transcriber Started")
+        ws = None
+        try:
+            ws = await self._connect()
+            while True:
+                reason = await self._stream(ws)
+                if reason is None:
+                    break
+                ws = await self._reconnect(ws, reason)
         finally:
+            if self.next_chunk is not None and not self.next_chunk.done():
+                self.next_chunk.cancel()
+                self.next_chunk = None
+            if ws is not None:
+                self._close_later(ws)
             logger.info("Deepgram Transcriber Stopped")
@@ -0,0 +1,149 @@
+import asyncio
+import bisect
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.core.logging import log_sampler
+from app.core.metrics import metrics
+from app.voice_engine.primitive.worker import BaseWorker
+from app.voice_engine.primitive.events import SpeechEvent
+from app.voice_engine.codec import PIPELINE_SAMPLE_RATE
+
+FRAME_MS = 20
+FRAME_SAMPLES = PIPELINE_SAMPLE_RATE * FRAME_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * 2
+
+# Loud frames count as speech whatever their zero-crossing rate
+_LOUD_MARGIN_DB = 10.0
+# Silence that ends a speech segment (the gate stays open for the full hangover)
+_END_SILENCE_FRAMES = 10
+# Anchors kept for mapping Deepgram offsets back to caller audio
+_MAX_ANCHORS = 256
+
+
+def frame_features(frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Energy (dBFS) and zero-crossing rate for each row of an (n, FRAME_SAMPLES) int16 array."""
+    samples = frames.astype(np.float32) / 32768.0
+    energy_db = 10.0 * np.log10(np.mean(samples * samples, axis=1) + 1e-10)
+    signs = np.signbit(samples)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (FRAME_SAMPLES - 1)
+    return energy_db, zcr
+
+
+class VoiceActivityDetector(BaseWorker):
+    """
+    Gates caller audio (pipeline PCM16) in front of the transcriber.
+    Frames are classified with energy plus zero-crossing rate (vectorized per chunk).
+    Speech is forwarded together with a pre-roll of the frames just before it and a
+    hangover after it, so Deepgram still sees word onsets and the silence it needs
+    for endpointing. Longer silences are not sent (the transcriber keeps the
+    socket alive instead). Speech start/end are reported via on_speech.
+    """
+    def __init__(
+        self,
+        input_queue: asyncio.Queue,
+        output_queue: asyncio.Queue,
+        on_speech: Optional[Callable[[SpeechEvent], Awaitable[None]]] = None
+    ):
+        super().__init__(input_queue, output_queue)
+        self.on_speech = on_speech
+        self.remainder = b""
+        self.preroll: Deque[bytes] = deque(maxlen=max(settings.VAD_PREROLL_MS // FRAME_MS, 1))
+        self.onset_frames = max(settings.VAD_ONSET_MS // FRAME_MS, 1)
+        self.hangover_frames = max(settings.VAD_HANGOVER_MS // FRAME_MS, 1)
+
+        self.gate_open = False # Forwarding audio (speech plus hangover)
+        self.in_speech = False # Between speech start and end events
+        self.speech_run = 0 # Consecutive speech frames (onset detection)
+        self.hangover = 0 # Silent frames still forwarded before the gate closes
+        self.last_voiced = 0 # End of the last speech frame, in frames
+        self.frames_in = 0 # Caller audio position, in frames
+        self.frames_sent = 0 # Audio position of the gated stream, in frames
+
+        # (sent frame, caller frame) at the start of each forwarded run
+        self.anchors_sent: List[int] = []
+        self.anchors_in: List[int] = []
+
+    def to_input_offset(self, sent_offset_s: float) -> float:
+        """Maps a position in the gated stream (Deepgram's clock) to caller audio time."""
+        i = bisect.bisect_right(self.anchors_sent, sent_offset_s * 1000 / FRAME_MS) - 1
+        if i < 0:
+            return sent_offset_s
+        return sent_offset_s + (self.anchors_in[i] - self.anchors_sent[i]) * FRAME_MS / 1000
+
+    async def process(self, chunk: bytes):
+        data = self.remainder + chunk
+        usable = len(data) - len(data) % FRAME_BYTES
+        self.remainder = data[usable:]
+        if not usable:
+            return
+
+        frames = np.frombuffer(data, dtype=np.int16, count=usable // 2).reshape(-1, FRAME_SAMPLES)
+        energy_db, zcr = frame_features(frames)
+        voiced = (energy_db > settings.VAD_THRESHOLD_DB + _LOUD_MARGIN_DB) | (
+            (energy_db > settings.VAD_THRESHOLD_DB) & (zcr < settings.VAD_ZCR_MAX)
+        )
+
+        out = bytearray()
+        for i, is_voiced in enumerate(voiced.tolist()):
+            frame = data[i * FRAME_BYTES:(i + 1) * FRAME_BYTES]
+            await self._step(frame, is_voiced, out)
+            self.frames_in += 1
+
+        sent = len(out) // FRAME_BYTES
+        metrics.increment("voice_vad_frames_total", sent, "Caller audio frames seen by the VAD", result="sent")
+        metrics.increment("voice_vad_frames_total", len(voiced) - sent, "Caller audio frames seen by the VAD", result="suppressed")
+        if out and self.output_queue:
+            await self.output_queue.put(bytes(out))
+
+    async def _step(self, frame: bytes, is_voiced: bool, out: bytearray):
+        self.speech_run = self.speech_run + 1 if is_voiced else 0
+
+        if not self.gate_open:
+            if self.speech_run < self.onset_frames:
+                self.preroll.append(frame)
+                return
+            # Speech onset: flush the pre-roll so the first syllable isn't clipped
+            self.gate_open = True
+            self._anchor(self.frames_in - len(self.preroll))
+            for buffered in self.preroll:
+                self._send(buffered, out)
+            self.preroll.clear()
+
+        self._send(frame, out)
+        if is_voiced:
+            self.hangover = self.hangover_frames
+            self.last_voiced = self.frames_in + 1
+            if not self.in_speech and self.speech_run >= self.onset_frames:
+                self.in_speech = True
+                await self._emit("start", self.frames_in + 1 - self.speech_run)
+            return
+
+        self.hangover -= 1
+        silent_frames = self.hangover_frames - self.hangover
+        if self.in_speech and (silent_frames >= _END_SILENCE_FRAMES or self.hangover <= 0):
+            self.in_speech = False
+            await self._emit("end", self.last_voiced)
+        if self.hangover <= 0:
+            self.gate_open = False
+
+    def _send(self, frame: bytes, out: bytearray):
+        out += frame
+        self.frames_sent += 1
+
+    def _anchor(self, input_frame: int):
+        self.anchors_sent.append(self.frames_sent)
+        self.anchors_in.append(input_frame)
+        if len(self.anchors_sent) > _MAX_ANCHORS:
+            del self.anchors_sent[0], self.anchors_in[0]
+
+    async def _emit(self, kind: str, frame: int):
+        event = SpeechEvent(kind=kind, offset_s=frame * FRAME_MS / 1000, session_id=self.session_id)
+        if log_sampler.allow("vad_speech"):
+            logger.debug(f"VAD speech {kind} at {event.offset_s:.2f}s")
+        if self.on_speech:
+            await self.on_speech(event)
@@ -15,7 +15,7 @@ export default function Dashboard() {
                 setAppointments(aptData);
 
                 const callData = await api.getCalls();
-                setCalls(callData);
+                setCalls(callData.items);
             } catch (e) {
                 console.error("Failed to fetch dashboard data", e);
             }
@@ -76,8 +76,8 @@ export default function Dashboard() {
                         <tbody className="divide-y divide-slate-100">
                             {calls.map((call) => (
                                 <tr key={call.id} className="hover:bg-slate-50 transition">
-                                    <td className="p-3 text-slate-700 truncate max-w-[200px]" title={call.transcript_summary}>
-                                        {call.transcript_summary || 'No summary'}
+                                    <td className="p-3 text-slate-700 truncate max-w-[200px]" title={call.summary_preview ?? undefined}>
+                                        {call.summary_preview || 'No summary'}
                                     </td>
                                     <td className="p-3 text-slate-500">
                                         {call.duration}s
@@ -11,12 +11,18 @@ export interface Appointment {
 
 export interface CallLog {
     id: number;
-    recording_url: string;
-    transcript_summary: string;
+    recording_url: string | null;
+    summary_preview: string | null; // First characters of the transcript; full text via /calls/{id}
     duration: number;
+    practice_id: number | null;
     created_at: string;
 }
 
+export interface CallPage {
+    items: CallLog[];
+    next_cursor: string | null;
+}
+
 export interface Patient {
     id: number;
     first_name: string; // Encrypted on backend, decrypted on read? 
@@ -31,8 +37,8 @@ export const api = {
         return response.data;
     },
 
-    getCalls: async (): Promise<CallLog[]> => {
-        const response = await axios.get<CallLog[]>(`${API_BASE_URL}/calls`);
+    getCalls: async (cursor?: string): Promise<CallPage> => {
+        const response = await axios.get<CallPage>(`${API_BASE_URL}/calls`, { params: { cursor } });
         return response.data;
     }
 };
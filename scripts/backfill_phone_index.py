@@ -0,0 +1,60 @@
+"""
+Fills patients.phone_index (the blind index used for caller-ID lookups) for rows
+written before the column existed. Safe to re-run and to run while the app is
+serving: new and updated patients get their index on write.
+
+    python scripts/backfill_phone_index.py            # rows without an index
+    python scripts/backfill_phone_index.py --all      # every row (after changing BLIND_INDEX_KEY)
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import select, update # noqa: E402
+
+from app.core.database import async_session # noqa: E402
+from app.core.security import blind_index, decrypt_many # noqa: E402
+from app.models.all_models import Patient # noqa: E402
+
+
+async def backfill(batch_size: int, reindex_all: bool):
+    started = time.monotonic()
+    last_id, done = 0, 0
+    while True:
+        async with async_session() as session:
+            # Keyset over the primary key, so each batch is one index range scan
+            query = select(Patient.id, Patient.phone_ciphertext).where(Patient.id > last_id)
+            if not reindex_all:
+                query = query.where(Patient.phone_index.is_(None))
+            rows = (await session.execute(query.order_by(Patient.id).limit(batch_size))).all()
+            if not rows:
+                break
+
+            phones = await decrypt_many([row.phone_ciphertext for row in rows])
+            await session.execute(
+                update(Patient),
+                [{"id": row.id, "phone_index": blind_index(phone)} for row, phone in zip(rows, phones)]
+            )
+            await session.commit()
+
+        last_id = rows[-1].id
+        done += len(rows)
+        print(f"{done} patients indexed (up to id {last_id})")
+    print(f"Done: {done} patients in {time.monotonic() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--all", action="store_true", help="Recompute existing indexes too")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.all))
+
+
+if __name__ == "__main__":
+    main()
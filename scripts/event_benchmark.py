@@ -0,0 +1,143 @@
+"""
+Cost of pipeline events on the hot path: construction, memory and one hop
+through a BaseWorker (queue -> process() -> next queue).
+
+    python scripts/event_benchmark.py --events 200000
+
+Compares the slotted dataclasses in app/voice_engine/primitive/events.py with
+the pydantic models they replaced (defined below as the baseline). Reports
+nanoseconds per event, retained bytes per event and tracemalloc's peak while
+events flow through a worker.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Optional, Union
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydantic import BaseModel, ConfigDict, Field # noqa: E402
+
+from app.voice_engine.primitive import events # noqa: E402
+from app.voice_engine.primitive.channel import Channel, OverflowPolicy # noqa: E402
+from app.voice_engine.primitive.worker import BaseWorker # noqa: E402
+
+
+# --- Baseline: the pydantic event models ---------------------------------------------
+
+class PydanticTranscriptEvent(BaseModel):
+    text: str
+    is_final: bool
+    confidence: float = 1.0
+    session_id: str = ""
+    turn_id: int = 0
+    created_at: float = Field(default_factory=time.monotonic)
+    speech_end_at: Optional[float] = None
+
+class PydanticLLMChunkEvent(BaseModel):
+    token: str
+    flush: bool = False
+    session_id: str = ""
+    turn_id: int = 0
+    created_at: float = Field(default_factory=time.monotonic)
+
+class PydanticAudioChunkEvent(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    chunk: Union[bytes, memoryview]
+    session_id: str = ""
+    turn_id: int = 0
+    created_at: float = Field(default_factory=time.monotonic)
+
+
+FRAME = bytes(640) # 20 ms of 16 kHz PCM16
+
+FACTORIES: Dict[str, Dict[str, Callable[[], Any]]] = {
+    "audio_chunk": {
+        "slotted": lambda: events.AudioChunkEvent(chunk=FRAME, session_id="bench", turn_id=1),
+        "pydantic": lambda: PydanticAudioChunkEvent(chunk=FRAME, session_id="bench", turn_id=1),
+    },
+    "llm_chunk": {
+        "slotted": lambda: events.LLMChunkEvent(token=" word", session_id="bench", turn_id=1),
+        "pydantic": lambda: PydanticLLMChunkEvent(token=" word", session_id="bench", turn_id=1),
+    },
+    "transcript": {
+        "slotted": lambda: events.TranscriptEvent(text="book a cleaning", is_final=False, session_id="bench", turn_id=1),
+        "pydantic": lambda: PydanticTranscriptEvent(text="book a cleaning", is_final=False, session_id="bench", turn_id=1),
+    },
+}
+
+
+class Relay(BaseWorker):
+    """One pipeline hop: consumes an event and hands it to the next stage."""
+    async def process(self, item: Any):
+        await self.output_queue.put(item)
+
+
+def construction(factory: Callable[[], Any], count: int) -> Dict[str, float]:
+    gc.collect()
+    started = time.perf_counter_ns()
+    for _ in range(count):
+        factory()
+    ns = (time.perf_counter_ns() - started) / count
+
+    # Retained size: keep a batch alive and see what it costs
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [factory() for _ in range(10000)]
+    retained = (tracemalloc.get_traced_memory()[0] - before) / len(kept)
+    tracemalloc.stop()
+    del kept
+    return {"construct_ns": round(ns), "bytes_per_event": round(retained)}
+
+
+async def hop(factory: Callable[[], Any], count: int, traced: bool) -> float:
+    inbox = Channel("bench_in", 256, OverflowPolicy.BLOCK)
+    outbox = Channel("bench_out", 256, OverflowPolicy.BLOCK)
+    worker = Relay(inbox, outbox)
+    worker.start()
+
+    async def drain():
+        for _ in range(count):
+            await outbox.get()
+
+    gc.collect()
+    if traced:
+        tracemalloc.start()
+    started = time.perf_counter_ns()
+    consumer = asyncio.create_task(drain())
+    for _ in range(count):
+        await inbox.put(factory())
+    await consumer
+    elapsed = time.perf_counter_ns() - started
+    result = elapsed / count
+    if traced:
+        result = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    await worker.terminate()
+    return result
+
+
+async def main(count: int):
+    report: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for name, variants in FACTORIES.items():
+        report[name] = {}
+        for variant, factory in variants.items():
+            result = construction(factory, count)
+            result["hop_ns"] = round(await hop(factory, count, traced=False))
+            result["hop_peak_kb"] = round(await hop(factory, min(count, 20000), traced=True), 1)
+            report[name][variant] = result
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(main(args.events))
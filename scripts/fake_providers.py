@@ -0,0 +1,247 @@
+"""
+Local stand-ins for the Deepgram live websocket, the Groq streaming chat API and
+the ElevenLabs stream-input websocket. No network access or API keys needed.
+
+Run standalone:
+    python scripts/fake_providers.py --port 9100 --stt-latency-ms 150 --llm-ttft-ms 200
+
+Then point the app at it:
+    DEEPGRAM_WS_URL=ws://127.0.0.1:9100/v1/listen
+    GROQ_BASE_URL=http://127.0.0.1:9100
+    ELEVENLABS_WS_URL=ws://127.0.0.1:9100
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+from dataclasses import dataclass
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+CALLER_UTTERANCE = "Hi, I would like to book a cleaning for next Thursday afternoon."
+BOT_REPLY = (
+    "Sure, I can help with that. I have openings on Thursday at 2 p.m. and 3:30 p.m. "
+    "Which one works better for you?"
+)
+
+
+@dataclass
+class FakeProviderConfig:
+    stt_latency_ms: float = 150 # Speech end (after endpointing) -> final transcript
+    endpointing_ms: float = 300 # Silence needed before a final transcript
+    interim_every_ms: float = 250 # Interim result cadence while speech continues
+    stt_drop_after_s: float = 0 # Close each Deepgram socket this long after it opened, to exercise reconnects (0 = never)
+    llm_ttft_ms: float = 200 # Request -> first token
+    llm_tokens_per_s: float = 150
+    tts_ttfb_ms: float = 150 # Text -> first audio chunk
+    tts_sample_rate: int = 16000
+    tts_ms_per_char: float = 60 # Audio duration rendered per character
+    llm_tool_calls: bool = False # Answer booking requests with a find_slots tool call when tools are offered
+
+
+def _is_speech(chunk: bytes) -> bool:
+    # The simulated callers send zeroed PCM for silence and noise for speech
+    return any(chunk)
+
+
+async def deepgram_listen(websocket: WebSocket):
+    """Mimics Deepgram live: interim results while speech flows, a final after endpointing."""
+    config: FakeProviderConfig = websocket.app.state.config
+    await websocket.accept()
+    # Wall clock, not audio: a reconnect's replay arrives in a burst and must not count toward the drop
+    opened = time.monotonic()
+
+    bytes_per_s = 16000 * 2
+    received = 0 # Bytes of audio received, i.e. the audio clock
+    speech_start = None
+    last_speech = None
+    last_interim = 0.0
+
+    async def send_result(is_final: bool, start: float, end: float):
+        words = CALLER_UTTERANCE.split()
+        shown = words if is_final else words[:max(1, int(len(words) * 0.6))]
+        await websocket.send_text(json.dumps({
+            "type": "Results",
+            "is_final": is_final,
+            "speech_final": is_final,
+            "start": start,
+            "duration": end - start,
+            "channel": {"alternatives": [{"transcript": " ".join(shown), "confidence": 0.98}]},
+        }))
+
+    async def send_final(start: float, end: float):
+        await asyncio.sleep(config.stt_latency_ms / 1000)
+        await send_result(True, start, end)
+
+    pending = []
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text"):
+                if json.loads(message["text"]).get("type") == "CloseStream":
+                    break
+                continue
+
+            chunk = message.get("bytes") or b""
+            received += len(chunk)
+            now = received / bytes_per_s
+
+            if _is_speech(chunk):
+                if speech_start is None:
+                    speech_start = now
+                last_speech = now
+                if now - last_interim >= config.interim_every_ms / 1000:
+                    last_interim = now
+                    await send_result(False, speech_start, now)
+            elif speech_start is not None and now - last_speech >= config.endpointing_ms / 1000:
+                pending.append(asyncio.create_task(send_final(speech_start, last_speech)))
+                speech_start = None
+
+            if config.stt_drop_after_s and time.monotonic() - opened >= config.stt_drop_after_s:
+                await websocket.close(code=1011)
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def groq_chat_completions(request: Request):
+    """Mimics the OpenAI-compatible chat endpoint (server-sent events when streaming)."""
+    config: FakeProviderConfig = request.app.state.config
+    body = await request.json()
+
+    if not body.get("stream"):
+        await asyncio.sleep(config.llm_ttft_ms / 1000)
+        return JSONResponse({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": CALLER_UTTERANCE}, "finish_reason": "stop"}],
+        })
+
+    last = body["messages"][-1]
+    tool_call = (
+        config.llm_tool_calls and body.get("tools") and body.get("tool_choice") != "none"
+        and last["role"] == "user" and "book" in last["content"].lower()
+    )
+    reply = BOT_REPLY
+    if last["role"] == "tool":
+        slots = json.loads(last["content"]).get("slots", [])
+        reply = f"I have {' or '.join(slot['label'] for slot in slots) or 'nothing open'}. Which works for you?"
+
+    async def stream():
+        await asyncio.sleep(config.llm_ttft_ms / 1000)
+        created = int(time.time())
+        if tool_call:
+            call = {
+                "index": 0, "id": "call_fake", "type": "function",
+                "function": {"name": "find_slots", "arguments": json.dumps({"day": "thursday", "part_of_day": "afternoon"})},
+            }
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": {"role": "assistant", "tool_calls": [call]}, "finish_reason": "tool_calls"}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+            return
+        for i, word in enumerate(reply.split(" ")):
+            token = word if i == 0 else " " + word
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(1 / config.llm_tokens_per_s)
+        done = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+async def elevenlabs_stream_input(websocket: WebSocket):
+    """Mimics ElevenLabs stream-input: base64 PCM audio with character alignment per text chunk."""
+    config: FakeProviderConfig = websocket.app.state.config
+    await websocket.accept()
+
+    first = True
+    try:
+        while True:
+            data = json.loads(await websocket.receive_text())
+            text = data.get("text")
+            if text == "":
+                await websocket.send_text(json.dumps({"isFinal": True}))
+                break
+            if not text or not text.strip():
+                continue
+
+            if first:
+                await asyncio.sleep(config.tts_ttfb_ms / 1000)
+                first = False
+
+            ms = config.tts_ms_per_char
+            samples = int(config.tts_sample_rate * ms / 1000) * len(text)
+            await websocket.send_text(json.dumps({
+                "audio": base64.b64encode(bytes(samples * 2)).decode(),
+                "alignment": {
+                    "chars": list(text),
+                    "charStartTimesMs": [int(i * ms) for i in range(len(text))],
+                    "charDurationsMs": [int(ms)] * len(text),
+                },
+                "isFinal": False,
+            }))
+    except WebSocketDisconnect:
+        pass
+
+
+def create_app(config: FakeProviderConfig) -> Starlette:
+    app = Starlette(routes=[
+        WebSocketRoute("/v1/listen", deepgram_listen),
+        Route("/openai/v1/chat/completions", groq_chat_completions, methods=["POST"]),
+        WebSocketRoute("/v1/text-to-speech/{voice_id}/stream-input", elevenlabs_stream_input),
+    ])
+    app.state.config = config
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    defaults = FakeProviderConfig()
+    for field in FakeProviderConfig.__dataclass_fields__:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=getattr(defaults, field))
+    args = parser.parse_args()
+
+    config = FakeProviderConfig(**{
+        field: type(getattr(defaults, field))(getattr(args, field))
+        for field in FakeProviderConfig.__dataclass_fields__
+    })
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
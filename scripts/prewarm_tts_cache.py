@@ -0,0 +1,101 @@
+"""
+Renders recurring phrases through ElevenLabs into the shared TTS cache segment.
+Run at deploy time, before the workers start (they map the segment on first use):
+
+    python scripts/prewarm_tts_cache.py --phrases scripts/tts_phrases.txt
+
+The LLM fallback reply is always included. The segment is rebuilt from the
+list and replaced atomically, so running workers keep their current mapping.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+from typing import List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.core.config import settings # noqa: E402
+from app.voice_engine.connection_pool import provider_pool, ELEVENLABS_OUTPUT_FORMAT, ELEVENLABS_VOICE_SETTINGS # noqa: E402
+from app.voice_engine.tts_cache import SegmentStore, cache_key # noqa: E402
+from app.voice_engine.workers.llm import FALLBACK_REPLY # noqa: E402
+
+
+def load_phrases(path: str) -> List[str]:
+    phrases = [FALLBACK_REPLY]
+    with open(path) as f:
+        for line in f:
+            # Keep a trailing space: "Sure, " is how the chunker emits a leading clause
+            phrase = line.rstrip("\n")
+            if phrase.strip() and not phrase.startswith("#"):
+                phrases.append(phrase)
+    return phrases
+
+
+async def render(phrase: str) -> Tuple[bytes, int]:
+    """Renders one phrase on its own socket. Returns (audio, duration_ms)."""
+    audio = bytearray()
+    duration_ms = 0
+    async with await provider_pool.elevenlabs.connect() as ws:
+        text = phrase if phrase.endswith(" ") else phrase + " "
+        await ws.send(json.dumps({"text": text, "flush": True}))
+        await ws.send(json.dumps({"text": ""}))
+        async for message in ws:
+            data = json.loads(message)
+            if data.get("audio"):
+                audio += base64.b64decode(data["audio"])
+                alignment = data.get("alignment") or {}
+                starts = alignment.get("charStartTimesMs") or []
+                durations = alignment.get("charDurationsMs") or []
+                if starts and durations:
+                    duration_ms += starts[-1] + durations[-1]
+            if data.get("isFinal"):
+                break
+    return bytes(audio), duration_ms
+
+
+async def prewarm(phrases: List[str], output: str, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render_one(key: bytes, phrase: str) -> Optional[Tuple[bytes, bytes, int]]:
+        async with semaphore:
+            try:
+                audio, duration_ms = await render(phrase)
+            except Exception as e:
+                print(f"FAILED  {phrase!r}: {e}")
+                return None
+        print(f"{len(audio):>8} bytes {duration_ms:>6} ms  {phrase!r}")
+        return key, audio, duration_ms
+
+    # Phrases that normalize to the same key are rendered once
+    unique = {}
+    for phrase in phrases:
+        key = cache_key(
+            phrase, settings.ELEVENLABS_VOICE_ID, settings.ELEVENLABS_MODEL_ID,
+            ELEVENLABS_VOICE_SETTINGS, ELEVENLABS_OUTPUT_FORMAT
+        )
+        unique.setdefault(key, phrase)
+
+    results = await asyncio.gather(*(render_one(key, phrase) for key, phrase in unique.items()))
+    entries = [result for result in results if result is not None and result[1]]
+    SegmentStore.write(output, entries)
+    print(f"Wrote {len(entries)}/{len(unique)} phrases to {output}")
+    if len(entries) < len(unique):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phrases", default=os.path.join(ROOT, "scripts", "tts_phrases.txt"))
+    parser.add_argument("--output", default=settings.TTS_CACHE_SEGMENT_PATH)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    asyncio.run(prewarm(load_phrases(args.phrases), args.output, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
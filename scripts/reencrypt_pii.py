@@ -0,0 +1,68 @@
+"""
+Re-encrypts the PII columns under the current primary key, for key rotation.
+
+    1. Prepend the new key: ENCRYPTION_KEY=<new>,<old>  (deploy; both keys decrypt)
+    2. python scripts/reencrypt_pii.py
+    3. Drop the old key from ENCRYPTION_KEY (deploy)
+
+Rows are streamed in primary-key order, re-encrypted off the event loop and
+written back in batches, each in its own transaction. The app keeps serving
+meanwhile; an interrupted run can continue with --start-id.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import select, update # noqa: E402
+
+from app.core.database import async_session # noqa: E402
+from app.core.security import rotate_many # noqa: E402
+from app.models.all_models import Patient # noqa: E402
+
+ENCRYPTED_COLUMNS = ("first_name_ciphertext", "last_name_ciphertext", "phone_ciphertext")
+
+
+async def reencrypt(batch_size: int, start_id: int):
+    started = time.monotonic()
+    last_id, done = start_id, 0
+    columns = [getattr(Patient, name) for name in ENCRYPTED_COLUMNS]
+    while True:
+        async with async_session() as session:
+            query = select(Patient.id, *columns).where(Patient.id > last_id).order_by(Patient.id).limit(batch_size)
+            rows = (await session.execute(query)).all()
+            if not rows:
+                break
+
+            # All of the batch's tokens in one offloaded call, column by column
+            tokens = [row[i + 1] for i in range(len(ENCRYPTED_COLUMNS)) for row in rows]
+            rotated = await rotate_many(tokens)
+            updates = [{"id": row.id} for row in rows]
+            for i, name in enumerate(ENCRYPTED_COLUMNS):
+                for j, values in enumerate(updates):
+                    values[name] = rotated[i * len(rows) + j]
+
+            await session.execute(update(Patient), updates)
+            await session.commit()
+
+        last_id = rows[-1].id
+        done += len(rows)
+        elapsed = time.monotonic() - started
+        print(f"{done} patients re-encrypted (up to id {last_id}, {done / elapsed:.0f} rows/s)")
+    print(f"Done: {done} patients in {time.monotonic() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--start-id", type=int, default=0, help="Resume after this patient id")
+    args = parser.parse_args()
+    asyncio.run(reencrypt(args.batch_size, args.start_id))
+
+
+if __name__ == "__main__":
+    main()
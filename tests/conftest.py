@@ -0,0 +1,6 @@
+import os
+
+# Settings() needs these at import; tests never touch the database or providers
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("ENCRYPTION_KEY", "ZmFrZS1iZW5jaG1hcmsta2V5LW5vdC1mb3ItcHJvZCE=")
+os.environ.setdefault("BLIND_INDEX_KEY", "test-blind-index-key")
@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+ADMIN_ENDPOINTS = [
+    ("PUT", "/logging/levels", {"json": {"modules": {}}}),
+    ("GET", "/api/dashboard/calls/export", {}),
+]
+
+
+@pytest.fixture
+def client():
+    # No lifespan: these requests are refused (or answered) before touching the database
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("method, path, kwargs", ADMIN_ENDPOINTS)
+def test_off_without_a_configured_token(client, monkeypatch, method, path, kwargs):
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "")
+    assert client.request(method, path, headers={"Authorization": "Bearer "}, **kwargs).status_code == 403
+
+
+@pytest.mark.parametrize("method, path, kwargs", ADMIN_ENDPOINTS)
+def test_wrong_or_missing_token_is_refused(client, monkeypatch, method, path, kwargs):
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "s3cret")
+    assert client.request(method, path, **kwargs).status_code == 401
+    assert client.request(method, path, headers={"Authorization": "Bearer nope"}, **kwargs).status_code == 401
+
+
+def test_token_allows_changing_log_levels(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "s3cret")
+    response = client.put("/logging/levels", json={"modules": {}}, headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
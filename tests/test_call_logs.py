@@ -0,0 +1,50 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.services.call_logs import CallLogWriter, CallRecord
+
+TRANSCRIPT = "User: I need a root canal, my number is 5551234567"
+
+
+def _record(session_id: str) -> CallRecord:
+    return CallRecord(
+        session_id=session_id,
+        created_at=datetime(2026, 10, 18, tzinfo=timezone.utc),
+        duration=42,
+        transcript_summary=TRANSCRIPT,
+        turn_timings=[{"turn": 1, "llm_ttft_ms": 210.5}],
+    )
+
+
+def _writer(tmp_path) -> CallLogWriter:
+    writer = CallLogWriter()
+    writer.spill_path = str(tmp_path / "spill" / "call_logs.spill.jsonl")
+    return writer
+
+
+def test_spilled_records_are_encrypted(tmp_path):
+    writer = _writer(tmp_path)
+    writer._append_spill([_record("a"), _record("b")])
+
+    with open(writer.spill_path) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 2
+    assert all("root canal" not in line and "5551234567" not in line for line in lines)
+    assert writer._read_spill(writer.spill_path) == [_record("a"), _record("b")]
+
+
+def test_replay_inserts_spilled_records_and_reads_plain_legacy_lines(tmp_path, monkeypatch):
+    writer = _writer(tmp_path)
+    writer._append_spill([_record("a")])
+    with open(writer.spill_path, "a") as f:
+        f.write(_record("legacy").model_dump_json() + "\n")
+
+    inserted = []
+
+    async def insert(batch):
+        inserted.extend(batch)
+
+    monkeypatch.setattr(writer, "_insert", insert)
+    asyncio.run(writer._replay())
+    assert [record.session_id for record in inserted] == ["a", "legacy"]
+    assert not list((tmp_path / "spill").iterdir()) # The claimed file is removed once written
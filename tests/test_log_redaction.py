@@ -0,0 +1,77 @@
+import io
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.logging import LogWriter, redact
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("User: my number is 5551234567 thanks", "User: my number is XXX-XXX-4567 thanks"),
+    ("User: call me at 15551234567", "User: call me at XXX-XXX-4567"),
+    ("Caller said '5551234567'", "Caller said 'XXX-XXX-4567'"),
+    ('Tool lookup_patient({"phone": "5551234567"}) -> ok', 'Tool lookup_patient({"phone": "XXX-XXX-4567"}) -> ok'),
+    ('{"message": "my number is 5551234567"}', '{"message": "my number is XXX-XXX-4567"}'),
+    ("GET /ws/conversation?caller=5551234567", "GET /ws/conversation?caller=XXX-XXX-4567"),
+    ("GET /ws/conversation?caller=%2B15551234567", "GET /ws/conversation?caller=XXX-XXX-4567"),
+    ("User: (555) 123-4567", "User: XXX-XXX-4567"),
+    ("User: +447911123456", "User: XXX-XXX-3456"),
+    ("User: ssn 123-45-6789", "User: ssn XXX-XX-XXXX"),
+    ("User: jane@example.com", "User: [REDACTED_EMAIL]"),
+    ("User said:\n5551234567", "User said:\nXXX-XXX-4567"),
+    ("User said:\t555-123-4567", "User said:\tXXX-XXX-4567"),
+    ("5551234567 is calling", "XXX-XXX-4567 is calling"),
+    ("caller_id: 5551234567", "caller_id: XXX-XXX-4567"),
+    ('{"caller_id": "5551234567"}', '{"caller_id": "XXX-XXX-4567"}'),
+    ("patient_id: 555-123-4567", "patient_id: XXX-XXX-4567"),
+    ("session_id: 555-123-4567", "session_id: XXX-XXX-4567"),
+])
+def test_masks_pii(line, expected):
+    assert redact(line) == expected
+
+
+@pytest.mark.parametrize("line", [
+    '{"session_id": 1760790000, "line": 225}',
+    "flush ts=1760790000 call_id=5551234567",
+    "Tick at 1760790000.25",
+    "Order 123456789012345 shipped",
+])
+def test_leaves_ids_and_timestamps(line):
+    assert redact(line) == line
+
+
+def _record(message, **extra):
+    return {
+        "time": datetime(2026, 10, 18, tzinfo=timezone.utc),
+        "level": SimpleNamespace(name="INFO"),
+        "name": "app.voice_engine.workers.llm",
+        "function": "process",
+        "line": 1,
+        "message": message,
+        "extra": extra,
+        "exception": None,
+    }
+
+
+@pytest.mark.parametrize("serialize", [True, False])
+def test_writer_masks_before_formatting(serialize):
+    writer = LogWriter(io.StringIO(), serialize=serialize, maxsize=10)
+    line = writer._format(_record("User said:\n5551234567", caller="+15551234567", tool={"args": ["jane@example.com"]}))
+    assert "5551234567" not in line and "jane@example.com" not in line
+    if serialize:
+        entry = json.loads(line)
+        assert entry["message"] == "User said:\nXXX-XXX-4567"
+        assert entry["extra"] == {"caller": "XXX-XXX-4567", "tool": {"args": ["[REDACTED_EMAIL]"]}}
+
+
+def test_writer_masks_exceptions():
+    try:
+        phone = "555" + "1234567" # Not a literal: the traceback quotes this source line
+        raise ValueError(f"no patient for\n{phone}")
+    except ValueError as e:
+        record = _record("Lookup failed")
+        record["exception"] = (type(e), e, e.__traceback__)
+    line = LogWriter(io.StringIO(), serialize=True, maxsize=10)._format(record)
+    assert "5551234567" not in line and "XXX-XXX-4567" in json.loads(line)["exception"]
@@ -0,0 +1,51 @@
+import pytest
+
+from app.core.config import settings
+from app.core.security import blind_index, normalize_phone
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5551234567", "+15551234567"),
+    ("(555) 123-4567", "+15551234567"),
+    ("15551234567", "+15551234567"),
+    ("1-555-123-4567", "+15551234567"),
+    ("+1 555 123 4567", "+15551234567"),
+    ("+447911123456", "+447911123456"),
+    ("447911123456", "+447911123456"), # E.164 without the "+"
+    ("00447911123456", "+447911123456"),
+    ("05551234567", "+15551234567"), # Trunk 0
+    ("1234567", None),
+    ("555123456", None),
+    ("+1234567", None),
+    ("1234567890123456", None),
+    ("", None),
+])
+def test_normalize_phone(value, expected):
+    assert normalize_phone(value) == expected
+
+
+def test_normalize_phone_other_default_country(monkeypatch):
+    monkeypatch.setattr(settings, "PHONE_DEFAULT_COUNTRY_CODE", "44")
+    assert normalize_phone("07911 123456") == "+447911123456"
+    assert normalize_phone("15551234567") == "+15551234567"
+
+
+def test_blind_index_matches_any_format_of_the_same_number():
+    indexes = {blind_index(value) for value in ("5551234567", "+1 (555) 123-4567", "15551234567")}
+    assert len(indexes) == 1 and None not in indexes
+    assert blind_index("447911123456") == blind_index("+44 7911 123456")
+    assert blind_index("447911123456") != blind_index("+1447911123456")
+    assert blind_index("1234567") is None
+
+
+def test_blind_index_depends_on_the_key(monkeypatch):
+    before = blind_index("5551234567")
+    monkeypatch.setattr(settings, "BLIND_INDEX_KEY", "another-key")
+    assert blind_index("5551234567") != before
+
+
+def test_blind_index_needs_a_key(monkeypatch):
+    monkeypatch.setattr(settings, "BLIND_INDEX_KEY", "")
+    with pytest.raises(RuntimeError):
+        blind_index("5551234567")
+    assert blind_index("not a phone") is None # Never reaches the key check
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.sessions import AdmissionRejected, SessionLimiter
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    def make(max_active=200, max_per_practice=20, queue_size=50, queue_timeout_s=0.2) -> SessionLimiter:
+        monkeypatch.setattr(settings, "SESSION_MAX_ACTIVE", max_active)
+        monkeypatch.setattr(settings, "SESSION_MAX_PER_PRACTICE", max_per_practice)
+        monkeypatch.setattr(settings, "SESSION_QUEUE_SIZE", queue_size)
+        monkeypatch.setattr(settings, "SESSION_QUEUE_TIMEOUT_S", queue_timeout_s)
+        return SessionLimiter()
+    return make
+
+
+async def _hold(limiter: SessionLimiter, practice_id: str, admitted: list, release: asyncio.Event):
+    async with limiter.admit(practice_id):
+        admitted.append(practice_id)
+        await release.wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_calls_without_a_practice_only_count_globally(limiter):
+    async def run():
+        sessions = limiter()
+        admitted: list = []
+        release = asyncio.Event()
+        calls = [asyncio.create_task(_hold(sessions, "", admitted, release)) for _ in range(40)]
+        await _settle()
+        assert len(admitted) == 40 and sessions.by_practice == {}
+        release.set()
+        await asyncio.gather(*calls)
+        assert sessions.active == 0
+    asyncio.run(run())
+
+
+def test_practice_limit_queues_then_times_out(limiter):
+    async def run():
+        sessions = limiter(max_per_practice=2)
+        admitted: list = []
+        release = asyncio.Event()
+        calls = [asyncio.create_task(_hold(sessions, "7", admitted, release)) for _ in range(3)]
+        other = asyncio.create_task(_hold(sessions, "8", admitted, release))
+        await _settle()
+        # The third call for practice 7 waits; practice 8 isn't held up by it
+        assert admitted == ["7", "7", "8"] and len(sessions.waiters) == 1
+        with pytest.raises(AdmissionRejected, match="queue_timeout"):
+            await calls[2]
+        release.set()
+        await asyncio.gather(*calls[:2], other)
+    asyncio.run(run())
+
+
+def test_full_queue_rejects_at_once(limiter):
+    async def run():
+        sessions = limiter(max_active=1, queue_size=1)
+        admitted: list = []
+        release = asyncio.Event()
+        first = asyncio.create_task(_hold(sessions, "", admitted, release))
+        queued = asyncio.create_task(_hold(sessions, "", admitted, release))
+        await _settle()
+        with pytest.raises(AdmissionRejected, match="queue_full"):
+            await _hold(sessions, "", admitted, release)
+        release.set()
+        await asyncio.gather(first, queued)
+        assert admitted == ["", ""]
+    asyncio.run(run())
+
+
+def test_freed_slots_go_to_the_oldest_waiter_that_fits(limiter):
+    async def run():
+        sessions = limiter(max_active=2, max_per_practice=1, queue_timeout_s=5)
+        admitted: list = []
+        releases = {name: asyncio.Event() for name in ("a", "b", "c", "d", "e")}
+        a = asyncio.create_task(_hold(sessions, "1", admitted, releases["a"]))
+        b = asyncio.create_task(_hold(sessions, "2", admitted, releases["b"]))
+        await _settle()
+        # Queued in this order: c is blocked by practice 1's limit, d and e by the global one
+        c = asyncio.create_task(_hold(sessions, "1", admitted, releases["c"]))
+        await _settle()
+        d = asyncio.create_task(_hold(sessions, "3", admitted, releases["d"]))
+        await _settle()
+        e = asyncio.create_task(_hold(sessions, "", admitted, releases["e"]))
+        await _settle()
+        assert admitted == ["1", "2"] and len(sessions.waiters) == 3
+
+        # Practice 2's slot: c still can't take it, so it goes to d, the oldest that fits
+        releases["b"].set()
+        await _settle()
+        assert admitted == ["1", "2", "3"] and [p for p, _ in sessions.waiters] == ["1", ""]
+
+        # Practice 1's slot goes to c, ahead of e
+        releases["a"].set()
+        await _settle()
+        assert admitted == ["1", "2", "3", "1"] and [p for p, _ in sessions.waiters] == [""]
+
+        releases["d"].set()
+        await _settle()
+        assert admitted[-1] == "" and not sessions.waiters
+
+        for event in releases.values():
+            event.set()
+        await asyncio.gather(a, b, c, d, e)
+        assert sessions.active == 0 and sessions.by_practice == {}
+    asyncio.run(run())
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import timezone
+
+import pytest
+
+from app.voice_engine import tools as tools_module
+from app.voice_engine.tools import TOOL_SPECS, ToolSession
+
+
+@pytest.fixture
+def booked(monkeypatch):
+    """Patient ids availability.book was called with; the practice is on UTC."""
+    calls = []
+
+    async def practice_tz(practice_id):
+        return timezone.utc
+
+    async def book(practice_id, booking, patient_id=None):
+        calls.append(patient_id)
+        booking.appointment_id = 7
+        return booking
+
+    monkeypatch.setattr(tools_module.availability, "practice_tz", practice_tz)
+    monkeypatch.setattr(tools_module.availability, "book", book)
+    return calls
+
+
+def _session(monkeypatch, caller, patients):
+    looked_up = []
+
+    async def lookup(self, phone):
+        looked_up.append(phone)
+        return patients
+
+    monkeypatch.setattr(ToolSession, "_lookup", lookup)
+    return ToolSession(1, caller), looked_up
+
+
+def _run(tools, name, arguments):
+    return asyncio.run(tools.run([{"id": "c1", "name": name, "arguments": arguments}]))[0]
+
+
+def test_specs_take_no_patient_or_phone():
+    for spec in TOOL_SPECS:
+        properties = spec["function"]["parameters"]["properties"]
+        assert "phone" not in properties and "patient_id" not in properties
+
+
+def test_lookup_uses_only_the_caller_id(monkeypatch):
+    tools, looked_up = _session(monkeypatch, "+15551234567", [{"patient_id": 3, "first_name": "A", "last_name": "B"}])
+    assert '"patient_id": 3' in _run(tools, "lookup_patient", "{}")
+    assert "error" in _run(tools, "lookup_patient", '{"phone": "5559876543"}')
+    assert looked_up == ["+15551234567"]
+
+
+def test_books_for_the_single_caller_match(monkeypatch, booked):
+    tools, _ = _session(monkeypatch, "+15551234567", [{"patient_id": 3, "first_name": "A", "last_name": "B"}])
+    assert '"booked": true' in _run(tools, "book_appointment", '{"start": "2026-10-22T14:00:00+00:00"}')
+    assert booked == [3]
+
+
+@pytest.mark.parametrize("caller, patients", [
+    (None, []),
+    ("+15551234567", []),
+    ("+15551234567", [{"patient_id": 3}, {"patient_id": 4}]),
+])
+def test_refuses_to_book_without_one_caller_match(monkeypatch, booked, caller, patients):
+    tools, _ = _session(monkeypatch, caller, patients)
+    assert "error" in _run(tools, "book_appointment", '{"start": "2026-10-22T14:00:00+00:00"}')
+    assert "error" in _run(tools, "book_appointment", '{"start": "2026-10-22T14:00:00+00:00", "patient_id": 3}')
+    assert booked == []
+
+
+def test_prefetch_retries_a_failed_timezone_lookup(monkeypatch):
+    attempts = []
+    prefetched = []
+
+    async def practice_tz(practice_id):
+        attempts.append(practice_id)
+        if len(attempts) == 1:
+            raise ConnectionError("database unavailable")
+        return timezone.utc
+
+    async def find_slots(practice_id, start, end, **kwargs):
+        prefetched.append(start)
+        return []
+
+    monkeypatch.setattr(tools_module.availability, "practice_tz", practice_tz)
+    monkeypatch.setattr(tools_module.availability, "find_slots", find_slots)
+
+    async def run():
+        tools = ToolSession(1)
+        for _ in range(2):
+            tools.prefetch("I'd like to book a cleaning")
+            await asyncio.gather(*tools.tasks, return_exceptions=True)
+            await asyncio.sleep(0)
+        return tools
+
+    tools = asyncio.run(run())
+    assert len(attempts) == 2 and tools.tz is timezone.utc
+    assert len(prefetched) == 1 and prefetched[0].tzinfo is timezone.utc
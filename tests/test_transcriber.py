@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.voice_engine.connection_pool import provider_pool
+from app.voice_engine.workers.transcriber import BYTES_PER_S, AudioReplayBuffer, DeepgramTranscriber
+
+# 100 ms of PCM16 at the pipeline rate
+CHUNK = b"\x01" * (BYTES_PER_S // 10)
+
+
+def test_replay_buffer_positions():
+    buffer = AudioReplayBuffer(max_s=10)
+    for _ in range(5):
+        buffer.append(CHUNK)
+    assert (buffer.start_s, buffer.duration_s) == (0.0, 0.5)
+
+    # Deepgram's offsets are rounded floats: a final ending at 0.2 covers the first two chunks
+    buffer.acknowledge(0.19999)
+    assert buffer.start_s == pytest.approx(0.2)
+    assert buffer.duration_s == pytest.approx(0.3)
+
+    buffer.acknowledge(1.0)
+    assert not buffer.chunks and buffer.start == buffer.end == len(CHUNK) * 5
+
+
+def test_replay_buffer_drops_oldest_when_full():
+    buffer = AudioReplayBuffer(max_s=0.3)
+    for _ in range(5):
+        buffer.append(CHUNK)
+    assert len(buffer.chunks) == 3
+    assert buffer.start_s == pytest.approx(0.2)
+    assert buffer.end == len(CHUNK) * 5
+
+
+class FakeSocket:
+    """Sends its messages, then closes (as Deepgram does when a stream fails)."""
+    def __init__(self, messages=()):
+        self.messages = [json.dumps(m) for m in messages]
+        self.sent = []
+
+    def __aiter__(self):
+        return self._receive()
+
+    async def _receive(self):
+        for message in self.messages:
+            yield message
+        await asyncio.sleep(0.01)
+
+    async def send(self, data):
+        self.sent.append(data)
+
+    async def close(self):
+        pass
+
+
+RESULT = {"type": "Results", "is_final": True, "start": 0.0, "duration": 0.1, "channel": {"alternatives": []}}
+
+
+@pytest.fixture
+def sockets(monkeypatch):
+    """Sockets handed out by the pool, in order; each acquire() takes the next one."""
+    handed_out = []
+
+    def use(*queue):
+        async def acquire():
+            ws = queue[len(handed_out)]
+            handed_out.append(ws)
+            return ws
+        monkeypatch.setattr(provider_pool.deepgram, "acquire", acquire)
+        return handed_out
+
+    monkeypatch.setattr(settings, "STT_RECONNECT_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "STT_RECONNECT_BACKOFF_S", 0.02)
+    monkeypatch.setattr(settings, "STT_STALL_TIMEOUT_S", 60.0)
+    return use
+
+
+def _run(transcriber: DeepgramTranscriber):
+    async def run():
+        transcriber.active = True
+        transcriber.input_queue.put_nowait(CHUNK)
+        await transcriber._run_loop()
+    return asyncio.run(run())
+
+
+def test_sockets_closing_before_answering_back_off_then_give_up(sockets):
+    handed_out = sockets(*(FakeSocket() for _ in range(10)))
+    transcriber = DeepgramTranscriber(asyncio.Queue(), asyncio.Queue())
+
+    started = time.monotonic()
+    with pytest.raises(ConnectionError):
+        _run(transcriber)
+    # The first socket plus STT_RECONNECT_ATTEMPTS replacements, the later ones after 20 and 40 ms
+    assert len(handed_out) == 4
+    assert time.monotonic() - started >= 0.06
+    # Every replacement was replayed the unacknowledged audio
+    assert all(ws.sent == [CHUNK] for ws in handed_out[1:])
+
+
+def test_an_answer_resets_the_backoff(sockets):
+    answering = [FakeSocket([RESULT]) for _ in range(5)]
+    handed_out = sockets(*answering, *(FakeSocket() for _ in range(4)))
+    transcriber = DeepgramTranscriber(asyncio.Queue(), asyncio.Queue())
+
+    with pytest.raises(ConnectionError):
+        _run(transcriber)
+    # Sockets that answered before closing never count toward STT_RECONNECT_ATTEMPTS
+    assert len(handed_out) == 5 + 3